@@ -0,0 +1,256 @@
+import os
+import tempfile
+import pyarrow as pa
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Union
+from app.database import run_in_db, db_operation
+
+# Output formats of the analytics endpoints
+ANALYTICS_FORMATS = ("json", "parquet", "arrow")
+ANALYTICS_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream"
+}
+
+# Units accepted for time-bucketed volumes (DuckDB date_trunc parts)
+TIME_BUCKETS = ("hour", "day", "week", "month")
+
+# Highlight types stored in match_history.highlights, by the name used in the API
+HIGHLIGHT_TYPES = {
+    "strengths": "match",
+    "gaps": "gap"
+}
+
+# Number of job description characters returned to identify a job
+JOB_PREVIEW_CHARS = 120
+
+AnalyticsQuery = Tuple[str, List[Any]]
+
+# Queries aggregate inside DuckDB; only the summary rows leave the database
+
+SCORE_HISTOGRAM_SQL = """
+SELECT
+    b.bucket_start,
+    b.bucket_start + ? AS bucket_end,
+    count(m.score) AS matches
+FROM range(0, 100, ?) b(bucket_start)
+LEFT JOIN (
+    SELECT score
+    FROM match_history
+    WHERE score IS NOT NULL {time_filter}
+) m
+-- 100 falls in the top bucket
+ON floor(least(m.score, 99) / ?) * ? = b.bucket_start
+GROUP BY b.bucket_start
+ORDER BY b.bucket_start
+"""
+
+JOB_PERCENTILES_SQL = """
+SELECT
+    s.job_hash,
+    left(d.content, ?) AS job_preview,
+    s.matches,
+    s.avg_score,
+    s.p25,
+    s.p50,
+    s.p75,
+    s.p90
+FROM (
+    SELECT
+        job_hash,
+        count(*) AS matches,
+        round(avg(score), 1) AS avg_score,
+        quantile_cont(score, 0.25) AS p25,
+        quantile_cont(score, 0.5) AS p50,
+        quantile_cont(score, 0.75) AS p75,
+        quantile_cont(score, 0.9) AS p90
+    FROM match_history
+    WHERE score IS NOT NULL AND job_hash IS NOT NULL {time_filter}
+    GROUP BY job_hash
+    HAVING count(*) >= ?
+) s
+LEFT JOIN documents d ON d.content_hash = s.job_hash
+ORDER BY s.matches DESC, s.job_hash
+LIMIT ?
+"""
+
+TOP_HIGHLIGHTS_SQL = """
+SELECT
+    highlight->>'description' AS description,
+    count(*) AS matches
+FROM (
+    SELECT unnest(CAST(highlights AS JSON[])) AS highlight
+    FROM match_history
+    WHERE highlights IS NOT NULL {time_filter}
+)
+WHERE highlight->>'type' = ?
+GROUP BY description
+ORDER BY matches DESC, description
+LIMIT ?
+"""
+
+VOLUME_SQL = """
+SELECT
+    date_trunc(?, timestamp) AS bucket_start,
+    count(*) AS matches,
+    round(avg(score), 1) AS avg_score
+FROM match_history
+WHERE timestamp IS NOT NULL {time_filter}
+GROUP BY bucket_start
+ORDER BY bucket_start
+"""
+
+def _time_filter(since: Optional[datetime], until: Optional[datetime]) -> Tuple[str, List[Any]]:
+    """Build the timestamp conditions appended to a WHERE clause."""
+    conditions = []
+    params: List[Any] = []
+    if since is not None:
+        conditions.append("AND timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("AND timestamp < ?")
+        params.append(until)
+    return " ".join(conditions), params
+
+def score_histogram_query(
+    bucket_width: int = 10,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> AnalyticsQuery:
+    """
+    Count matches per score bucket, including empty buckets.
+    
+    Args:
+        bucket_width: Width of each score bucket
+        since: Only count matches at or after this time (optional)
+        until: Only count matches before this time (optional)
+    
+    Returns:
+        Tuple of (sql, params)
+    """
+    time_filter, time_params = _time_filter(since, until)
+    sql = SCORE_HISTOGRAM_SQL.format(time_filter=time_filter)
+    return sql, [bucket_width, bucket_width, *time_params, bucket_width, bucket_width]
+
+def job_percentiles_query(
+    limit: int = 20,
+    min_matches: int = 1,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> AnalyticsQuery:
+    """
+    Score percentiles for the most frequently matched job descriptions.
+    
+    Args:
+        limit: Maximum number of jobs to return
+        min_matches: Leave out jobs with fewer matches than this
+        since: Only count matches at or after this time (optional)
+        until: Only count matches before this time (optional)
+    
+    Returns:
+        Tuple of (sql, params)
+    """
+    time_filter, time_params = _time_filter(since, until)
+    sql = JOB_PERCENTILES_SQL.format(time_filter=time_filter)
+    return sql, [JOB_PREVIEW_CHARS, *time_params, min_matches, limit]
+
+def top_highlights_query(
+    kind: str = "gaps",
+    limit: int = 10,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> AnalyticsQuery:
+    """
+    Most common gaps or strengths, unnested from the stored highlights.
+    
+    Args:
+        kind: "gaps" or "strengths"
+        limit: Maximum number of entries to return
+        since: Only count matches at or after this time (optional)
+        until: Only count matches before this time (optional)
+    
+    Returns:
+        Tuple of (sql, params)
+    """
+    time_filter, time_params = _time_filter(since, until)
+    sql = TOP_HIGHLIGHTS_SQL.format(time_filter=time_filter)
+    return sql, [*time_params, HIGHLIGHT_TYPES[kind], limit]
+
+def volume_query(
+    bucket: str = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> AnalyticsQuery:
+    """
+    Match counts and average score per time bucket.
+    
+    Args:
+        bucket: One of TIME_BUCKETS
+        since: Only count matches at or after this time (optional)
+        until: Only count matches before this time (optional)
+    
+    Returns:
+        Tuple of (sql, params)
+    """
+    time_filter, time_params = _time_filter(since, until)
+    sql = VOLUME_SQL.format(time_filter=time_filter)
+    return sql, [bucket, *time_params]
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _to_parquet(cursor, sql: str, params: List[Any]) -> bytes:
+    """Write a query result to Parquet with DuckDB's own writer."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "result.parquet")
+        cursor.sql(sql, params=params).write_parquet(path)
+        with open(path, "rb") as file:
+            return file.read()
+
+def _to_arrow(cursor, sql: str, params: List[Any]) -> bytes:
+    """Serialize a query result as an Arrow IPC stream."""
+    reader = cursor.execute(sql, params).to_arrow_reader()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+@db_operation
+async def run_analytics(
+    query: AnalyticsQuery,
+    output_format: str = "json"
+) -> Union[List[Dict[str, Any]], bytes]:
+    """
+    Run an analytics query on the database thread pool.
+    
+    Args:
+        query: Tuple of (sql, params) from one of the *_query functions
+        output_format: One of ANALYTICS_FORMATS
+    
+    Returns:
+        List of row dictionaries for "json", otherwise the encoded bytes
+    
+    Raises:
+        ValueError: If the format is unknown or its dependency is missing
+    """
+    sql, params = query
+    if output_format not in ANALYTICS_FORMATS:
+        raise ValueError(f"Unknown analytics format: {output_format}")
+    
+    def execute(cursor):
+        if output_format == "parquet":
+            return _to_parquet(cursor, sql, params)
+        if output_format == "arrow":
+            return _to_arrow(cursor, sql, params)
+        
+        result = cursor.execute(sql, params)
+        columns = [column[0] for column in result.description]
+        return [
+            {name: _to_json_value(value) for name, value in zip(columns, row)}
+            for row in result.fetchall()
+        ]
+    
+    return await run_in_db(execute)
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+from dotenv import load_dotenv
+from app.database import get_cached_match, store_cached_match
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cache settings
+CACHE_ENABLED = os.getenv("MATCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_ENTRIES = int(os.getenv("MATCH_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("MATCH_CACHE_TTL_SECONDS", "86400"))
+CACHE_PERSIST = os.getenv("MATCH_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+
+CachedMatch = Tuple[str, Optional[Dict[str, Any]]]
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return " ".join(text.split())
+
+def make_cache_key(
+    resume: str,
+    job_description: str,
+    prompt_version: str,
+    model: str,
+    temperature: float
+) -> str:
+    """
+    Build a content-addressed key for a match.
+    
+    Args:
+        resume: The resume text
+        job_description: The job description text
+        prompt_version: Version of the prompt template
+        model: The model name
+        temperature: The sampling temperature
+    
+    Returns:
+        Hex SHA-256 digest of the normalized inputs
+    """
+    payload = json.dumps([
+        normalize_text(resume),
+        normalize_text(job_description),
+        prompt_version,
+        model,
+        temperature
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """In-process LRU cache with a time-to-live and a maximum size."""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def pop(self, key: str) -> None:
+        self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+memory_cache = LRUCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+cache_stats = {
+    "memory_hits": 0,
+    "persistent_hits": 0,
+    "misses": 0,
+    "store_failures": 0
+}
+
+async def get_cached_result(key: str) -> Optional[CachedMatch]:
+    """
+    Look up a match result in the memory tier, then the persistent tier.
+    
+    Args:
+        key: The cache key from make_cache_key
+    
+    Returns:
+        Tuple of (raw_output, parsed_output) or None on a miss
+    """
+    if not CACHE_ENABLED:
+        return None
+    
+    value = memory_cache.get(key)
+    if value is not None:
+        cache_stats["memory_hits"] += 1
+        return value
+    
+    if CACHE_PERSIST:
+        record = await get_cached_match(key, CACHE_TTL_SECONDS)
+        if record is not None:
+            value = (record["raw_output"], record["parsed_output"])
+            memory_cache.set(key, value)
+            cache_stats["persistent_hits"] += 1
+            return value
+    
+    cache_stats["misses"] += 1
+    return None
+
+async def cache_result(key: str, raw_output: str, parsed_output: Optional[Dict[str, Any]]) -> None:
+    """
+    Store a match result in both cache tiers.
+    
+    A failed write to the persistent tier is logged, not raised, so it
+    never fails the match that produced the result.
+    
+    Args:
+        key: The cache key from make_cache_key
+        raw_output: The raw output from OpenAI
+        parsed_output: The parsed JSON output
+    """
+    if not CACHE_ENABLED:
+        return
+    
+    memory_cache.set(key, (raw_output, parsed_output))
+    if CACHE_PERSIST:
+        try:
+            await store_cached_match(key, raw_output, parsed_output)
+        except Exception:
+            # The result is still valid; it is only not shared or kept
+            cache_stats["store_failures"] += 1
+            logger.exception("Storing a match result in the persistent cache failed")
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters for the match cache."""
+    hits = cache_stats["memory_hits"] + cache_stats["persistent_hits"]
+    lookups = hits + cache_stats["misses"]
+    return {
+        **cache_stats,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory_entries": len(memory_cache)
+    }
+
+# Calls currently in flight, keyed by cache key. Concurrent callers with
+# the same key share one task instead of each calling OpenAI.
+inflight_requests: Dict[str, "asyncio.Task[Any]"] = {}
+
+inflight_stats = {
+    "leader_calls": 0,
+    "coalesced_calls": 0
+}
+
+async def coalesce(
+    key: str,
+    func: Callable[[], Awaitable[Any]],
+    inflight: Optional[Dict[str, "asyncio.Task[Any]"]] = None
+) -> Any:
+    """
+    Run func once for all concurrent callers that use the same key.
+    
+    The shared work runs in its own task, so a caller that disconnects
+    does not cancel the result other callers are waiting for.
+    
+    Args:
+        key: The cache key from make_cache_key
+        func: Coroutine function producing the result
+        inflight: Tasks in flight to coalesce with, for work other than
+            LLM calls; inflight_stats only counts the default registry
+    
+    Returns:
+        The result of func, shared between all coalesced callers
+    """
+    counted = inflight is None
+    if inflight is None:
+        inflight = inflight_requests
+    
+    task = inflight.get(key)
+    if task is not None:
+        if counted:
+            inflight_stats["coalesced_calls"] += 1
+    else:
+        if counted:
+            inflight_stats["leader_calls"] += 1
+        task = asyncio.ensure_future(func())
+        inflight[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(inflight, key, t))
+    
+    return await asyncio.shield(task)
+
+def _finish_inflight(inflight: Dict[str, "asyncio.Task[Any]"], key: str, task: "asyncio.Task[Any]") -> None:
+    if inflight.get(key) is task:
+        del inflight[key]
+    # Mark the exception as retrieved in case every caller went away
+    if not task.cancelled():
+        task.exception()
+
+def get_inflight_stats() -> Dict[str, Any]:
+    """Return counters for coalesced duplicate match requests."""
+    total = inflight_stats["leader_calls"] + inflight_stats["coalesced_calls"]
+    return {
+        **inflight_stats,
+        "in_flight": len(inflight_requests),
+        "coalesce_rate": round(inflight_stats["coalesced_calls"] / total, 4) if total else 0.0
+    }
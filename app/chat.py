@@ -0,0 +1,290 @@
+import os
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from app.cache import LRUCache
+from app.compaction import compact_match_inputs, count_tokens
+from app.json_stream import decode_match_output
+from app.matcher import (
+    generate_chat_prompt, build_chat_messages, complete_chat, stream_chat, summarize_conversation
+)
+from app.database import (
+    get_match_by_id, get_chat_session, append_chat_turn, fold_chat_turns, delete_chat_session, DB_SOCKET
+)
+from app.writer import match_writer
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Chat session settings
+CHAT_SESSION_CACHE_SIZE = int(os.getenv("CHAT_SESSION_CACHE_SIZE", "1000"))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "3600"))
+# Turns sent verbatim with every question; older ones are summarized
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "6"))
+
+class ChatSession:
+    """
+    The conversation about one match.
+    
+    Holds the system prompt, built once from the stored match, the
+    running summary of older turns and the turns since then. Each turn
+    is a dictionary with user and assistant keys.
+    """
+    
+    def __init__(
+        self,
+        match_id: int,
+        system_prompt: str,
+        summary: Optional[str] = None,
+        summarized_turns: int = 0,
+        turns: Optional[List[Dict[str, str]]] = None
+    ):
+        self.match_id = match_id
+        self.system_prompt = system_prompt
+        self.summary = summary
+        self.summarized_turns = summarized_turns
+        self.turns = turns if turns is not None else []
+        # Turns of one conversation are answered one after the other
+        self.lock = asyncio.Lock()
+        self.summarizing = False
+        self.deleted = False
+    
+    @property
+    def total_turns(self) -> int:
+        return self.summarized_turns + len(self.turns)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "match_id": self.match_id,
+            "summary": self.summary,
+            "summarized_turns": self.summarized_turns,
+            "turns": list(self.turns)
+        }
+    
+    def apply(self, state: Dict[str, Any]) -> None:
+        """Take over the summary and turns of a session as stored in the database."""
+        self.summary = state["summary"]
+        self.summarized_turns = state["summarized_turns"]
+        self.turns = state["turns"]
+
+def match_chat_context(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the analysis a stored match record is discussed with."""
+    parsed_output = decode_match_output(match["raw_output"] or "")[0]
+    if parsed_output is not None:
+        return parsed_output
+    return {"score": match["score"], "summary": match["summary"], "highlights": match["highlights"]}
+
+class ChatSessionStore:
+    """
+    Chat sessions keyed by match ID.
+    
+    Recently used sessions are kept in an LRU cache; every session is
+    also stored in DuckDB, so an evicted or expired one is loaded again
+    on its next turn, as is every session after a restart. With shared
+    set, as in the multi-worker mode, other processes may answer turns
+    of the same conversation, so a cached session is refreshed from the
+    database before each use.
+    
+    Each question is sent with the same static context, the summary and
+    at most history_turns recent turns, so prompts stop growing with the
+    conversation. Once more turns have piled up, the oldest are folded
+    into the summary in the background, leaving the newest half.
+    """
+    
+    def __init__(
+        self,
+        max_sessions: int = CHAT_SESSION_CACHE_SIZE,
+        ttl_seconds: float = CHAT_SESSION_TTL_SECONDS,
+        history_turns: int = CHAT_HISTORY_TURNS,
+        shared: bool = DB_SOCKET is not None
+    ):
+        self.history_turns = max(1, history_turns)
+        self.shared = shared
+        self._sessions = LRUCache(max_sessions, ttl_seconds)
+        # Loads in progress, so concurrent first turns share one session
+        self._loading: Dict[int, "asyncio.Task[Optional[ChatSession]]"] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.stats = {
+            "memory_hits": 0,
+            "loaded": 0,
+            "turns": 0,
+            "summaries": 0,
+            "summary_failures": 0
+        }
+    
+    async def get(self, match_id: int) -> Optional[ChatSession]:
+        """
+        Get the session of a match, creating it on the first question.
+        
+        Args:
+            match_id: ID of the stored match
+        
+        Returns:
+            The session, or None if there is no such match
+        """
+        session = self._sessions.get(match_id)
+        if session is not None:
+            self.stats["memory_hits"] += 1
+            if self.shared:
+                # Only the system prompt is kept; the turns may have moved on
+                stored = await get_chat_session(match_id)
+                if stored is not None:
+                    session.apply(stored)
+            return session
+        
+        task = self._loading.get(match_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(match_id))
+            self._loading[match_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(match_id, None))
+        return await asyncio.shield(task)
+    
+    async def _load(self, match_id: int) -> Optional[ChatSession]:
+        # A chat may start before the writer has stored the match
+        await match_writer.written(match_id)
+        match, stored = await asyncio.gather(get_match_by_id(match_id), get_chat_session(match_id))
+        if match is None:
+            return None
+        
+        prompt_resume, prompt_job, _ = compact_match_inputs(match["resume_text"] or "", match["job_description"] or "")
+        stored = stored or {}
+        session = ChatSession(
+            match_id,
+            generate_chat_prompt(prompt_resume, prompt_job, match_chat_context(match)),
+            stored.get("summary"),
+            stored.get("summarized_turns") or 0,
+            stored.get("turns")
+        )
+        
+        self.stats["loaded"] += 1
+        self._sessions.set(match_id, session)
+        return session
+    
+    def messages(self, session: ChatSession, message: str) -> List[Dict[str, str]]:
+        """Build the messages for the next question in a session."""
+        return build_chat_messages(
+            session.system_prompt,
+            message,
+            session.summary,
+            session.turns[-self.history_turns:]
+        )
+    
+    async def reply(self, match_id: int, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a question in the conversation about a match.
+        
+        Args:
+            match_id: ID of the stored match
+            message: The user's question
+        
+        Returns:
+            Dictionary with the response, match_id, the number of turns so
+            far and the estimated prompt_tokens, or None if there is no
+            such match
+        """
+        session = await self.get(match_id)
+        if session is None:
+            return None
+        
+        async with session.lock:
+            messages = self.messages(session, message)
+            response = await complete_chat(messages)
+            await self._add_turn(session, message, response)
+        return self._turn_result(session, messages, response)
+    
+    async def stream_reply(self, session: ChatSession, message: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Answer a question in a conversation while the reply is generated.
+        
+        Yields ("token", str) events as the reply arrives, then ("complete",
+        dict) with the same fields reply returns. If the caller stops early,
+        the LLM call is closed and the unfinished turn is not added to the
+        conversation.
+        
+        Args:
+            session: The session, from get
+            message: The user's question
+        """
+        async with session.lock:
+            messages = self.messages(session, message)
+            chunks = []
+            # Closed right away if the caller stops, which aborts the LLM call
+            async with aclosing(stream_chat(messages)) as deltas:
+                async for delta in deltas:
+                    chunks.append(delta)
+                    yield "token", delta
+            response = "".join(chunks)
+            await self._add_turn(session, message, response)
+        yield "complete", self._turn_result(session, messages, response)
+    
+    async def _add_turn(self, session: ChatSession, message: str, response: str) -> None:
+        """Add an answered question to a session; the caller holds its lock."""
+        self.stats["turns"] += 1
+        if session.deleted:
+            session.turns.append({"user": message, "assistant": response})
+            return
+        session.apply(await append_chat_turn(session.match_id, {"user": message, "assistant": response}))
+    
+    def _turn_result(self, session: ChatSession, messages: List[Dict[str, str]], response: str) -> Dict[str, Any]:
+        """Start summarizing if enough turns piled up, and describe the finished turn."""
+        if not session.summarizing and len(session.turns) > self.history_turns:
+            session.summarizing = True
+            task = asyncio.create_task(self._summarize(session))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        
+        return {
+            "response": response,
+            "match_id": session.match_id,
+            "turns": session.total_turns,
+            "prompt_tokens": sum(count_tokens(item["content"]) for item in messages)
+        }
+    
+    async def _summarize(self, session: ChatSession) -> None:
+        """Fold all but the newest half of the kept turns into the summary."""
+        try:
+            summarized_turns = session.summarized_turns
+            folded = session.turns[:len(session.turns) - self.history_turns // 2]
+            summary = await summarize_conversation(session.summary, folded)
+            async with session.lock:
+                # Turns are only appended meanwhile, so the folded ones are still
+                # first, unless another process summarized them already
+                state = None if session.deleted else await fold_chat_turns(
+                    session.match_id, summarized_turns, len(folded), summary
+                )
+                if state is not None:
+                    session.apply(state)
+            self.stats["summaries"] += 1
+        except Exception:
+            # The turns stay; prompts still only carry the newest history_turns
+            self.stats["summary_failures"] += 1
+            logger.exception("Summarizing the chat about match %d failed", session.match_id)
+        finally:
+            session.summarizing = False
+    
+    async def delete(self, match_id: int) -> None:
+        """Forget the conversation about a match."""
+        session = self._sessions.get(match_id)
+        if session is not None:
+            session.deleted = True
+            self._sessions.pop(match_id)
+        await delete_chat_session(match_id)
+    
+    async def wait_idle(self) -> None:
+        """Wait for summaries still running, e.g. before shutting down."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return session counters."""
+        return {
+            **self.stats,
+            "cached_sessions": len(self._sessions),
+            "summarizing": len(self._tasks)
+        }
+
+chat_sessions = ChatSessionStore()
@@ -0,0 +1,228 @@
+import os
+import re
+import logging
+import functools
+import tiktoken
+from typing import Callable, Dict, Any, List, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Compaction settings; a budget of 0 disables trimming
+PROMPT_COMPACTION = os.getenv("PROMPT_COMPACTION", "true").lower() in ("1", "true", "yes")
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+JOB_TOKEN_BUDGET = int(os.getenv("JOB_TOKEN_BUDGET", "1500"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+TRUNCATION_MARKER = "[...]"
+
+def _load_tokenizer() -> Tuple[str, Callable[[str], int]]:
+    """
+    Return the tokenizer name and a token counting function.
+    
+    Uses tiktoken with TOKENIZER_ENCODING. tiktoken downloads an encoding
+    on first use and caches it (see TIKTOKEN_CACHE_DIR); if it cannot be
+    loaded, tokens are estimated at four characters each instead.
+    """
+    try:
+        encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        logger.warning("Could not load the %s encoding; estimating token counts", TOKENIZER_ENCODING, exc_info=True)
+        return "estimate", lambda text: (len(text) + 3) // 4
+    return "tiktoken", lambda text: len(encoding.encode(text, disallowed_special=()))
+
+TOKENIZER_NAME, count_tokens = _load_tokenizer()
+
+# Invisible characters and non-breaking spaces found in pasted or extracted text
+INVISIBLE_CHARS = re.compile(r"[\u200b\u200c\u200d\u2060\ufeff]")
+HORIZONTAL_SPACE = re.compile(r"[ \t\u00a0\u2000-\u200a\u202f\u205f\u3000]+")
+
+# Lines that belong to legal or recruiting boilerplate rather than the role
+BOILERPLATE_LINE = re.compile(
+    r"equal (?:employment )?opportunit|affirmative action|without regard to|"
+    r"reasonable accommodation|protected veteran|\be-?verify\b|"
+    r"(?:applicants|candidates) will receive consideration|"
+    r"(?:privacy|applicant) (?:notice|policy)|do not accept unsolicited",
+    re.IGNORECASE
+)
+
+# Section headings whose whole section is boilerplate
+BOILERPLATE_HEADING = re.compile(
+    r"^(?:#+\s*)?(?:our |the )?(?:benefits|perks|perks (?:and|&) benefits|benefits (?:and|&) perks|"
+    r"what we offer|why (?:join|work (?:with|at)) us|eeo(?: statement)?|"
+    r"equal (?:employment )?opportunity(?: employer| statement)?|diversity(?: (?:and|&) inclusion)?)\s*:?$",
+    re.IGNORECASE
+)
+
+# Page counters repeated in text extracted from multi-page documents
+PAGE_NUMBER_LINE = re.compile(r"^(?:page\s*)?\d+\s*(?:of|/)\s*\d+$", re.IGNORECASE)
+
+BULLET_PREFIX = re.compile(r"^(?:[-*\u2022\u25aa\u25cf\u2013]|\d+[.)])\s")
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces, trim lines and keep at most one blank line in a row."""
+    text = INVISIBLE_CHARS.sub("", text.replace("\r\n", "\n").replace("\r", "\n"))
+    lines = [HORIZONTAL_SPACE.sub(" ", line).strip() for line in text.split("\n")]
+    
+    result: List[str] = []
+    for line in lines:
+        if line or (result and result[-1]):
+            result.append(line)
+    while result and not result[-1]:
+        result.pop()
+    return "\n".join(result)
+
+def _is_heading(line: str) -> bool:
+    """Guess whether a line is a section heading."""
+    if not line or BULLET_PREFIX.match(line) or len(line.split()) > 6:
+        return False
+    return line.startswith("#") or line.endswith(":") or line.isupper() or line.istitle()
+
+def strip_boilerplate(lines: List[str]) -> Tuple[List[str], int]:
+    """
+    Drop boilerplate lines and sections from a job description.
+    
+    Returns:
+        Tuple of (remaining lines, number of lines removed)
+    """
+    kept: List[str] = []
+    removed = 0
+    in_boilerplate_section = False
+    
+    for line in lines:
+        if BOILERPLATE_HEADING.match(line):
+            in_boilerplate_section = True
+            removed += 1
+            continue
+        if in_boilerplate_section and _is_heading(line):
+            in_boilerplate_section = False
+        
+        if in_boilerplate_section and line:
+            removed += 1
+        elif BOILERPLATE_LINE.search(line):
+            removed += 1
+        elif not in_boilerplate_section:
+            kept.append(line)
+    
+    return kept, removed
+
+def dedupe_lines(lines: List[str]) -> Tuple[List[str], int]:
+    """
+    Drop repeated lines, such as headers and footers on every page.
+    
+    The first occurrence is kept; blank lines and page counters are
+    handled separately.
+    
+    Returns:
+        Tuple of (remaining lines, number of lines removed)
+    """
+    seen = set()
+    kept: List[str] = []
+    removed = 0
+    
+    for line in lines:
+        if PAGE_NUMBER_LINE.match(line):
+            removed += 1
+            continue
+        key = line.casefold()
+        if line and key in seen:
+            removed += 1
+            continue
+        seen.add(key)
+        kept.append(line)
+    
+    return kept, removed
+
+def trim_to_budget(lines: List[str], budget: int) -> Tuple[List[str], bool]:
+    """
+    Keep whole lines from the top until the token budget is used.
+    
+    Returns:
+        Tuple of (remaining lines, whether anything was cut)
+    """
+    if budget <= 0:
+        return lines, False
+    
+    kept: List[str] = []
+    used = count_tokens(TRUNCATION_MARKER)
+    for index, line in enumerate(lines):
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            if any(lines[index:]):
+                kept.append(TRUNCATION_MARKER)
+                return kept, True
+            break
+        kept.append(line)
+        used += cost
+    
+    return kept, False
+
+@functools.lru_cache(maxsize=256)
+def compact_text(text: str, budget: int, strip_job_boilerplate: bool = False) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    """
+    Shrink a document before it goes into a prompt.
+    
+    Normalizes whitespace, optionally strips job posting boilerplate,
+    drops repeated lines and trims to the token budget. Results are
+    cached, so calling it again for the same text is free.
+    
+    Args:
+        text: The resume or job description
+        budget: Maximum tokens to keep; 0 for no limit
+        strip_job_boilerplate: Remove EEO, benefits and similar sections
+    
+    Returns:
+        Tuple of (compacted text, stats as key/value pairs)
+    """
+    original_tokens = count_tokens(text)
+    lines = normalize_whitespace(text).split("\n")
+    
+    boilerplate_lines = 0
+    if strip_job_boilerplate:
+        lines, boilerplate_lines = strip_boilerplate(lines)
+    lines, duplicate_lines = dedupe_lines(lines)
+    lines, truncated = trim_to_budget(lines, budget)
+    
+    compacted = normalize_whitespace("\n".join(lines))
+    stats = (
+        ("original_tokens", original_tokens),
+        ("tokens", count_tokens(compacted)),
+        ("boilerplate_lines", boilerplate_lines),
+        ("duplicate_lines", duplicate_lines),
+        ("truncated", truncated)
+    )
+    return compacted, stats
+
+def compact_match_inputs(resume: str, job_description: str) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Compact a resume and job description for the match prompt.
+    
+    Args:
+        resume: The resume text
+        job_description: The job description text
+    
+    Returns:
+        Tuple of (resume, job_description, stats). The texts are returned
+        unchanged when PROMPT_COMPACTION is off.
+    """
+    if not PROMPT_COMPACTION:
+        return resume, job_description, {"enabled": False}
+    
+    compact_resume, resume_stats = compact_text(resume, RESUME_TOKEN_BUDGET)
+    compact_job, job_stats = compact_text(job_description, JOB_TOKEN_BUDGET, True)
+    resume_stats = dict(resume_stats)
+    job_stats = dict(job_stats)
+    
+    return compact_resume, compact_job, {
+        "enabled": True,
+        "tokenizer": TOKENIZER_NAME,
+        "resume": resume_stats,
+        "job_description": job_stats,
+        "saved_tokens": (
+            resume_stats["original_tokens"] - resume_stats["tokens"]
+            + job_stats["original_tokens"] - job_stats["tokens"]
+        )
+    }
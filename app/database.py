@@ -1,42 +1,471 @@
 import os
 import json
+import time
+import base64
+import asyncio
+import threading
+import hashlib
+import inspect
+import functools
 import duckdb
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Tuple, TypeVar
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from app.metrics import DB_DURATION
+from app.db_server import DatabaseClient
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize DuckDB connection
 DB_PATH = os.getenv("DUCKDB_PATH", "job_matcher.duckdb")
-conn = duckdb.connect(DB_PATH)
+
+# Set in the worker processes of the multi-worker mode (see app/serve.py).
+# DuckDB lets only one process open the file, so workers do not connect;
+# their database functions run in the database server process instead.
+DB_SOCKET = os.getenv("DB_SOCKET")
+DB_SOCKET_KEY = os.getenv("DB_SOCKET_KEY", "")
+
+# Initialize DuckDB connection
+conn = duckdb.connect(DB_PATH) if not DB_SOCKET else None
+db_client = DatabaseClient(DB_SOCKET, DB_SOCKET_KEY) if DB_SOCKET else None
+
+# Functions worker processes call on the database server, by name
+DB_OPERATIONS: Dict[str, Callable[..., Any]] = {}
+
+# Queries run on a small thread pool so they never block the event loop.
+# Each pool thread uses its own cursor (a separate connection to the same
+# database), which is how DuckDB supports concurrent use from threads.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="duckdb")
+_local = threading.local()
+_cursors: List[duckdb.DuckDBPyConnection] = []
+_cursors_lock = threading.Lock()
+
+T = TypeVar("T")
+
+def db_operation(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Register a database function so worker processes run it on the database server.
+    
+    In a single process, or in the server itself, the function runs as
+    is. In a worker, calls are sent to the server with the same
+    arguments; async generators pass their items one at a time.
+    """
+    name = func.__name__
+    DB_OPERATIONS[name] = func
+    
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        def iterate(*args, **kwargs):
+            if db_client is not None:
+                return db_client.iterate(name, args, kwargs)
+            return func(*args, **kwargs)
+        return iterate
+    
+    @functools.wraps(func)
+    async def call(*args, **kwargs):
+        if db_client is not None:
+            return await db_client.call(name, args, kwargs)
+        return await func(*args, **kwargs)
+    return call
+
+# Writes take this lock so concurrent inserts of the same document cannot
+# conflict on its primary key
+_write_lock = threading.Lock()
+
+# SQL statements, kept as constants so every call issues identical text
+
+# Expressions selecting each history field. Resume and job texts live once
+# in documents and are joined in by content hash.
+HISTORY_FIELD_SQL = {
+    "id": "m.id",
+    "timestamp": "m.timestamp",
+    "resume_text": "r.content AS resume_text",
+    "job_description": "j.content AS job_description",
+    "raw_output": "m.raw_output",
+    "score": "m.score",
+    "summary": "m.summary",
+    "highlights": "m.highlights"
+}
+
+# Fields /history can project. id and timestamp are always selected
+# because they form the pagination key.
+HISTORY_FIELDS = tuple(HISTORY_FIELD_SQL)
+HISTORY_KEY_FIELDS = ("id", "timestamp")
+
+MATCH_COLUMNS = ",\n    ".join(HISTORY_FIELD_SQL.values())
+
+RESUME_JOIN_SQL = "LEFT JOIN documents r ON r.content_hash = m.resume_hash"
+JOB_JOIN_SQL = "LEFT JOIN documents j ON j.content_hash = m.job_hash"
+
+SELECT_MATCH_SQL = f"""
+SELECT {MATCH_COLUMNS}
+FROM match_history m
+{RESUME_JOIN_SQL}
+{JOB_JOIN_SQL}
+WHERE m.id = ?
+"""
+
+SELECT_CACHED_MATCH_SQL = """
+SELECT created_at, raw_output, parsed_output
+FROM match_cache
+WHERE cache_key = ?
+"""
+
+UPSERT_CACHED_MATCH_SQL = """
+INSERT OR REPLACE INTO match_cache (cache_key, created_at, raw_output, parsed_output)
+VALUES (?, ?, ?, ?)
+"""
+
+SELECT_EXTRACTED_TEXT_SQL = """
+SELECT created_at, content
+FROM extract_cache
+WHERE cache_key = ?
+"""
+
+UPSERT_EXTRACTED_TEXT_SQL = """
+INSERT OR REPLACE INTO extract_cache (cache_key, created_at, content)
+VALUES (?, ?, ?)
+"""
+
+# One row per distinct job description, so the cost follows unique
+# documents rather than match count
+SELECT_JOB_DESCRIPTIONS_SQL = """
+SELECT latest.id, d.content, latest.timestamp
+FROM (
+    SELECT job_hash, max(id) AS id, max(timestamp) AS timestamp
+    FROM match_history
+    WHERE timestamp >= ? AND job_hash IS NOT NULL
+    GROUP BY job_hash
+) latest
+JOIN documents d ON d.content_hash = latest.job_hash
+ORDER BY latest.timestamp
+"""
+
+MATCH_HISTORY_SCHEMA = """
+    id INTEGER PRIMARY KEY,
+    timestamp TIMESTAMP,
+    resume_hash TEXT,
+    job_hash TEXT,
+    raw_output TEXT,
+    score INTEGER,
+    summary TEXT,
+    highlights JSON
+"""
+
+# Background match jobs. Texts are stored in documents like match results.
+MATCH_JOB_FIELDS = (
+    "id", "status", "mode", "callback_url", "attempts", "max_attempts",
+    "run_after", "created_at", "updated_at", "match_id", "error"
+)
+
+SELECT_MATCH_JOB_SQL = f"""
+SELECT {", ".join(MATCH_JOB_FIELDS)}
+FROM match_jobs
+WHERE id = ?
+"""
+
+# Takes the oldest due jobs, and running jobs whose worker stopped renewing
+# their lease, and marks them running in one statement
+CLAIM_MATCH_JOBS_SQL = """
+UPDATE match_jobs
+SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ?
+WHERE id IN (
+    SELECT id
+    FROM match_jobs
+    WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_until < ?)
+    ORDER BY run_after, id
+    LIMIT ?
+)
+RETURNING id, mode, resume_hash, job_hash, callback_url, attempts, max_attempts
+"""
+
+# Chat sessions, one per match, see app/chat.py
+SELECT_CHAT_SESSION_SQL = """
+SELECT summary, summarized_turns, turns
+FROM chat_sessions
+WHERE match_id = ?
+"""
+
+UPSERT_CHAT_SESSION_SQL = """
+INSERT OR REPLACE INTO chat_sessions (match_id, summary, summarized_turns, turns, updated_at)
+VALUES (?, ?, ?, ?, ?)
+"""
 
 # Create tables if they don't exist
 def init_db():
-    """Initialize the database by creating necessary tables if they don't exist."""
+    """
+    Initialize the database by creating necessary tables if they don't exist.
+    
+    Called once when the application starts, or in the database server
+    in the multi-worker mode. Databases from before document
+    deduplication are migrated in place.
+    """
+    if db_client is not None:
+        return
+    
+    # Resume and job texts, stored once per distinct content
     conn.execute("""
-    CREATE TABLE IF NOT EXISTS match_history (
-        id INTEGER PRIMARY KEY,
-        timestamp TIMESTAMP,
-        resume_text TEXT,
-        job_description TEXT,
-        raw_output TEXT,
-        score INTEGER,
-        summary TEXT,
-        highlights JSON
+    CREATE TABLE IF NOT EXISTS documents (
+        content_hash TEXT PRIMARY KEY,
+        content TEXT,
+        created_at TIMESTAMP
     )
     """)
     
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS match_history ({MATCH_HISTORY_SCHEMA})
+    """)
+    
     # Create a sequence for auto-incrementing IDs if it doesn't exist
     conn.execute("""
     CREATE SEQUENCE IF NOT EXISTS match_history_id_seq
     """)
+    
+    migrate_inline_documents(conn)
+    
+    # Keyset pagination of the history needs no index: rows are appended in
+    # timestamp order, so the min/max zone maps of each row group prune the
+    # timestamp range. DuckDB's ART indexes only serve point lookups, so
+    # the one earlier versions created only slowed down writes.
+    conn.execute("""
+    DROP INDEX IF EXISTS match_history_timestamp_id_idx
+    """)
+    
+    # Persistent tier of the match result cache, keyed by content hash
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS match_cache (
+        cache_key TEXT PRIMARY KEY,
+        created_at TIMESTAMP,
+        raw_output TEXT,
+        parsed_output JSON
+    )
+    """)
+    
+    # Persistent tier of the extracted text cache, see app/ingest.py
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS extract_cache (
+        cache_key TEXT PRIMARY KEY,
+        created_at TIMESTAMP,
+        content TEXT
+    )
+    """)
+    
+    # Queue of background match jobs, see app/jobs.py
+    conn.execute("""
+    CREATE SEQUENCE IF NOT EXISTS match_jobs_id_seq
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS match_jobs (
+        id INTEGER PRIMARY KEY,
+        status TEXT,
+        mode TEXT,
+        resume_hash TEXT,
+        job_hash TEXT,
+        callback_url TEXT,
+        attempts INTEGER,
+        max_attempts INTEGER,
+        run_after TIMESTAMP,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        match_id INTEGER,
+        error TEXT,
+        lease_until TIMESTAMP
+    )
+    """)
+    # Until when the worker running a job holds it, see claim_match_jobs
+    conn.execute("""
+    ALTER TABLE match_jobs ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS match_jobs_status_idx ON match_jobs (status, run_after)
+    """)
+    
+    # Chat history per match: the rolling summary and the recent turns
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS chat_sessions (
+        match_id INTEGER PRIMARY KEY,
+        summary TEXT,
+        summarized_turns INTEGER,
+        turns JSON,
+        updated_at TIMESTAMP
+    )
+    """)
+    
+    # Jobs that were running when the last process stopped start over
+    conn.execute("""
+    UPDATE match_jobs SET status = 'queued' WHERE status = 'running'
+    """)
+
+def migrate_inline_documents(db: duckdb.DuckDBPyConnection) -> bool:
+    """
+    Move resume and job texts stored inline in match_history to documents.
+    
+    Rebuilds match_history with hash references in one transaction, since
+    DuckDB cannot drop columns that an index depends on. Expects the
+    documents table and match_history_id_seq to exist.
+    
+    Args:
+        db: Connection to the database to migrate
+    
+    Returns:
+        True if a migration ran
+    """
+    columns = {
+        row[0] for row in db.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'match_history'"
+        ).fetchall()
+    }
+    if "resume_text" not in columns:
+        return False
+    
+    db.execute("BEGIN TRANSACTION")
+    try:
+        # sha256() in DuckDB matches hash_document for the same text
+        db.execute("""
+        INSERT OR IGNORE INTO documents (content_hash, content, created_at)
+        SELECT sha256(content), content, now()
+        FROM (
+            SELECT resume_text AS content FROM match_history
+            UNION
+            SELECT job_description FROM match_history
+        )
+        WHERE content IS NOT NULL
+        """)
+        db.execute(f"CREATE TABLE match_history_migrated ({MATCH_HISTORY_SCHEMA})")
+        # Older databases can hold rows sharing an ID; all but the
+        # earliest get a fresh one
+        db.execute("""
+        INSERT INTO match_history_migrated
+        SELECT
+            CASE WHEN id_rank = 1 THEN id ELSE nextval('match_history_id_seq') END,
+            timestamp, sha256(resume_text), sha256(job_description), raw_output, score, summary, highlights
+        FROM (
+            SELECT *, row_number() OVER (PARTITION BY id ORDER BY timestamp) AS id_rank
+            FROM match_history
+        )
+        """)
+        db.execute("DROP TABLE match_history")
+        db.execute("ALTER TABLE match_history_migrated RENAME TO match_history")
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    
+    return True
+
+def close_db():
+    """Close the per-thread cursors, the thread pool and the connection."""
+    if db_client is not None:
+        db_client.close()
+        return
+    _executor.shutdown(wait=True)
+    with _cursors_lock:
+        for cursor in _cursors:
+            cursor.close()
+        _cursors.clear()
+    conn.close()
+
+def _get_cursor() -> duckdb.DuckDBPyConnection:
+    """Return the cursor owned by the current pool thread, creating it on first use."""
+    cursor = getattr(_local, "cursor", None)
+    if cursor is None:
+        cursor = conn.cursor()
+        _local.cursor = cursor
+        with _cursors_lock:
+            _cursors.append(cursor)
+    return cursor
+
+async def run_in_db(func: Callable[[duckdb.DuckDBPyConnection], T]) -> T:
+    """
+    Run a function against a DuckDB cursor on the database thread pool.
+    
+    Args:
+        func: Function taking the thread's cursor
+    
+    Returns:
+        Whatever func returns
+    """
+    # Timed by the calling function's name, e.g. "get_match_history"
+    operation = func.__qualname__.split(".<locals>")[0]
+    
+    def run() -> T:
+        start = time.perf_counter()
+        try:
+            return func(_get_cursor())
+        finally:
+            DB_DURATION.observe(time.perf_counter() - start, operation)
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, run)
+
+def hash_document(text: Optional[str]) -> Optional[str]:
+    """Return the content hash a text is stored under in documents."""
+    if text is None:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _match_highlights(parsed_output: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Return the highlights stored for a match.
+    
+    Results in the current format are stored as highlights too (strengths as
+    "match", gaps as "gap") so analytics can unnest both formats alike.
+    """
+    if "highlights" in parsed_output:
+        return parsed_output["highlights"]
+    
+    return (
+        [{"type": "match", "description": strength} for strength in parsed_output.get("strengths", [])]
+        + [{"type": "gap", "description": gap} for gap in parsed_output.get("gaps", [])]
+    )
+
+def _match_record_values(
+    resume_text: str,
+    job_description: str,
+    raw_output: str,
+    parsed_output: Optional[Dict[str, Any]]
+) -> tuple:
+    """Build the match_history column values for one match result."""
+    # Extract fields from parsed_output if available
+    score = None
+    summary = None
+    highlights = None
+    
+    if parsed_output:
+        score = parsed_output.get("score")
+        summary = parsed_output.get("summary")
+        highlights = json.dumps(_match_highlights(parsed_output))
+    
+    return (
+        datetime.now(),
+        hash_document(resume_text),
+        hash_document(job_description),
+        raw_output,
+        score,
+        summary,
+        highlights
+    )
 
+def _row_to_fields(row: tuple, fields: tuple) -> Dict[str, Any]:
+    """Convert a match_history row selected with the given columns to a dictionary."""
+    record = dict(zip(fields, row))
+    if "timestamp" in record:
+        record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+    if "highlights" in record:
+        record["highlights"] = json.loads(record["highlights"]) if record["highlights"] else []
+    return record
+
+def _row_to_match(row: tuple) -> Dict[str, Any]:
+    """Convert a match_history row selected with MATCH_COLUMNS to a dictionary."""
+    return _row_to_fields(row, HISTORY_FIELDS)
+
+@db_operation
 async def store_match_result(
-    resume_text: str, 
-    job_description: str, 
-    raw_output: str, 
+    resume_text: str,
+    job_description: str,
+    raw_output: str,
     parsed_output: Optional[Dict[str, Any]] = None
 ) -> int:
     """
@@ -47,135 +476,751 @@ async def store_match_result(
         job_description: The job description text
         raw_output: The raw output from OpenAI
         parsed_output: The parsed JSON output (optional)
-        
+    
     Returns:
         The ID of the inserted record
     """
-    # Initialize the database if needed
-    init_db()
+    match_ids = await store_match_results([{
+        "resume_text": resume_text,
+        "job_description": job_description,
+        "raw_output": raw_output,
+        "parsed_output": parsed_output
+    }])
+    return match_ids[0]
+
+def _insert_documents(cursor: duckdb.DuckDBPyConnection, texts: List[Optional[str]], now: datetime) -> None:
+    """Add the texts not yet in documents with one multi-row insert."""
+    documents: Dict[str, str] = {}
+    for text in texts:
+        if text is not None:
+            documents.setdefault(hash_document(text), text)
+    if not documents:
+        return
     
-    # Extract fields from parsed_output if available
-    score = None
-    summary = None
-    highlights = None
+    params = []
+    for content_hash, content in documents.items():
+        params.extend((content_hash, content, now))
+    cursor.execute(f"""
+    INSERT OR IGNORE INTO documents (content_hash, content, created_at)
+    VALUES {", ".join(["(?, ?, ?)"] * len(documents))}
+    """, params)
+
+def _insert_match_records(cursor: duckdb.DuckDBPyConnection, records: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert match records and their documents.
     
-    if parsed_output:
-        score = parsed_output.get("score")
-        summary = parsed_output.get("summary")
-        highlights = json.dumps(parsed_output.get("highlights", []))
+    The caller holds _write_lock and an open transaction.
     
-    # Insert the record
-    conn.execute("""
+    Returns:
+        The IDs of the inserted records, in the same order as records
+    """
+    now = datetime.now()
+    _insert_documents(
+        cursor,
+        [text for record in records for text in (record["resume_text"], record["job_description"])],
+        now
+    )
+    
+    params = []
+    rows = []
+    for record in records:
+        # Records queued by MatchWriter carry an ID reserved with reserve_match_ids
+        if record.get("id") is not None:
+            params.append(record["id"])
+            rows.append("(?, ?, ?, ?, ?, ?, ?, ?)")
+        else:
+            rows.append("(nextval('match_history_id_seq'), ?, ?, ?, ?, ?, ?, ?)")
+        params.extend(_match_record_values(
+            record["resume_text"],
+            record["job_description"],
+            record["raw_output"],
+            record.get("parsed_output")
+        ))
+    placeholders = ", ".join(rows)
+    result = cursor.execute(f"""
     INSERT INTO match_history (
-        id, timestamp, resume_text, job_description, raw_output, score, summary, highlights
-    ) VALUES (
-        nextval('match_history_id_seq'), ?, ?, ?, ?, ?, ?, ?
+        id, timestamp, resume_hash, job_hash, raw_output, score, summary, highlights
+    ) VALUES {placeholders}
+    RETURNING id
+    """, params).fetchall()
+    return [row[0] for row in result]
+
+def _in_transaction(write: Callable[[duckdb.DuckDBPyConnection], T]) -> Callable[[duckdb.DuckDBPyConnection], T]:
+    """Wrap a function for run_in_db so it runs in a transaction while holding _write_lock."""
+    @functools.wraps(write)
+    def run(cursor: duckdb.DuckDBPyConnection) -> T:
+        with _write_lock:
+            cursor.execute("BEGIN TRANSACTION")
+            try:
+                result = write(cursor)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return result
+    return run
+
+@db_operation
+async def reserve_match_ids(count: int) -> List[int]:
+    """
+    Take IDs for match records from match_history_id_seq without writing them.
+    
+    Lets the background writer hand out a record's ID before the record
+    is stored. IDs that are never used leave gaps, as for any sequence.
+    
+    Args:
+        count: Number of IDs to reserve
+    
+    Returns:
+        The reserved IDs
+    """
+    rows = await run_in_db(
+        lambda cursor: cursor.execute("SELECT nextval('match_history_id_seq') FROM range(?)", [count]).fetchall()
     )
-    """, (
-        datetime.now(), 
-        resume_text, 
-        job_description, 
-        raw_output, 
-        score, 
-        summary, 
-        highlights
-    ))
+    return [row[0] for row in rows]
+
+@db_operation
+async def store_match_results(records: List[Dict[str, Any]]) -> List[int]:
+    """
+    Store several match results in one transaction.
+    
+    Texts not yet in documents are added with one multi-row insert, and
+    the match rows, which reference them by hash, with another.
+    
+    Args:
+        records: Dictionaries with resume_text, job_description, raw_output
+            and parsed_output keys, and optionally an id from reserve_match_ids
+    
+    Returns:
+        The IDs of the inserted records, in the same order as records
+    """
+    if not records:
+        return []
     
-    # Get the ID of the inserted record
-    result = conn.execute("SELECT currval('match_history_id_seq')").fetchone()
-    return result[0] if result else None
+    return await run_in_db(_in_transaction(lambda cursor: _insert_match_records(cursor, records)))
 
-async def get_match_history(limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+def encode_history_cursor(timestamp: str, match_id: int) -> str:
     """
-    Get the match history from the database.
+    Build the opaque cursor pointing just past a history record.
+    
+    Args:
+        timestamp: The record's timestamp in ISO format
+        match_id: The record's ID
+    
+    Returns:
+        URL-safe cursor string
+    """
+    return base64.urlsafe_b64encode(f"{timestamp}|{match_id}".encode("utf-8")).decode("ascii")
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor made by encode_history_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, match_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(timestamp), int(match_id)
+    except Exception:
+        raise ValueError("Invalid history cursor")
+
+def parse_history_fields(fields: Optional[str]) -> tuple:
+    """
+    Turn a comma-separated field list into the columns to select.
+    
+    Args:
+        fields: Field names, e.g. "score,summary"; None or empty selects all
+    
+    Returns:
+        Tuple of column names in HISTORY_FIELDS order, always including
+        id and timestamp
+    
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    if not fields:
+        return HISTORY_FIELDS
+    
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(HISTORY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown history fields: {', '.join(sorted(unknown))}")
+    
+    requested.update(HISTORY_KEY_FIELDS)
+    return tuple(name for name in HISTORY_FIELDS if name in requested)
+
+def _history_select(fields: tuple) -> str:
+    """Build the SELECT ... FROM part of a history query for a column projection."""
+    joins = []
+    if "resume_text" in fields:
+        joins.append(RESUME_JOIN_SQL)
+    if "job_description" in fields:
+        joins.append(JOB_JOIN_SQL)
+    
+    return f"""
+    SELECT {", ".join(HISTORY_FIELD_SQL[name] for name in fields)}
+    FROM match_history m
+    {" ".join(joins)}
+    """
+
+@functools.lru_cache(maxsize=64)
+def _history_sql(fields: tuple, keyset: bool) -> str:
+    """Build the history query for a column projection, cached per shape."""
+    # The plain timestamp bound lets DuckDB skip row groups before
+    # evaluating the exact (timestamp, id) comparison
+    where = "WHERE m.timestamp <= ? AND (m.timestamp, m.id) < (?, ?)" if keyset else ""
+    return f"""
+    {_history_select(fields)}
+    {where}
+    ORDER BY m.timestamp DESC, m.id DESC
+    LIMIT ? OFFSET ?
+    """
+
+def _history_range_sql(
+    fields: tuple,
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> Tuple[str, List[Any]]:
+    """
+    Build an unordered history query for a time range.
+    
+    Leaving out ORDER BY lets DuckDB stream the rows instead of sorting the
+    whole range first, so the rows come back in no particular order.
+    """
+    conditions = []
+    params: List[Any] = []
+    if since is not None:
+        conditions.append("m.timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("m.timestamp < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{_history_select(fields)} {where}", params
+
+@db_operation
+async def get_match_history(
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[tuple] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get the match history from the database, newest first.
+    
+    Pass the cursor of the last record seen (see encode_history_cursor)
+    to page by key instead of by offset; keyset pages cost the same at
+    any depth.
     
     Args:
         limit: Maximum number of records to return
         offset: Number of records to skip
-        
+        cursor: Only return records older than this cursor (optional)
+        fields: Columns to return, as from parse_history_fields (default: all)
+    
     Returns:
         List of match history records
+    
+    Raises:
+        ValueError: If the cursor is malformed
     """
-    # Initialize the database if needed
-    init_db()
-    
-    # Query the database
-    result = conn.execute("""
-    SELECT 
-        id, 
-        timestamp, 
-        resume_text, 
-        job_description, 
-        raw_output, 
-        score, 
-        summary, 
-        highlights
-    FROM match_history
-    ORDER BY timestamp DESC
-    LIMIT ? OFFSET ?
-    """, (limit, offset)).fetchall()
+    fields = fields or HISTORY_FIELDS
+    params: list = []
+    if cursor:
+        timestamp, match_id = decode_history_cursor(cursor)
+        params.extend([timestamp, timestamp, match_id])
+    params.extend([limit, offset])
+    sql = _history_sql(fields, bool(cursor))
     
-    # Convert the result to a list of dictionaries
-    history = []
-    for row in result:
-        highlights_json = row[7]
-        highlights = json.loads(highlights_json) if highlights_json else []
-        
-        history.append({
-            "id": row[0],
-            "timestamp": row[1].isoformat() if row[1] else None,
-            "resume_text": row[2],
-            "job_description": row[3],
-            "raw_output": row[4],
-            "score": row[5],
-            "summary": row[6],
-            "highlights": highlights
-        })
-    
-    return history
+    def query(db_cursor):
+        result = db_cursor.execute(sql, params).fetchall()
+        return [_row_to_fields(row, fields) for row in result]
+    
+    return await run_in_db(query)
+
+@db_operation
+async def iter_history_batches(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[tuple] = None,
+    batch_size: int = 1000
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Stream the match history in a time range, a batch of records at a time.
+    
+    The query runs on a cursor of its own, so only one batch is held in
+    memory however many rows match.
+    
+    Args:
+        since: Only include records at or after this time (optional)
+        until: Only include records before this time (optional)
+        fields: Columns to return, as from parse_history_fields (default: all)
+        batch_size: Number of records per batch
+    
+    Yields:
+        Lists of match history records
+    """
+    fields = fields or HISTORY_FIELDS
+    sql, params = _history_range_sql(fields, since, until)
+    loop = asyncio.get_running_loop()
+    
+    cursor = await loop.run_in_executor(_executor, conn.cursor)
+    try:
+        await loop.run_in_executor(_executor, lambda: cursor.execute(sql, params))
+        while True:
+            rows = await loop.run_in_executor(_executor, cursor.fetchmany, batch_size)
+            if not rows:
+                break
+            yield [_row_to_fields(row, fields) for row in rows]
+    finally:
+        cursor.close()
+
+@db_operation
+async def copy_history_to_parquet(
+    path: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[tuple] = None,
+    row_group_size: int = 10000
+) -> None:
+    """
+    Write the match history in a time range to a Parquet file.
+    
+    Uses DuckDB's COPY, which streams rows to the file one row group at
+    a time.
+    
+    Args:
+        path: Destination file path
+        since: Only include records at or after this time (optional)
+        until: Only include records before this time (optional)
+        fields: Columns to write, as from parse_history_fields (default: all)
+        row_group_size: Rows per Parquet row group; bounds writer memory
+    """
+    sql, params = _history_range_sql(fields or HISTORY_FIELDS, since, until)
+    target = path.replace("'", "''")
+    copy_sql = f"COPY ({sql}) TO '{target}' (FORMAT PARQUET, ROW_GROUP_SIZE {int(row_group_size)})"
+    await run_in_db(lambda cursor: cursor.execute(copy_sql, params))
 
+@db_operation
 async def get_match_by_id(match_id: int) -> Optional[Dict[str, Any]]:
     """
     Get a specific match record by ID.
     
     Args:
         match_id: The ID of the match record
-        
+    
     Returns:
         The match record or None if not found
     """
-    # Initialize the database if needed
-    init_db()
-    
-    # Query the database
-    result = conn.execute("""
-    SELECT 
-        id, 
-        timestamp, 
-        resume_text, 
-        job_description, 
-        raw_output, 
-        score, 
-        summary, 
-        highlights
-    FROM match_history
-    WHERE id = ?
-    """, (match_id,)).fetchone()
+    def query(cursor):
+        result = cursor.execute(SELECT_MATCH_SQL, (match_id,)).fetchone()
+        return _row_to_match(result) if result else None
+    
+    return await run_in_db(query)
+
+@db_operation
+async def get_cached_match(cache_key: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get a cached match result by its content key.
+    
+    Args:
+        cache_key: The content hash of the match inputs
+        max_age_seconds: Ignore entries older than this (optional)
+    
+    Returns:
+        Dictionary with raw_output and parsed_output, or None on a miss
+    """
+    result = await run_in_db(
+        lambda cursor: cursor.execute(SELECT_CACHED_MATCH_SQL, (cache_key,)).fetchone()
+    )
     
     if not result:
         return None
     
-    # Convert the result to a dictionary
-    highlights_json = result[7]
-    highlights = json.loads(highlights_json) if highlights_json else []
+    if max_age_seconds is not None and result[0] is not None:
+        if (datetime.now() - result[0]).total_seconds() > max_age_seconds:
+            return None
     
     return {
-        "id": result[0],
-        "timestamp": result[1].isoformat() if result[1] else None,
-        "resume_text": result[2],
-        "job_description": result[3],
-        "raw_output": result[4],
-        "score": result[5],
-        "summary": result[6],
-        "highlights": highlights
+        "raw_output": result[1],
+        "parsed_output": json.loads(result[2]) if result[2] else None
     }
+
+@db_operation
+async def store_cached_match(
+    cache_key: str,
+    raw_output: str,
+    parsed_output: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Store a match result in the persistent cache.
+    
+    Args:
+        cache_key: The content hash of the match inputs
+        raw_output: The raw output from OpenAI
+        parsed_output: The parsed JSON output
+    """
+    values = (
+        cache_key,
+        datetime.now(),
+        raw_output,
+        json.dumps(parsed_output) if parsed_output is not None else None
+    )
+    # Concurrent upserts of one key conflict unless they are serialized
+    await run_in_db(_in_transaction(lambda cursor: cursor.execute(UPSERT_CACHED_MATCH_SQL, values)))
+
+@db_operation
+async def get_extracted_text(cache_key: str, max_age_seconds: Optional[float] = None) -> Optional[str]:
+    """
+    Get the cached text of an uploaded file.
+    
+    Args:
+        cache_key: The file's content hash, extension and page limit
+        max_age_seconds: Ignore entries older than this (optional)
+    
+    Returns:
+        The extracted text, or None on a miss
+    """
+    result = await run_in_db(
+        lambda cursor: cursor.execute(SELECT_EXTRACTED_TEXT_SQL, (cache_key,)).fetchone()
+    )
+    
+    if not result:
+        return None
+    
+    if max_age_seconds is not None and result[0] is not None:
+        if (datetime.now() - result[0]).total_seconds() > max_age_seconds:
+            return None
+    
+    return result[1]
+
+@db_operation
+async def store_extracted_text(cache_key: str, text: str) -> None:
+    """
+    Store the extracted text of an uploaded file in the persistent cache.
+    
+    Args:
+        cache_key: The file's content hash, extension and page limit
+        text: The extracted text
+    """
+    values = (cache_key, datetime.now(), text)
+    await run_in_db(_in_transaction(lambda cursor: cursor.execute(UPSERT_EXTRACTED_TEXT_SQL, values)))
+
+@db_operation
+async def get_job_descriptions_since(since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Get job descriptions from matches stored at or after a given time.
+    
+    Filters on the timestamp, which is taken under the write lock, rather
+    than the ID: IDs reserved by the background writer can be stored out
+    of order.
+    
+    Args:
+        since: Only return records with this or a later timestamp (optional)
+    
+    Returns:
+        List of dictionaries with id, job_description and timestamp, the
+        latest match per job description, ordered by timestamp
+    """
+    result = await run_in_db(
+        lambda cursor: cursor.execute(SELECT_JOB_DESCRIPTIONS_SQL, (since or datetime.min,)).fetchall()
+    )
+    return [{"id": row[0], "job_description": row[1], "timestamp": row[2]} for row in result]
+
+def _row_to_match_job(row: tuple) -> Dict[str, Any]:
+    job = dict(zip(MATCH_JOB_FIELDS, row))
+    for field in ("run_after", "created_at", "updated_at"):
+        if job[field] is not None:
+            job[field] = job[field].isoformat()
+    return job
+
+@db_operation
+async def create_match_job(
+    resume_text: str,
+    job_description: str,
+    mode: str = "llm",
+    callback_url: Optional[str] = None,
+    max_attempts: int = 3
+) -> int:
+    """
+    Queue a match job.
+    
+    Args:
+        resume_text: The resume text
+        job_description: The job description text
+        mode: "llm" or "fast"
+        callback_url: URL notified when the job finishes (optional)
+        max_attempts: How many times the job is tried before it fails
+    
+    Returns:
+        The ID of the new job
+    """
+    now = datetime.now()
+    
+    def write(cursor):
+        _insert_documents(cursor, [resume_text, job_description], now)
+        return cursor.execute("""
+        INSERT INTO match_jobs (
+            id, status, mode, resume_hash, job_hash, callback_url,
+            attempts, max_attempts, run_after, created_at, updated_at
+        ) VALUES (nextval('match_jobs_id_seq'), 'queued', ?, ?, ?, ?, 0, ?, ?, ?, ?)
+        RETURNING id
+        """, [
+            mode, hash_document(resume_text), hash_document(job_description), callback_url,
+            max_attempts, now, now, now
+        ]).fetchone()[0]
+    
+    return await run_in_db(_in_transaction(write))
+
+@db_operation
+async def claim_match_jobs(limit: int = 1, lease_seconds: float = 60) -> List[Dict[str, Any]]:
+    """
+    Mark the oldest due jobs as running and return them.
+    
+    The claiming worker holds each job for lease_seconds and has to renew
+    the lease with renew_match_job_lease while it runs. Jobs whose lease
+    expired, because their worker died or was recycled, are claimed
+    again as a new attempt.
+    
+    Args:
+        limit: Maximum number of jobs to claim
+        lease_seconds: How long the jobs are held without a renewal
+    
+    Returns:
+        Dictionaries with id, mode, resume_text, job_description,
+        callback_url, attempts and max_attempts. attempts identifies the
+        claim when the outcome is recorded.
+    """
+    now = datetime.now()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    
+    def claim(cursor):
+        rows = cursor.execute(CLAIM_MATCH_JOBS_SQL, [lease_until, now, now, now, limit]).fetchall()
+        hashes = list({content_hash for row in rows for content_hash in row[2:4]})
+        documents = {}
+        if hashes:
+            documents = dict(cursor.execute(f"""
+            SELECT content_hash, content
+            FROM documents
+            WHERE content_hash IN ({", ".join(["?"] * len(hashes))})
+            """, hashes).fetchall())
+        
+        return [
+            {
+                "id": job_id,
+                "mode": mode,
+                "resume_text": documents.get(resume_hash),
+                "job_description": documents.get(job_hash),
+                "callback_url": callback_url,
+                "attempts": attempts,
+                "max_attempts": max_attempts
+            }
+            for job_id, mode, resume_hash, job_hash, callback_url, attempts, max_attempts in rows
+        ]
+    
+    return await run_in_db(_in_transaction(claim))
+
+@db_operation
+async def renew_match_job_lease(job_id: int, attempt: int, lease_seconds: float) -> bool:
+    """
+    Extend the lease on a running job.
+    
+    Args:
+        job_id: ID of the job
+        attempt: attempts of the claim, as returned by claim_match_jobs
+        lease_seconds: Seconds from now the job is held for
+    
+    Returns:
+        False if the job was claimed again after the lease expired
+    """
+    now = datetime.now()
+    
+    def write(cursor):
+        return cursor.execute("""
+        UPDATE match_jobs
+        SET lease_until = ?
+        WHERE id = ? AND status = 'running' AND attempts = ?
+        RETURNING id
+        """, [now + timedelta(seconds=lease_seconds), job_id, attempt]).fetchone() is not None
+    
+    return await run_in_db(_in_transaction(write))
+
+@db_operation
+async def complete_match_job(job_id: int, record: Dict[str, Any], attempt: Optional[int] = None) -> Optional[int]:
+    """
+    Store a job's match result and mark the job succeeded, in one transaction.
+    
+    Args:
+        job_id: ID of the job
+        record: Dictionary with resume_text, job_description, raw_output
+            and parsed_output keys
+        attempt: Only record the result if the job is still held by this
+            claim, as returned by claim_match_jobs (optional)
+    
+    Returns:
+        The ID of the stored match record, or None if the job was claimed again
+    """
+    def write(cursor):
+        claimed = cursor.execute("""
+        UPDATE match_jobs
+        SET status = 'succeeded', error = NULL, updated_at = ?
+        WHERE id = ? AND (? IS NULL OR (status = 'running' AND attempts = ?))
+        RETURNING id
+        """, [datetime.now(), job_id, attempt, attempt]).fetchone()
+        if claimed is None:
+            return None
+        match_id = _insert_match_records(cursor, [record])[0]
+        cursor.execute("UPDATE match_jobs SET match_id = ? WHERE id = ?", [match_id, job_id])
+        return match_id
+    
+    return await run_in_db(_in_transaction(write))
+
+@db_operation
+async def fail_match_job(
+    job_id: int,
+    error: str,
+    retry_at: Optional[datetime] = None,
+    attempt: Optional[int] = None
+) -> bool:
+    """
+    Record a failed job attempt.
+    
+    Args:
+        job_id: ID of the job
+        error: Why the attempt failed
+        retry_at: Queue the job again from this time; None fails it for good
+        attempt: Only record the failure if the job is still held by this
+            claim, as returned by claim_match_jobs (optional)
+    
+    Returns:
+        False if the job was claimed again
+    """
+    def write(cursor):
+        return cursor.execute("""
+        UPDATE match_jobs
+        SET status = ?, run_after = coalesce(?, run_after), error = ?, updated_at = ?
+        WHERE id = ? AND (? IS NULL OR (status = 'running' AND attempts = ?))
+        RETURNING id
+        """, [
+            "queued" if retry_at else "failed", retry_at, error, datetime.now(), job_id, attempt, attempt
+        ]).fetchone() is not None
+    
+    return await run_in_db(_in_transaction(write))
+
+@db_operation
+async def get_match_job(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get a match job by ID.
+    
+    Args:
+        job_id: ID of the job
+    
+    Returns:
+        The job's status fields, or None if not found
+    """
+    def fetch(cursor):
+        return cursor.execute(SELECT_MATCH_JOB_SQL, [job_id]).fetchone()
+    
+    row = await run_in_db(fetch)
+    return _row_to_match_job(row) if row else None
+
+def _chat_session_state(row: Optional[tuple]) -> Dict[str, Any]:
+    if not row:
+        return {"summary": None, "summarized_turns": 0, "turns": []}
+    return {
+        "summary": row[0],
+        "summarized_turns": row[1] or 0,
+        "turns": json.loads(row[2]) if row[2] else []
+    }
+
+def _write_chat_session(cursor: duckdb.DuckDBPyConnection, match_id: int, state: Dict[str, Any]) -> None:
+    cursor.execute(UPSERT_CHAT_SESSION_SQL, (
+        match_id, state["summary"], state["summarized_turns"], json.dumps(state["turns"]), datetime.now()
+    ))
+
+@db_operation
+async def get_chat_session(match_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get the stored chat session of a match.
+    
+    Args:
+        match_id: ID of the match the conversation is about
+    
+    Returns:
+        Dictionary with summary, summarized_turns and turns, or None if
+        there is no session yet
+    """
+    row = await run_in_db(
+        lambda cursor: cursor.execute(SELECT_CHAT_SESSION_SQL, (match_id,)).fetchone()
+    )
+    return _chat_session_state(row) if row else None
+
+@db_operation
+async def append_chat_turn(match_id: int, turn: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Add a turn to the stored chat session of a match, creating it if needed.
+    
+    Reads and writes in one transaction, so turns added at the same time
+    by several worker processes are all kept.
+    
+    Args:
+        match_id: ID of the match the conversation is about
+        turn: Dictionary with user and assistant keys
+    
+    Returns:
+        The session as stored now, with summary, summarized_turns and turns
+    """
+    def write(cursor):
+        state = _chat_session_state(cursor.execute(SELECT_CHAT_SESSION_SQL, (match_id,)).fetchone())
+        state["turns"].append(turn)
+        _write_chat_session(cursor, match_id, state)
+        return state
+    
+    return await run_in_db(_in_transaction(write))
+
+@db_operation
+async def fold_chat_turns(
+    match_id: int,
+    summarized_turns: int,
+    count: int,
+    summary: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Replace the oldest turns of a stored chat session with a new summary.
+    
+    Args:
+        match_id: ID of the match the conversation is about
+        summarized_turns: The session's summarized_turns the summary was
+            written from; nothing is changed if it has moved on since
+        count: Number of turns the summary covers
+        summary: The new summary
+    
+    Returns:
+        The session as stored now, or None if it was changed or deleted
+        in the meantime
+    """
+    def write(cursor):
+        row = cursor.execute(SELECT_CHAT_SESSION_SQL, (match_id,)).fetchone()
+        state = _chat_session_state(row)
+        if row is None or state["summarized_turns"] != summarized_turns or len(state["turns"]) < count:
+            return None
+        state["summary"] = summary
+        state["summarized_turns"] += count
+        del state["turns"][:count]
+        _write_chat_session(cursor, match_id, state)
+        return state
+    
+    return await run_in_db(_in_transaction(write))
+
+@db_operation
+async def delete_chat_session(match_id: int) -> None:
+    """
+    Delete the chat session of a match.
+    
+    Args:
+        match_id: ID of the match the conversation is about
+    """
+    await run_in_db(
+        lambda cursor: cursor.execute("DELETE FROM chat_sessions WHERE match_id = ?", (match_id,))
+    )
@@ -0,0 +1,253 @@
+import os
+import hmac
+import pickle
+import signal
+import struct
+import asyncio
+import logging
+import itertools
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Every frame is a 4-byte big-endian length followed by the payload. The
+# first frame of a connection is the shared key; all later ones are pickled
+# messages, which are only read once the key has been checked.
+_HEADER = struct.Struct("!I")
+
+# Requests are (request_id, kind, name, args, kwargs), where kind is:
+#   "call": await the operation and return its result
+#   "iter": start an async generator operation, kept under request_id
+#   "next": return (done, item) from the generator with ID args[0]
+#   "close": close the generator with ID args[0]
+# Responses are (request_id, ok, result or exception).
+Request = Tuple[int, str, Optional[str], tuple, dict]
+
+async def _read_raw(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_HEADER.size)
+    return await reader.readexactly(_HEADER.unpack(header)[0])
+
+def _write_raw(writer: asyncio.StreamWriter, payload: bytes) -> None:
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+async def _read_message(reader: asyncio.StreamReader) -> Any:
+    return pickle.loads(await _read_raw(reader))
+
+def _write_message(writer: asyncio.StreamWriter, message: Any) -> None:
+    _write_raw(writer, pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+class DatabaseServer:
+    """
+    Runs database operations for the worker processes.
+    
+    Runs in the one process that opens the DuckDB file; workers connect
+    over a Unix socket and call the functions registered with
+    db_operation by name. Each request runs in its own task, so
+    operations from all workers share the database thread pool just as
+    requests of a single process do.
+    """
+    
+    def __init__(self, operations: Dict[str, Callable], key: str):
+        self.operations = operations
+        self.key = key.encode("utf-8")
+        self.stats = {
+            "connections": 0,
+            "requests": 0,
+            "errors": 0
+        }
+    
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one worker connection until it closes."""
+        try:
+            key = await _read_raw(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        if not hmac.compare_digest(key, self.key):
+            logger.warning("Rejected a database connection with the wrong key")
+            writer.close()
+            return
+        
+        self.stats["connections"] += 1
+        iterators: Dict[int, AsyncIterator[Any]] = {}
+        tasks: Set["asyncio.Task[None]"] = set()
+        try:
+            while True:
+                request = await _read_message(reader)
+                task = asyncio.create_task(self._run(writer, iterators, request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            for iterator in iterators.values():
+                await iterator.aclose()
+            writer.close()
+    
+    async def _run(self, writer: asyncio.StreamWriter, iterators: Dict[int, AsyncIterator[Any]], request: Request) -> None:
+        request_id, kind, name, args, kwargs = request
+        self.stats["requests"] += 1
+        try:
+            if kind == "call":
+                result = await self.operations[name](*args, **kwargs)
+            elif kind == "iter":
+                iterators[request_id] = self.operations[name](*args, **kwargs)
+                result = None
+            elif kind == "next":
+                try:
+                    result = (False, await iterators[args[0]].__anext__())
+                except StopAsyncIteration:
+                    del iterators[args[0]]
+                    result = (True, None)
+            else:
+                await iterators.pop(args[0]).aclose()
+                result = None
+            response = (request_id, True, result)
+        except Exception as e:
+            self.stats["errors"] += 1
+            response = (request_id, False, e)
+        
+        try:
+            _write_message(writer, response)
+        except Exception as e:
+            # E.g. an exception type that cannot be pickled
+            _write_message(writer, (request_id, False, RuntimeError(f"{type(e).__name__}: {e}")))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+class DatabaseClient:
+    """
+    A worker process's connection to the database server.
+    
+    One connection per process carries all concurrent calls; responses
+    are matched to their callers by request ID. The connection is opened
+    on first use and again after it was lost.
+    """
+    
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.key = key.encode("utf-8")
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._listener: Optional["asyncio.Task[None]"] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[int, "asyncio.Future[Any]"] = {}
+        self._ids = itertools.count()
+    
+    async def _connect(self) -> asyncio.StreamWriter:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._writer = None
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                _write_raw(writer, self.key)
+                self._writer = writer
+                self._listener = asyncio.create_task(self._listen(reader))
+            return self._writer
+    
+    async def _listen(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                request_id, ok, value = await _read_message(reader)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Lost the connection to the database server"))
+    
+    async def _send(self, kind: str, name: Optional[str], args: tuple, kwargs: dict) -> Tuple[int, "asyncio.Future[Any]"]:
+        writer = await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        _write_message(writer, (request_id, kind, name, args, kwargs))
+        await writer.drain()
+        return request_id, future
+    
+    async def call(self, name: str, args: tuple, kwargs: dict) -> Any:
+        """Run an operation on the server and return its result."""
+        _, future = await self._send("call", name, args, kwargs)
+        return await future
+    
+    async def iterate(self, name: str, args: tuple, kwargs: dict) -> AsyncIterator[Any]:
+        """Run an async generator operation on the server, fetching one item at a time."""
+        iterator_id, future = await self._send("iter", name, args, kwargs)
+        await future
+        done = False
+        try:
+            while not done:
+                _, future = await self._send("next", None, (iterator_id,), {})
+                done, item = await future
+                if not done:
+                    yield item
+        finally:
+            if not done and self._writer is not None:
+                _, future = await self._send("close", None, (iterator_id,), {})
+                await future
+    
+    def close(self) -> None:
+        """Close the connection; calls still waiting fail."""
+        if self._writer is not None:
+            self._writer.close()
+        if self._listener is not None:
+            self._listener.cancel()
+
+async def _serve(path: str, key: str, operations: Dict[str, Callable]) -> None:
+    server = DatabaseServer(operations, key)
+    # Requests are unpickled, so the socket is created accessible to this
+    # user only, rather than restricted after binding
+    umask = os.umask(0o077)
+    try:
+        unix_server = await asyncio.start_unix_server(server.handle, path)
+    finally:
+        os.umask(umask)
+    
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    async with unix_server:
+        await stop.wait()
+    logger.info("Database server stopping after %d requests", server.stats["requests"])
+
+def serve_database(path: str, key: str) -> None:
+    """
+    Entry point of the database server process started by app/serve.py.
+    
+    Opens the database read-write, serves the workers on a Unix socket at
+    path and closes the database on SIGTERM. Ctrl+C is left to the
+    workers, which flush their queued writes here before the launcher
+    stops this process.
+    
+    Args:
+        path: Path of the Unix socket
+        key: Key every worker sends first
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The workers' setting must not turn this process into a client
+    os.environ.pop("DB_SOCKET", None)
+    # Importing registers the operations of both modules
+    from app import database, analytics
+    
+    database.init_db()
+    try:
+        asyncio.run(_serve(path, key, database.DB_OPERATIONS))
+    finally:
+        database.close_db()
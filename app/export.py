@@ -0,0 +1,79 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+from app.database import iter_history_batches, copy_history_to_parquet
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Export settings
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "10000"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", str(1024 * 1024)))
+
+EXPORT_FORMATS = ("ndjson", "parquet")
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+async def stream_history_ndjson(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[tuple] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream the match history as newline-delimited JSON.
+    
+    Each chunk holds one batch of EXPORT_BATCH_SIZE records.
+    
+    Args:
+        since: Only include records at or after this time (optional)
+        until: Only include records before this time (optional)
+        fields: Columns to export, as from parse_history_fields (default: all)
+    
+    Yields:
+        Encoded NDJSON chunks
+    """
+    async for batch in iter_history_batches(since, until, fields, EXPORT_BATCH_SIZE):
+        yield "".join(json.dumps(record) + "\n" for record in batch).encode("utf-8")
+
+async def stream_history_parquet(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[tuple] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream the match history as a Parquet file.
+    
+    Parquet needs its footer written last, so DuckDB first writes the file
+    to a temporary directory, which is then sent in EXPORT_CHUNK_SIZE pieces
+    and removed.
+    
+    Args:
+        since: Only include records at or after this time (optional)
+        until: Only include records before this time (optional)
+        fields: Columns to export, as from parse_history_fields (default: all)
+    
+    Yields:
+        Chunks of the Parquet file
+    """
+    loop = asyncio.get_running_loop()
+    directory = tempfile.mkdtemp(prefix="history_export_")
+    try:
+        path = os.path.join(directory, "history.parquet")
+        await copy_history_to_parquet(path, since, until, fields, EXPORT_ROW_GROUP_SIZE)
+        
+        with open(path, "rb") as file:
+            while True:
+                chunk = await loop.run_in_executor(None, file.read, EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,254 @@
+import re
+import json
+from datetime import datetime
+from collections import Counter
+from typing import Dict, Any, List, Optional, Set, Tuple
+from app.prefilter import tokenize
+
+# Known skills and the terms (unigrams or bigrams from tokenize) that indicate them
+SKILLS: Dict[str, Tuple[str, ...]] = {
+    "Python": ("python",),
+    "Java": ("java",),
+    "JavaScript": ("javascript", "js"),
+    "TypeScript": ("typescript", "ts"),
+    "Go": ("golang", "go lang"),
+    "Rust": ("rust",),
+    "C++": ("c++", "cpp"),
+    "C#": ("c#", "csharp"),
+    "Ruby": ("ruby",),
+    "PHP": ("php",),
+    "Kotlin": ("kotlin",),
+    "Swift": ("swift",),
+    "Scala": ("scala",),
+    "R": ("r programming", "rstudio"),
+    "SQL": ("sql", "pl sql"),
+    "PostgreSQL": ("postgresql", "postgres"),
+    "MySQL": ("mysql",),
+    "MongoDB": ("mongodb", "mongo"),
+    "Redis": ("redis",),
+    "Elasticsearch": ("elasticsearch",),
+    "Kafka": ("kafka",),
+    "Spark": ("spark", "pyspark"),
+    "Airflow": ("airflow",),
+    "Hadoop": ("hadoop",),
+    "Snowflake": ("snowflake",),
+    "dbt": ("dbt",),
+    "Pandas": ("pandas",),
+    "NumPy": ("numpy",),
+    "TensorFlow": ("tensorflow",),
+    "PyTorch": ("pytorch",),
+    "scikit-learn": ("sklearn", "scikit learn"),
+    "Machine learning": ("machine learning", "ml"),
+    "Deep learning": ("deep learning",),
+    "NLP": ("nlp", "natural language"),
+    "Data analysis": ("data analysis", "data analytics"),
+    "Statistics": ("statistics", "statistical"),
+    "React": ("react", "react.js", "reactjs"),
+    "Angular": ("angular",),
+    "Vue": ("vue", "vue.js", "vuejs"),
+    "Node.js": ("node.js", "nodejs", "node"),
+    "Django": ("django",),
+    "Flask": ("flask",),
+    "FastAPI": ("fastapi",),
+    "Spring": ("spring", "spring boot"),
+    ".NET": ("dotnet", "asp.net", "vb.net"),
+    "HTML": ("html", "html5"),
+    "CSS": ("css", "css3", "sass", "tailwind"),
+    "GraphQL": ("graphql",),
+    "REST APIs": ("restful", "rest api", "rest apis", "restful api"),
+    "Microservices": ("microservices", "microservice"),
+    "AWS": ("aws", "amazon web"),
+    "Azure": ("azure",),
+    "GCP": ("gcp", "google cloud"),
+    "Docker": ("docker",),
+    "Kubernetes": ("kubernetes", "k8s"),
+    "Terraform": ("terraform",),
+    "Ansible": ("ansible",),
+    "CI/CD": ("ci cd", "cicd", "continuous integration", "continuous delivery"),
+    "Jenkins": ("jenkins",),
+    "GitHub Actions": ("github actions",),
+    "Git": ("git",),
+    "Linux": ("linux", "unix"),
+    "Bash": ("bash", "shell scripting"),
+    "Testing": ("unit testing", "test automation", "tdd", "pytest", "jest", "selenium"),
+    "Security": ("security", "cybersecurity"),
+    "Agile": ("agile", "scrum", "kanban"),
+    "Project management": ("project management", "pmp"),
+    "Product management": ("product management",),
+    "Leadership": ("leadership", "team lead", "led team", "mentoring", "mentored"),
+    "Communication": ("communication", "communicate"),
+    "Stakeholder management": ("stakeholder", "stakeholders"),
+    "Excel": ("excel",),
+    "Tableau": ("tableau",),
+    "Power BI": ("power bi", "powerbi"),
+    "Figma": ("figma",),
+    "UX design": ("ux", "user experience"),
+    "Salesforce": ("salesforce",),
+    "SAP": ("sap",),
+    "Accounting": ("accounting", "gaap"),
+    "Sales": ("sales",),
+    "Marketing": ("marketing", "seo"),
+    "Customer service": ("customer service", "customer support"),
+}
+
+TERM_TO_SKILL = {term: skill for skill, terms in SKILLS.items() for term in terms}
+
+YEARS_PATTERN = re.compile(r"(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years?|yrs?)\b", re.IGNORECASE)
+DATE_RANGE_PATTERN = re.compile(
+    r"\b((?:19|20)\d{2})\s*(?:-|–|—|to)\s*((?:19|20)\d{2}|present|current|now)\b",
+    re.IGNORECASE
+)
+
+# Weights of the score components
+SKILL_WEIGHT = 0.55
+KEYWORD_WEIGHT = 0.30
+EXPERIENCE_WEIGHT = 0.15
+
+# Number of most frequent job terms compared as keywords
+KEYWORD_LIMIT = 25
+
+# Words common to job postings that say nothing about the role itself
+POSTING_WORDS = frozenset("""
+ability able about all also any apply candidate candidates can company day degree
+do etc excellent experience familiarity good great ideal including join just
+knowledge looking must new not one other plus preferred qualifications required
+requirements responsibilities role should skills strong team their they using
+well what who work working years year
+""".split())
+
+def extract_skills(terms: Set[str]) -> List[str]:
+    """Return the known skills mentioned in a set of terms, in SKILLS order."""
+    found = {TERM_TO_SKILL[term] for term in terms if term in TERM_TO_SKILL}
+    return [skill for skill in SKILLS if skill in found]
+
+def extract_keywords(text: str, limit: int = KEYWORD_LIMIT) -> List[str]:
+    """Return the most frequent single-word terms of a text."""
+    words = [
+        term for term in tokenize(text)
+        if " " not in term and len(term) > 2 and not term.isdigit() and term not in POSTING_WORDS
+    ]
+    return [word for word, _ in Counter(words).most_common(limit)]
+
+def required_years(job_description: str) -> Optional[int]:
+    """Return the smallest "N+ years" requirement in a job description."""
+    years = [int(match) for match in YEARS_PATTERN.findall(job_description)]
+    years = [value for value in years if 0 < value <= 40]
+    return min(years) if years else None
+
+def resume_years(resume: str) -> float:
+    """
+    Estimate years of experience from a resume.
+    
+    Uses the larger of any explicit "N years" statement and the total span
+    of year ranges such as "2018-2020" or "2020-Present", with overlapping
+    ranges merged.
+    """
+    explicit = [int(match) for match in YEARS_PATTERN.findall(resume)]
+    explicit = [value for value in explicit if 0 < value <= 50]
+    
+    current_year = datetime.now().year
+    spans = []
+    for start, end in DATE_RANGE_PATTERN.findall(resume):
+        start_year = int(start)
+        end_year = current_year if not end[0].isdigit() else int(end)
+        if start_year <= end_year <= current_year:
+            spans.append((start_year, end_year))
+    
+    total = 0
+    merged_end = None
+    for start_year, end_year in sorted(spans):
+        if merged_end is None or start_year > merged_end:
+            total += end_year - start_year
+            merged_end = end_year
+        elif end_year > merged_end:
+            total += end_year - merged_end
+            merged_end = end_year
+    
+    return float(max([total] + explicit))
+
+def score_match_offline(resume: str, job_description: str) -> Dict[str, Any]:
+    """
+    Score a resume against a job description without calling an LLM.
+    
+    Compares known skills, frequent job keywords and years of experience.
+    The result has the same keys as the LLM analysis (score, strengths,
+    gaps, actions, summary) plus "engine": "fast".
+    
+    Args:
+        resume: The resume text
+        job_description: The job description text
+    
+    Returns:
+        The match analysis dictionary
+    """
+    resume_terms = set(tokenize(resume))
+    job_terms = set(tokenize(job_description))
+    
+    job_skills = extract_skills(job_terms)
+    resume_skills = set(extract_skills(resume_terms))
+    matched_skills = [skill for skill in job_skills if skill in resume_skills]
+    missing_skills = [skill for skill in job_skills if skill not in resume_skills]
+    
+    keywords = extract_keywords(job_description)
+    matched_keywords = [word for word in keywords if word in resume_terms]
+    
+    needed_years = required_years(job_description)
+    candidate_years = resume_years(resume)
+    
+    keyword_score = len(matched_keywords) / len(keywords) if keywords else 0.0
+    skill_score = len(matched_skills) / len(job_skills) if job_skills else keyword_score
+    experience_score = min(1.0, candidate_years / needed_years) if needed_years else 1.0
+    
+    score = round(100 * (
+        SKILL_WEIGHT * skill_score
+        + KEYWORD_WEIGHT * keyword_score
+        + EXPERIENCE_WEIGHT * experience_score
+    ))
+    score = max(0, min(100, score))
+    
+    strengths = [f"Experience with {skill}, which the job asks for" for skill in matched_skills[:5]]
+    if needed_years and candidate_years >= needed_years:
+        strengths.append(f"About {candidate_years:g} years of experience meets the {needed_years}+ years required")
+    if not strengths and matched_keywords:
+        strengths.append(f"Resume mentions key terms from the posting: {', '.join(matched_keywords[:5])}")
+    
+    gaps = [f"No evidence of {skill} in the resume" for skill in missing_skills[:4]]
+    if needed_years and candidate_years < needed_years:
+        gaps.append(f"The job asks for {needed_years}+ years of experience; the resume shows about {candidate_years:g}")
+    
+    actions = [
+        f"If you have used {skill}, describe it explicitly in your resume; otherwise build it through a project or course"
+        for skill in missing_skills[:3]
+    ]
+    missing_keywords = [word for word in keywords if word not in resume_terms]
+    if missing_keywords:
+        actions.append(f"Mirror the posting's wording where it is accurate, e.g. {', '.join(missing_keywords[:5])}")
+    if not actions:
+        actions.append("Quantify the impact of your most relevant achievements")
+    
+    if score >= 75:
+        summary = "Your background lines up well with this role. Lead with the matching skills and you will be a strong candidate."
+    elif score >= 50:
+        summary = "You cover a good part of what this role needs. Closing the listed gaps would make your application much stronger."
+    else:
+        summary = "This role asks for several things your resume does not show yet. Focus on the top gaps first; each one you close moves you closer."
+    
+    return {
+        "score": score,
+        "strengths": strengths,
+        "gaps": gaps,
+        "actions": actions,
+        "summary": summary,
+        "engine": "fast"
+    }
+
+def analyze_offline(resume: str, job_description: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Offline counterpart of analyze_resume_job_match.
+    
+    Returns:
+        Tuple of (raw_output, parsed_output), where raw_output is the JSON
+        encoding of parsed_output
+    """
+    parsed_output = score_match_offline(resume, job_description)
+    return json.dumps(parsed_output), parsed_output
@@ -1,6 +1,49 @@
 import io
+import os
+import re
+import zipfile
 import docx
+from pypdf import PdfReader
 from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Limits applied to uploaded documents
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_DOCUMENT_PAGES = int(os.getenv("MAX_DOCUMENT_PAGES", "20"))
+# A .docx is a zip archive; refuse archives that inflate far beyond the upload
+MAX_DOCX_UNCOMPRESSED_BYTES = int(os.getenv("MAX_DOCX_UNCOMPRESSED_BYTES", str(50 * 1024 * 1024)))
+
+SUPPORTED_EXTENSIONS = (".docx", ".pdf", ".txt")
+
+DOCX_PAGES_PATTERN = re.compile(rb"<Pages>(\d+)</Pages>")
+
+class DocumentError(Exception):
+    """An uploaded document could not be read."""
+
+class DocumentLimitError(DocumentError):
+    """An uploaded document exceeds the size or page limits."""
+
+def check_docx_limits(file_content: bytes, max_pages: int = MAX_DOCUMENT_PAGES) -> None:
+    """
+    Check a .docx archive against the size and page limits before parsing it.
+    
+    The page count comes from docProps/app.xml, which Word keeps up to date;
+    documents without it are only checked for size.
+    
+    Raises:
+        DocumentLimitError: If a limit is exceeded
+    """
+    with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+        if sum(info.file_size for info in archive.infolist()) > MAX_DOCX_UNCOMPRESSED_BYTES:
+            raise DocumentLimitError("Document is too large once uncompressed")
+        
+        if "docProps/app.xml" in archive.namelist():
+            match = DOCX_PAGES_PATTERN.search(archive.read("docProps/app.xml"))
+            if match and int(match.group(1)) > max_pages:
+                raise DocumentLimitError(f"Document has more than {max_pages} pages")
 
 def extract_text_from_docx(file_content: bytes) -> str:
     """
@@ -8,7 +51,7 @@ def extract_text_from_docx(file_content: bytes) -> str:
     
     Args:
         file_content: The binary content of the .docx file
-        
+    
     Returns:
         The extracted text
     """
@@ -29,20 +72,80 @@ def extract_text_from_docx(file_content: bytes) -> str:
     
     return '\n'.join(full_text)
 
-def process_resume_file(file_content: bytes, filename: str) -> Optional[str]:
+def extract_text_from_pdf(file_content: bytes, max_pages: int = MAX_DOCUMENT_PAGES) -> str:
+    """
+    Extract text from a .pdf file.
+    
+    Args:
+        file_content: The binary content of the .pdf file
+        max_pages: Refuse documents with more pages than this
+    
+    Returns:
+        The extracted text
+    
+    Raises:
+        DocumentLimitError: If the document has too many pages
+    """
+    reader = PdfReader(io.BytesIO(file_content))
+    if len(reader.pages) > max_pages:
+        raise DocumentLimitError(f"Document has more than {max_pages} pages")
+    
+    full_text = []
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            full_text.append(text)
+    
+    return '\n'.join(full_text)
+
+def process_resume_file(file_content: bytes, filename: str, max_pages: int = MAX_DOCUMENT_PAGES) -> Optional[str]:
     """
     Process a resume file and extract its text content.
     
     Args:
         file_content: The binary content of the file
         filename: The name of the file
-        
+        max_pages: Refuse documents with more pages than this
+    
+    Returns:
+        The extracted text or None if the file format is not supported
+    
+    Raises:
+        DocumentLimitError: If the file exceeds the size or page limits
+        DocumentError: If the file cannot be parsed
+    """
+    if len(file_content) > MAX_UPLOAD_BYTES:
+        raise DocumentLimitError(f"File is larger than {MAX_UPLOAD_BYTES} bytes")
+    
+    try:
+        if filename.lower().endswith('.docx'):
+            check_docx_limits(file_content, max_pages)
+            return extract_text_from_docx(file_content)
+        elif filename.lower().endswith('.pdf'):
+            return extract_text_from_pdf(file_content, max_pages)
+        elif filename.lower().endswith('.txt'):
+            return file_content.decode('utf-8')
+        else:
+            return None
+    except DocumentError:
+        raise
+    except Exception as e:
+        raise DocumentError(f"Could not read {filename}: {e}")
+
+def extract_file(path: str, filename: str, max_pages: int = MAX_DOCUMENT_PAGES) -> Optional[str]:
+    """
+    Read a file from disk and extract its text.
+    
+    This is the entry point run in the extraction worker processes, so
+    file contents never have to be sent to them.
+    
+    Args:
+        path: Path of the file to read
+        filename: The original name of the file, used for its format
+        max_pages: Refuse documents with more pages than this
+    
     Returns:
         The extracted text or None if the file format is not supported
     """
-    if filename.lower().endswith('.docx'):
-        return extract_text_from_docx(file_content)
-    elif filename.lower().endswith('.txt'):
-        return file_content.decode('utf-8')
-    else:
-        return None
+    with open(path, "rb") as file:
+        return process_resume_file(file.read(), filename, max_pages)
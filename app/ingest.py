@@ -0,0 +1,325 @@
+import os
+import asyncio
+import hashlib
+import logging
+import zipfile
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.cache import LRUCache, coalesce
+from app.database import get_extracted_text, store_extracted_text
+from app.file_utils import (
+    extract_file, SUPPORTED_EXTENSIONS, MAX_UPLOAD_BYTES, MAX_DOCUMENT_PAGES,
+    DocumentError, DocumentLimitError
+)
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Extraction settings; 0 workers extracts on a thread instead of a process pool
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "2"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+EXTRACT_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACT_CACHE_MAX_ENTRIES", "256"))
+EXTRACT_CACHE_TTL_SECONDS = float(os.getenv("EXTRACT_CACHE_TTL_SECONDS", "86400"))
+# Also keep extracted texts in DuckDB, so they survive restarts and are
+# shared by the worker processes of the multi-worker mode
+EXTRACT_CACHE_PERSIST = os.getenv("EXTRACT_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+
+# Bulk upload limits
+MAX_BULK_FILES = int(os.getenv("MAX_BULK_FILES", "500"))
+MAX_ARCHIVE_BYTES = int(os.getenv("MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+
+# Extracted text by file hash, so re-uploads skip parsing
+text_cache = LRUCache(EXTRACT_CACHE_MAX_ENTRIES, EXTRACT_CACHE_TTL_SECONDS)
+extraction_stats = {
+    "extracted": 0,
+    "cache_hits": 0,
+    "persistent_hits": 0,
+    "coalesced": 0,
+    "rejected": 0,
+    "store_failures": 0
+}
+# Extractions in flight by cache key, so identical files are parsed once
+_extracting: Dict[str, "asyncio.Task[Optional[str]]"] = {}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the extraction process pool, starting it on first use."""
+    global _pool
+    if EXTRACT_WORKERS <= 0:
+        return None
+    if _pool is None:
+        # Spawned workers import only app.file_utils, never the database
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+def close_extract_pool() -> None:
+    """Shut down the extraction worker processes."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+def is_supported_file(filename: Optional[str]) -> bool:
+    """Return whether a file name has a supported document extension."""
+    return bool(filename) and filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+async def _copy_upload(upload: Any, path: str, max_bytes: int) -> str:
+    """Copy an upload to a file in chunks, returning the sha256 digest of its content."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as file:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise DocumentLimitError(f"File is larger than {max_bytes} bytes")
+            digest.update(chunk)
+            file.write(chunk)
+    return digest.hexdigest()
+
+@asynccontextmanager
+async def spool_upload(upload: Any, max_bytes: int = MAX_UPLOAD_BYTES) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Copy an upload to a temporary file, hashing it on the way.
+    
+    Reads UPLOAD_CHUNK_SIZE bytes at a time, so the upload is never held in
+    memory whole, and stops as soon as it exceeds max_bytes. The file is
+    removed on exit.
+    
+    Args:
+        upload: An UploadFile, or anything with an async read(size)
+        max_bytes: Refuse uploads larger than this
+    
+    Yields:
+        Tuple of (temporary file path, sha256 hex digest of the content)
+    
+    Raises:
+        DocumentLimitError: If the upload is too large
+    """
+    suffix = os.path.splitext(getattr(upload, "filename", None) or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    os.close(fd)
+    try:
+        digest = await _copy_upload(upload, path, max_bytes)
+        yield path, digest
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def _is_archive_junk(name: str) -> bool:
+    """Return whether an archive entry is a folder or operating system metadata."""
+    return name.endswith("/") or name.startswith("__MACOSX/") or os.path.basename(name).startswith(".")
+
+def _expand_archive(archive_path: str, directory: str, start: int, max_files: int) -> List[Dict[str, Any]]:
+    """
+    Decompress the supported files of a zip archive one at a time.
+    
+    Entries are written to numbered files in directory; their names inside
+    the archive are never used as paths.
+    
+    Returns:
+        One spooled file dictionary per entry, as from spool_bulk_uploads
+    """
+    files: List[Dict[str, Any]] = []
+    try:
+        archive = zipfile.ZipFile(archive_path)
+    except zipfile.BadZipFile as e:
+        raise DocumentError(f"Could not read archive: {e}")
+    
+    with archive:
+        for info in archive.infolist():
+            if _is_archive_junk(info.filename):
+                continue
+            if start + len(files) >= max_files:
+                raise DocumentLimitError(f"More than {max_files} files uploaded")
+            
+            entry = {"filename": info.filename, "path": None, "digest": None, "error": None}
+            files.append(entry)
+            if not is_supported_file(info.filename):
+                entry["error"] = "Unsupported file format"
+                continue
+            
+            # The declared size can lie, so the limit is enforced while copying
+            path = os.path.join(directory, f"{start + len(files)}{os.path.splitext(info.filename)[1].lower()}")
+            digest = hashlib.sha256()
+            size = 0
+            with archive.open(info) as source, open(path, "wb") as target:
+                while True:
+                    chunk = source.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        entry["error"] = f"File is larger than {MAX_UPLOAD_BYTES} bytes"
+                        break
+                    digest.update(chunk)
+                    target.write(chunk)
+            
+            if entry["error"] is None:
+                entry["path"] = path
+                entry["digest"] = digest.hexdigest()
+            else:
+                os.unlink(path)
+    
+    return files
+
+async def spool_bulk_uploads(uploads: List[Any], directory: str) -> List[Dict[str, Any]]:
+    """
+    Spool a set of uploaded resumes, expanding zip archives, into a directory.
+    
+    Args:
+        uploads: UploadFiles; each is a resume or a .zip of resumes
+        directory: Directory the spooled files are written to; the caller
+            removes it
+    
+    Returns:
+        One dictionary per resume with filename, path, digest and error.
+        path and digest are None when error says why the file was skipped.
+    
+    Raises:
+        DocumentLimitError: If there are more than MAX_BULK_FILES resumes
+            or an archive is larger than MAX_ARCHIVE_BYTES
+        DocumentError: If an archive cannot be read
+    """
+    loop = asyncio.get_running_loop()
+    files: List[Dict[str, Any]] = []
+    
+    for upload in uploads:
+        filename = upload.filename or "upload"
+        
+        if filename.lower().endswith(".zip"):
+            async with spool_upload(upload, MAX_ARCHIVE_BYTES) as (archive_path, _):
+                files.extend(await loop.run_in_executor(
+                    None, _expand_archive, archive_path, directory, len(files), MAX_BULK_FILES
+                ))
+            continue
+        
+        if len(files) >= MAX_BULK_FILES:
+            raise DocumentLimitError(f"More than {MAX_BULK_FILES} files uploaded")
+        
+        entry = {"filename": filename, "path": None, "digest": None, "error": None}
+        files.append(entry)
+        if not is_supported_file(filename):
+            entry["error"] = "Unsupported file format"
+            continue
+        
+        path = os.path.join(directory, f"{len(files)}{os.path.splitext(filename)[1].lower()}")
+        try:
+            entry["digest"] = await _copy_upload(upload, path, MAX_UPLOAD_BYTES)
+            entry["path"] = path
+        except DocumentLimitError as e:
+            entry["error"] = str(e)
+    
+    return files
+
+async def extract_path_text(path: str, filename: str, digest: str) -> Optional[str]:
+    """
+    Extract the text of a spooled file on the worker pool, using the caches.
+    
+    Identical files extracted at the same time, e.g. duplicates in one
+    bulk upload, share a single extraction.
+    
+    Args:
+        path: Path of the file to read
+        filename: The original name of the file, used for its format
+        digest: sha256 hex digest of the file content
+    
+    Returns:
+        The extracted text or None if the file format is not supported
+    
+    Raises:
+        DocumentLimitError: If the file exceeds the size or page limits
+        DocumentError: If the file cannot be parsed
+    """
+    # The same bytes can parse differently under another extension or limit
+    extension = os.path.splitext(filename)[1].lower()
+    cache_key = f"{digest}:{extension}:{MAX_DOCUMENT_PAGES}"
+    cached = text_cache.get(cache_key)
+    if cached is not None:
+        extraction_stats["cache_hits"] += 1
+        return cached
+    
+    if EXTRACT_CACHE_PERSIST:
+        cached = await get_extracted_text(cache_key, EXTRACT_CACHE_TTL_SECONDS)
+        if cached is not None:
+            text_cache.set(cache_key, cached)
+            extraction_stats["persistent_hits"] += 1
+            return cached
+    
+    if cache_key in _extracting:
+        extraction_stats["coalesced"] += 1
+    return await coalesce(cache_key, lambda: _extract(path, filename, cache_key), _extracting)
+
+async def _extract(path: str, filename: str, cache_key: str) -> Optional[str]:
+    """Extract a file on the worker pool and store its text in both cache tiers."""
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        text = await loop.run_in_executor(pool, extract_file, path, filename, MAX_DOCUMENT_PAGES)
+    except DocumentError:
+        extraction_stats["rejected"] += 1
+        raise
+    except BrokenProcessPool:
+        # A worker died, e.g. on a pathological file; release the broken pool
+        # and start a fresh one next time, unless another call already did
+        pool.shutdown(wait=False, cancel_futures=True)
+        if _pool is pool:
+            _pool = None
+        extraction_stats["rejected"] += 1
+        raise DocumentError(f"Could not read {filename}: extraction worker failed")
+    
+    extraction_stats["extracted"] += 1
+    if text is not None:
+        text_cache.set(cache_key, text)
+        if EXTRACT_CACHE_PERSIST:
+            try:
+                await store_extracted_text(cache_key, text)
+            except Exception:
+                # The text is still returned; it is only not shared or kept
+                extraction_stats["store_failures"] += 1
+                logger.exception("Storing extracted text in the persistent cache failed")
+    return text
+
+async def extract_upload_text(upload: Any) -> Optional[str]:
+    """
+    Extract the text of an uploaded resume file.
+    
+    Args:
+        upload: An UploadFile
+    
+    Returns:
+        The extracted text or None if the file format is not supported
+    
+    Raises:
+        DocumentLimitError: If the file exceeds the size or page limits
+        DocumentError: If the file cannot be parsed
+    """
+    if not is_supported_file(upload.filename):
+        return None
+    
+    async with spool_upload(upload) as (path, digest):
+        return await extract_path_text(path, upload.filename, digest)
+
+def get_extraction_stats() -> Dict[str, Any]:
+    """Return extraction and text cache counters."""
+    return {
+        **extraction_stats,
+        "cached_texts": len(text_cache),
+        "workers": EXTRACT_WORKERS
+    }
@@ -0,0 +1,259 @@
+import os
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from typing import Dict, Any, List, Optional
+import httpx
+from dotenv import load_dotenv
+from app.pipeline import MatchContext, scoring_pipeline
+from app.database import (
+    create_match_job, claim_match_jobs, complete_match_job, fail_match_job,
+    renew_match_job_lease, get_match_job, get_match_by_id
+)
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Job queue settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "60"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+# Seconds a worker holds a job without renewing; running jobs of a worker
+# that died are claimed again once this has passed
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Hosts callbacks may be sent to, comma-separated, each optionally with a
+# port ("hooks.example.com,10.0.0.5:9000"). Empty disables callbacks, so
+# clients cannot make the service POST to arbitrary internal addresses.
+JOB_CALLBACK_HOSTS = {
+    host.strip().lower() for host in os.getenv("JOB_CALLBACK_HOSTS", "").split(",") if host.strip()
+}
+
+def retry_delay(attempts: int) -> float:
+    """
+    Seconds to wait before the next attempt of a job.
+    
+    Doubles with every attempt up to JOB_RETRY_MAX_SECONDS, with jitter
+    so jobs that failed together do not retry together.
+    """
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def callback_allowed(callback_url: str) -> bool:
+    """
+    Return whether job statuses may be POSTed to a URL.
+    
+    The URL must be http or https and its host, or host and port, must be
+    listed in JOB_CALLBACK_HOSTS.
+    """
+    try:
+        parts = urlsplit(callback_url)
+        port = parts.port
+    except ValueError:
+        return False
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    host = parts.hostname.lower()
+    return host in JOB_CALLBACK_HOSTS or (port is not None and f"{host}:{port}" in JOB_CALLBACK_HOSTS)
+
+async def get_job_status(job_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Return a job with its stored match record, once it has one.
+    
+    Args:
+        job_id: ID of the job
+    
+    Returns:
+        The job's status fields plus "match", or None if not found
+    """
+    job = await get_match_job(job_id)
+    if job is None:
+        return None
+    job["match"] = await get_match_by_id(job["match_id"]) if job["match_id"] is not None else None
+    return job
+
+class JobQueue:
+    """
+    Pool of workers running match jobs from the match_jobs table.
+    
+    Jobs survive restarts: they are persisted when submitted, and jobs
+    that were running when the process stopped are queued again on the
+    next start. Workers hold running jobs on a lease of
+    JOB_LEASE_SECONDS that they renew while the job runs, so the jobs of
+    a worker process that died are claimed again by the others. Workers
+    wake up when a job is submitted and otherwise
+    poll every JOB_POLL_INTERVAL seconds for retries that became due.
+    Failed attempts are retried with exponential backoff until
+    JOB_MAX_ATTEMPTS is reached. Jobs with a callback_url have the final
+    job status POSTed to it.
+    """
+    
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.stats = {
+            "submitted": 0,
+            "succeeded": 0,
+            "retried": 0,
+            "failed": 0,
+            "lost": 0,
+            "callbacks_failed": 0
+        }
+    
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._client = httpx.AsyncClient(timeout=JOB_CALLBACK_TIMEOUT)
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        """
+        Stop the workers.
+        
+        Jobs interrupted here are left running in the table and picked up
+        again on the next start, or by another worker process once their
+        lease expires.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def submit(
+        self,
+        resume_text: str,
+        job_description: str,
+        mode: str = "llm",
+        callback_url: Optional[str] = None
+    ) -> int:
+        """
+        Persist a match job and wake a worker.
+        
+        Args:
+            resume_text: The resume text
+            job_description: The job description text
+            mode: "llm" or "fast"
+            callback_url: URL notified when the job finishes (optional)
+        
+        Returns:
+            The ID of the new job
+        """
+        job_id = await create_match_job(resume_text, job_description, mode, callback_url, self.max_attempts)
+        self.stats["submitted"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+    
+    async def _run(self) -> None:
+        while True:
+            # Cleared before claiming, so a job submitted meanwhile still wakes us
+            self._wakeup.clear()
+            try:
+                jobs = await claim_match_jobs(1, self.lease_seconds)
+                if jobs:
+                    await self.run_job(jobs[0])
+                    continue
+            except Exception:
+                logger.exception("Match job worker failed")
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        """
+        Run one claimed job and record the outcome.
+        
+        Args:
+            job: A job as returned by claim_match_jobs
+        """
+        attempt = job["attempts"]
+        # No offline fallback: a transient LLM failure is retried with backoff
+        # instead of completing the job with a result it did not ask for
+        context = MatchContext(job["job_description"], job["resume_text"], job["mode"], "batch", fallback=False)
+        renewal = asyncio.create_task(self._renew_lease(job["id"], attempt))
+        try:
+            if attempt > job["max_attempts"]:
+                # Claimed again after the worker running the last attempt stopped
+                raise RuntimeError("The worker running the job stopped")
+            # Stored below together with the job's status, in one transaction
+            await scoring_pipeline.run(context)
+        except Exception as e:
+            if attempt < job["max_attempts"]:
+                retry_at = datetime.now() + timedelta(seconds=retry_delay(attempt))
+                held = await fail_match_job(job["id"], str(e), retry_at, attempt)
+                self.stats["retried" if held else "lost"] += 1
+                return
+            held = await fail_match_job(job["id"], str(e), attempt=attempt)
+            outcome = "failed"
+        else:
+            held = await complete_match_job(job["id"], context.record(), attempt) is not None
+            outcome = "succeeded"
+        finally:
+            renewal.cancel()
+        
+        if not held:
+            # The lease expired and another worker took the job over
+            self.stats["lost"] += 1
+            return
+        self.stats[outcome] += 1
+        if job["callback_url"]:
+            await self._notify(job["id"], job["callback_url"])
+    
+    async def _renew_lease(self, job_id: int, attempt: int) -> None:
+        """Renew the lease on a running job until cancelled."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await renew_match_job_lease(job_id, attempt, self.lease_seconds):
+                    logger.warning("Match job %d was claimed again while it ran", job_id)
+                    return
+            except Exception:
+                logger.exception("Renewing the lease on match job %d failed", job_id)
+    
+    async def _notify(self, job_id: int, callback_url: str) -> None:
+        """POST the final job status to its callback URL."""
+        # Checked again here, as the allowlist may have changed since submission
+        if not callback_allowed(callback_url):
+            logger.warning("Callback for match job %d to %s is not allowed", job_id, callback_url)
+            self.stats["callbacks_failed"] += 1
+            return
+        try:
+            payload = await get_job_status(job_id)
+            response = await self._client.post(callback_url, json=payload)
+            response.raise_for_status()
+        except Exception:
+            logger.exception("Callback for match job %d to %s failed", job_id, callback_url)
+            self.stats["callbacks_failed"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return worker and outcome counters."""
+        return {
+            **self.stats,
+            "workers": len(self._tasks)
+        }
+
+job_queue = JobQueue()
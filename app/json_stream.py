@@ -0,0 +1,457 @@
+import copy
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from app.models import MatchDetails
+from app.metrics import LLM_OUTPUT_PARSE
+
+# Array fields of the match JSON and the event name used for each item
+LIST_FIELDS = {
+    "strengths": "strength",
+    "gaps": "gap",
+    "actions": "action"
+}
+
+# Recommendation given for results in the old highlights format, which has no actions
+LEGACY_ACTIONS = ["Update your resume to address the identified gaps"]
+
+# Bare words LLMs write in place of JSON literals
+LITERALS = {
+    "true": "true", "True": "true",
+    "false": "false", "False": "false",
+    "null": "null", "None": "null"
+}
+
+# Characters of unquoted keys, numbers and literals
+WORD_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_+-.")
+
+# Escapes that are valid in JSON strings
+JSON_ESCAPES = frozenset('"\\/bfnrtu')
+
+MatchEvent = Tuple[str, Any]
+
+class JSONRepairer:
+    """
+    Incremental tokenizer that rewrites LLM output into valid JSON.
+    
+    Feed it the output in chunks in arrival order; value() returns the
+    object read so far, closed as if the output ended there, so truncated
+    output still yields every complete field. Text around the top-level
+    object, such as a markdown code fence, is skipped. On the way it drops
+    trailing and duplicate commas, inserts missing commas and colons,
+    quotes unquoted keys and words, converts single-quoted strings and
+    Python literals, and escapes raw control characters in strings.
+    
+    Subclasses get every scalar and string value through _on_value while
+    the containers around it are still open.
+    """
+    
+    def __init__(self):
+        self.out: List[str] = []
+        self.stack: List[str] = []
+        self.keys: List[Optional[str]] = []
+        self.expect_key = False
+        self.after_key = False
+        self.need_comma = False
+        self.comma_seen = False
+        self.quote: Optional[str] = None
+        self.string_start = 0
+        self.string_is_key = False
+        self.escape = False
+        self.word: List[str] = []
+        self.word_is_key = False
+        self.done = False
+        # Number of defects fixed so far
+        self.repairs = 0
+    
+    def feed(self, chunk: str) -> None:
+        """
+        Consume a chunk of output.
+        
+        Args:
+            chunk: The next piece of LLM output
+        """
+        for char in chunk:
+            if self.done:
+                break
+            
+            if self.quote is not None:
+                self._string_char(char)
+                continue
+            
+            if not self.stack:
+                # Skip anything before the top-level object
+                if char == "{":
+                    self._open(char)
+                continue
+            
+            if char in WORD_CHARS:
+                if not self.word:
+                    self._start_token()
+                    self.word_is_key = self.expect_key
+                self.word.append(char)
+                continue
+            if self.word:
+                self._end_word()
+            
+            if char == '"' or char == "'":
+                self._start_token()
+                if char == "'":
+                    self.repairs += 1
+                self.quote = char
+                self.string_is_key = self.expect_key
+                self.out.append('"')
+                self.string_start = len(self.out) - 1
+            elif char == "{" or char == "[":
+                self._start_token()
+                self._open(char)
+            elif char == "}" or char == "]":
+                self._close()
+            elif char == ":":
+                self.after_key = False
+                self.out.append(":")
+            elif char == ",":
+                if self.comma_seen or not self.need_comma:
+                    self.repairs += 1
+                self.comma_seen = True
+            elif not char.isspace():
+                # Stray characters such as comments or a fence inside the object
+                self.repairs += 1
+    
+    def value(self) -> Any:
+        """
+        Return the object read so far, or None if no object has started.
+        
+        Open strings, containers and dangling keys are closed on a copy,
+        so feeding can continue afterwards.
+        """
+        if not self.out:
+            return None
+        
+        closed = copy.copy(self)
+        closed.out = list(self.out)
+        closed.stack = list(self.stack)
+        closed.keys = list(self.keys)
+        closed.word = list(self.word)
+        closed._finish()
+        try:
+            return json.loads("".join(closed.out))
+        except json.JSONDecodeError:
+            return None
+    
+    def _on_value(self, value: Any) -> None:
+        """Called with each complete scalar or string value that is not a key."""
+    
+    def _start_token(self) -> None:
+        # Commas are written lazily, so trailing commas never reach the output
+        if self.after_key:
+            self.out.append(":")
+            self.after_key = False
+            self.repairs += 1
+        if self.need_comma:
+            if not self.comma_seen:
+                self.repairs += 1
+            self.out.append(",")
+            self.need_comma = False
+            self.expect_key = self.stack[-1] == "{"
+        self.comma_seen = False
+    
+    def _open(self, char: str) -> None:
+        self.stack.append(char)
+        self.keys.append(None)
+        self.out.append(char)
+        self.expect_key = char == "{"
+        self.need_comma = False
+        self.comma_seen = False
+    
+    def _close(self) -> None:
+        if self.comma_seen:
+            self.repairs += 1
+        if self.after_key or self.out[-1] == ":":
+            # A key without a value
+            if self.after_key:
+                self.out.append(":")
+            self.out.append("null")
+            self.after_key = False
+            self.repairs += 1
+        
+        # Close what is open, whichever bracket the output used
+        self.out.append("}" if self.stack.pop() == "{" else "]")
+        self.keys.pop()
+        self.comma_seen = False
+        if not self.stack:
+            self.done = True
+            return
+        self._end_value()
+    
+    def _end_value(self) -> None:
+        self.need_comma = True
+        self.expect_key = False
+    
+    def _end_word(self) -> None:
+        word = "".join(self.word)
+        self.word = []
+        
+        if self.word_is_key:
+            self.repairs += 1
+            self.out.append(json.dumps(word))
+            self.keys[-1] = word
+            self.after_key = True
+            self.expect_key = False
+            return
+        
+        if word in LITERALS:
+            text = LITERALS[word]
+            if text != word:
+                self.repairs += 1
+        else:
+            try:
+                float(word)
+                json.loads(word)
+                text = word
+            except ValueError:
+                # Not a number either, so keep it as a string
+                self.repairs += 1
+                text = json.dumps(word)
+        self.out.append(text)
+        self._on_value(json.loads(text))
+        self._end_value()
+    
+    def _string_char(self, char: str) -> None:
+        if self.escape:
+            self.escape = False
+            if char in JSON_ESCAPES:
+                self.out.append("\\" + char)
+            elif char == "'":
+                self.out.append("'")
+            else:
+                self.repairs += 1
+                self.out.append("\\\\" + char)
+            return
+        
+        if char == "\\":
+            self.escape = True
+        elif char == self.quote:
+            self.quote = None
+            self.out.append('"')
+            self._end_string()
+        elif char == '"':
+            self.out.append('\\"')
+        elif char < " ":
+            self.repairs += 1
+            self.out.append(json.dumps(char)[1:-1])
+        else:
+            self.out.append(char)
+    
+    def _end_string(self) -> None:
+        value = json.loads("".join(self.out[self.string_start:]))
+        if self.string_is_key:
+            self.keys[-1] = value
+            self.after_key = True
+            self.expect_key = False
+            return
+        
+        self._on_value(value)
+        self._end_value()
+    
+    def _finish(self) -> None:
+        """Close everything that is still open, as value() does on its copy."""
+        if self.done:
+            return
+        
+        self.repairs += 1
+        if self.quote is not None:
+            # Drop an escape cut off in the middle
+            self.escape = False
+            tail = self.out[-4:]
+            if "\\u" in tail:
+                del self.out[len(self.out) - len(tail) + tail.index("\\u"):]
+            self.quote = None
+            self.out.append('"')
+            self._end_string()
+        if self.word:
+            self._end_word()
+        while self.stack:
+            self._close()
+
+class MatchStreamParser(JSONRepairer):
+    """
+    Incremental parser for the match JSON as it streams from the LLM.
+    
+    Feed it text chunks in arrival order; it returns an event as soon as a
+    field is complete: ("score", int), ("strength", str), ("gap", str),
+    ("action", str) and ("summary", str). Defects are repaired as in
+    JSONRepairer, and result() returns the validated analysis at the end
+    without parsing the output a second time.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.events: List[MatchEvent] = []
+    
+    def feed(self, chunk: str) -> List[MatchEvent]:
+        """
+        Consume a chunk of streamed text.
+        
+        Args:
+            chunk: The next piece of LLM output
+        
+        Returns:
+            Events for every field completed by this chunk
+        """
+        self.events = []
+        super().feed(chunk)
+        return self.events
+    
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Return the validated match analysis of everything fed so far."""
+        # Output that ended early was closed by value(), which counts as a repair
+        return count_parse(validate_match_output(self.value()), self.repairs + (not self.done))
+    
+    def _on_value(self, value: Any) -> None:
+        depth = len(self.stack)
+        top_key = self.keys[0]
+        
+        if depth == 1:
+            if top_key == "score" and isinstance(value, (int, float)):
+                self.events.append(("score", int(value)))
+            elif top_key == "summary" and isinstance(value, str):
+                self.events.append(("summary", value))
+        elif depth == 2 and self.stack[1] == "[" and top_key in LIST_FIELDS:
+            if isinstance(value, str):
+                self.events.append((LIST_FIELDS[top_key], value))
+
+def _coerce_score(score: Any) -> Any:
+    """Turn scores like "85", "85%" or 84.6 into an int from 0 to 100."""
+    if isinstance(score, str):
+        try:
+            score = float(score.strip().rstrip("%"))
+        except ValueError:
+            return score
+    if isinstance(score, float):
+        score = round(score)
+    if isinstance(score, int) and not isinstance(score, bool):
+        return min(100, max(0, score))
+    return score
+
+def _coerce_items(items: Any) -> Any:
+    """Keep the non-empty strings of a list field; a single string becomes a list."""
+    if isinstance(items, str):
+        items = [items]
+    if not isinstance(items, list):
+        return items
+    return [item.strip() for item in items if isinstance(item, str) and item.strip()]
+
+def _from_highlights(highlights: Any) -> Dict[str, List[str]]:
+    """Convert the old highlights format to strengths, gaps and actions."""
+    strengths = []
+    gaps = []
+    for highlight in highlights if isinstance(highlights, list) else []:
+        if not isinstance(highlight, dict):
+            continue
+        if highlight.get("type") == "match":
+            strengths.append(highlight.get("description"))
+        elif highlight.get("type") == "gap":
+            gaps.append(highlight.get("description"))
+    return {"strengths": strengths, "gaps": gaps, "actions": list(LEGACY_ACTIONS)}
+
+def match_details(parsed_output: Any) -> Optional[MatchDetails]:
+    """
+    Validate a match analysis in either format against MatchDetails.
+    
+    Results in the old highlights format get strengths and gaps from their
+    highlights. Scores are rounded and clamped to 0-100, and list fields
+    keep only their non-empty strings.
+    
+    Args:
+        parsed_output: The decoded JSON
+    
+    Returns:
+        The validated details, or None if required fields are missing or invalid
+    """
+    if not isinstance(parsed_output, dict):
+        return None
+    
+    fields = dict(parsed_output)
+    if "highlights" in fields and not all(field in fields for field in LIST_FIELDS):
+        fields = {**_from_highlights(fields["highlights"]), **fields}
+    
+    if "score" in fields:
+        fields["score"] = _coerce_score(fields["score"])
+    for field in LIST_FIELDS:
+        if field in fields:
+            fields[field] = _coerce_items(fields[field])
+    
+    try:
+        return MatchDetails.model_validate({field: fields.get(field) for field in MatchDetails.model_fields})
+    except ValidationError:
+        return None
+
+def validate_match_output(parsed_output: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate a match analysis and return it with the fields normalized.
+    
+    Fields beyond MatchDetails, such as legacy highlights, are kept.
+    
+    Returns:
+        The analysis, or None if it does not validate
+    """
+    details = match_details(parsed_output)
+    if details is None:
+        return None
+    return {**parsed_output, **details.model_dump()}
+
+def _loads_strict(raw_output: str) -> Any:
+    """Decode well-formed output, skipping any text around the object."""
+    text = raw_output
+    if "```json" in text:
+        text = text.split("```json", 1)[1].split("```", 1)[0]
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        return json.JSONDecoder().raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        return None
+
+def count_parse(parsed_output: Optional[Dict[str, Any]], repairs: int) -> Optional[Dict[str, Any]]:
+    """Count a parse outcome on /metrics and pass the result through."""
+    if parsed_output is None:
+        LLM_OUTPUT_PARSE.inc("invalid")
+    else:
+        LLM_OUTPUT_PARSE.inc("repaired" if repairs else "ok")
+    return parsed_output
+
+def decode_match_output(raw_output: str) -> Tuple[Optional[Dict[str, Any]], int, bool]:
+    """
+    Decode and validate the JSON match analysis in a raw output.
+    
+    Returns:
+        Tuple of the validated analysis (or None), the number of repairs
+        it needed and whether the object was complete, rather than cut
+        off and closed by the repairer
+    """
+    parsed_output = validate_match_output(_loads_strict(raw_output))
+    if parsed_output is not None:
+        return parsed_output, 0, True
+    
+    repairer = JSONRepairer()
+    repairer.feed(raw_output)
+    return validate_match_output(repairer.value()), max(1, repairer.repairs), repairer.done
+
+def parse_match_output(raw_output: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON match analysis out of the raw LLM output.
+    
+    Well-formed output is decoded directly. Anything else goes through
+    JSONRepairer, so a trailing comma or a truncated response does not
+    cost another LLM call.
+    
+    Args:
+        raw_output: The raw output from OpenAI
+    
+    Returns:
+        The validated analysis, or None if it could not be recovered
+    """
+    parsed_output, repairs, _ = decode_match_output(raw_output)
+    return count_parse(parsed_output, repairs)
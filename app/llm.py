@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Union
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from app.compaction import count_tokens
+
+# Load environment variables from .env file
+load_dotenv()
+
+# LLM backend: "openai" talks to OPENAI_BASE_URL (OpenAI itself or any
+# compatible server), "fake" answers locally with deterministic output
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+LLM_BACKENDS = ("openai", "fake")
+
+# Models used for match analysis and for the chat assistant
+MATCH_MODEL = os.getenv("MATCH_MODEL", "gpt-3.5-turbo")
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-3.5-turbo")
+
+# Connection pool settings for the OpenAI client
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+
+# Simulated response time of the fake backend: latency plus up to jitter seconds
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+FAKE_LLM_JITTER = float(os.getenv("FAKE_LLM_JITTER", "0"))
+
+# Characters per streamed chunk from the fake backend, and the seconds between chunks
+FAKE_CHUNK_CHARS = 16
+FAKE_CHUNK_INTERVAL = float(os.getenv("FAKE_CHUNK_INTERVAL", "0"))
+
+def fake_completion_text(messages: List[Dict[str, str]]) -> str:
+    """
+    Build the fake backend's answer to a conversation.
+    
+    Match prompts get a valid match analysis whose score is derived from
+    a hash of the prompt, so the same input always gets the same answer.
+    Anything else gets a short fixed reply.
+    """
+    prompt = messages[-1]["content"]
+    if '"score"' not in prompt:
+        return "This answer comes from the fake LLM backend."
+    
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return json.dumps({
+        "score": digest[0] % 101,
+        "strengths": ["Relevant experience for the role", "Skills listed in the job description"],
+        "gaps": ["Experience the job asks for that the resume does not show"],
+        "actions": ["Describe recent projects in more detail", "Add measurable results"],
+        "summary": "A deterministic analysis from the fake LLM backend."
+    })
+
+class FakeCompletions:
+    """
+    Stand-in for client.chat.completions that answers locally.
+    
+    Returns the SDK's own response types, so callers cannot tell it from
+    the real API; only the model's time is replaced by a configurable
+    sleep.
+    """
+    
+    def __init__(
+        self,
+        latency: float = FAKE_LLM_LATENCY,
+        jitter: float = FAKE_LLM_JITTER,
+        chunk_interval: float = FAKE_CHUNK_INTERVAL
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_interval = chunk_interval
+    
+    async def create(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "fake",
+        stream: bool = False,
+        **kwargs: Any
+    ) -> Union[ChatCompletion, AsyncIterator[ChatCompletionChunk]]:
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        text = fake_completion_text(messages)
+        created = int(time.time())
+        if stream:
+            return self._stream(text, model, created)
+        
+        prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        completion_tokens = count_tokens(text)
+        return ChatCompletion.model_validate({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+    
+    async def _stream(self, text: str, model: str, created: int) -> AsyncIterator[ChatCompletionChunk]:
+        pieces = [text[start:start + FAKE_CHUNK_CHARS] for start in range(0, len(text), FAKE_CHUNK_CHARS)]
+        for index, piece in enumerate(pieces + [None]):
+            if index and self.chunk_interval > 0:
+                await asyncio.sleep(self.chunk_interval)
+            yield ChatCompletionChunk.model_validate({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": piece} if piece is not None else {},
+                    "finish_reason": "stop" if piece is None else None
+                }]
+            })
+
+class FakeLLMClient:
+    """Deterministic client with the same chat.completions.create interface as AsyncOpenAI."""
+    
+    def __init__(
+        self,
+        latency: float = FAKE_LLM_LATENCY,
+        jitter: float = FAKE_LLM_JITTER,
+        chunk_interval: float = FAKE_CHUNK_INTERVAL
+    ):
+        self.chat = SimpleNamespace(completions=FakeCompletions(latency, jitter, chunk_interval))
+
+def create_client(backend: str = LLM_BACKEND) -> Union[AsyncOpenAI, FakeLLMClient]:
+    """
+    Create the async client for a backend.
+    
+    OpenAI requests go through one bounded HTTP connection pool so
+    connections are reused between calls.
+    
+    Args:
+        backend: One of LLM_BACKENDS
+    
+    Returns:
+        The client
+    
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {backend}. Use one of: {', '.join(LLM_BACKENDS)}")
+    if backend == "fake":
+        return FakeLLMClient()
+    
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=OPENAI_BASE_URL,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE
+            ),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+        ),
+        # Retries go through rate_limiter, which knows about every caller
+        max_retries=0
+    )
+
+def get_backend_info() -> Dict[str, Any]:
+    """Return the configured backend and models."""
+    info = {
+        "backend": LLM_BACKEND,
+        "match_model": MATCH_MODEL,
+        "chat_model": CHAT_MODEL
+    }
+    if LLM_BACKEND == "fake":
+        info["latency"] = FAKE_LLM_LATENCY
+        info["jitter"] = FAKE_LLM_JITTER
+        info["chunk_interval"] = FAKE_CHUNK_INTERVAL
+    else:
+        info["base_url"] = OPENAI_BASE_URL or "https://api.openai.com/v1"
+    return info
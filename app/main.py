@@ -1,24 +1,72 @@
 import os
+import json
+import shutil
+import asyncio
+import tempfile
+from datetime import datetime
+from contextlib import asynccontextmanager, aclosing
 from fastapi import FastAPI, HTTPException, Query, Depends, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import List, Dict, Any, Optional
-from app.models import MatchRequest, MatchResponse, MatchDetails, FileMatchRequest, ChatRequest
-from app.matcher import analyze_resume_job_match, chat_with_assistant
-from app.database import store_match_result, get_match_history, get_match_by_id
-from app.file_utils import process_resume_file
-from app.storage import setup_db, save_match_to_db
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from typing import List, Dict, Any, Optional, Tuple
+from app.models import (
+    MatchRequest, MatchResponse, FileMatchRequest, ChatRequest, JobRequest, JobResponse,
+    BatchMatchRequest, BatchMatchItem, BatchMatchResponse, BulkMatchItem,
+    ShortlistRequest, ShortlistCandidate, ShortlistResponse,
+    AnalyticsFormat, TimeBucket, HighlightKind, ExportFormat
+)
+from app.matcher import (
+    stream_resume_job_match, chat_with_assistant, stream_chat, one_off_chat_messages,
+    MATCH_MODES, BATCH_CONCURRENCY
+)
+from app.database import (
+    init_db, close_db, get_match_history, get_match_by_id,
+    parse_history_fields, encode_history_cursor
+)
+from app.file_utils import DocumentError, DocumentLimitError
+from app.ingest import (
+    spool_bulk_uploads, close_extract_pool, get_extraction_stats
+)
+from app.cache import get_cache_stats, get_inflight_stats
+from app.prefilter import shortlist_jobs, job_index
+from app.writer import match_writer
+from app.jobs import job_queue, get_job_status, callback_allowed
+from app.ratelimit import rate_limiter
+from app.llm import get_backend_info
+from app.metrics import MetricsMiddleware, StatsCollector, stage, render_metrics, METRICS_MEDIA_TYPE
+from app.analytics import (
+    run_analytics, score_histogram_query, job_percentiles_query, top_highlights_query, volume_query,
+    ANALYTICS_MEDIA_TYPES, AnalyticsQuery
+)
+from app.pipeline import (
+    MatchContext, match_pipeline, file_match_pipeline, scoring_pipeline, persist_many
+)
+from app.chat import chat_sessions
+from app.export import stream_history_ndjson, stream_history_parquet, EXPORT_MEDIA_TYPES
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the schema once at startup instead of on every query
+    init_db()
+    match_writer.start()
+    job_queue.start()
+    yield
+    # Unfinished jobs stay in the queue table for the next start
+    await job_queue.stop()
+    await chat_sessions.wait_idle()
+    # Write out any queued match records before closing the database
+    await match_writer.stop()
+    close_extract_pool()
+    close_db()
 
 app = FastAPI(
     title="Job Matcher API",
     description="API for matching resumes with job descriptions using AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Initialize the database
-setup_db()
-
 # Add CORS middleware to allow cross-origin requests
 app.add_middleware(
     CORSMiddleware,
@@ -26,97 +74,296 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Lets browsers page through /history
 )
 
+# Request counts, durations and the optional Server-Timing header
+app.add_middleware(MetricsMiddleware)
+
+# Counters the components already keep, exposed on /metrics
+StatsCollector("match_cache", "Match result cache", get_cache_stats)
+StatsCollector("llm_coalesce", "Coalesced identical LLM calls", get_inflight_stats)
+StatsCollector("llm_rate_limiter", "LLM rate limiter", rate_limiter.get_stats)
+StatsCollector("match_writer", "Match history write-behind queue", match_writer.get_stats)
+StatsCollector("match_jobs", "Background job queue", job_queue.get_stats)
+StatsCollector("extraction", "Document extraction", get_extraction_stats)
+StatsCollector("chat_sessions", "Chat session store", chat_sessions.get_stats)
+
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+# Maximum number of pairs accepted by /match/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+
 @app.post("/match", response_model=MatchResponse)
 async def match_resume_job(data: MatchRequest):
     """
     Match a resume with a job description and return compatibility analysis.
     
     Returns both the raw LLM output and a structured parsed version if available.
-    Also stores the result in the database.
+    The result is stored in the database by the background writer; the
+    response carries its match_id, which /chat takes.
     """
     try:
-        raw_output, parsed_output = await analyze_resume_job_match(
-            data.resume_text, 
-            data.job_description
-        )
-        
-        # Convert parsed output to MatchDetails if it exists
-        structured_output = None
-        if parsed_output:
-            # Check if we have the new format or the old format
-            if all(key in parsed_output for key in ["strengths", "gaps", "actions"]):
-                # New format
-                structured_output = MatchDetails(
-                    score=parsed_output["score"],
-                    strengths=parsed_output["strengths"],
-                    gaps=parsed_output["gaps"],
-                    actions=parsed_output["actions"],
-                    summary=parsed_output["summary"]
-                )
-            elif "highlights" in parsed_output:
-                # Old format - convert highlights to strengths and gaps
-                strengths = []
-                gaps = []
-                for highlight in parsed_output["highlights"]:
-                    if highlight["type"] == "match":
-                        strengths.append(highlight["description"])
-                    elif highlight["type"] == "gap":
-                        gaps.append(highlight["description"])
-                
-                structured_output = MatchDetails(
-                    score=parsed_output["score"],
-                    strengths=strengths,
-                    gaps=gaps,
-                    actions=["Update your resume to address the identified gaps"],
-                    summary=parsed_output["summary"]
-                )
-        
-        # Store the result in the database
-        match_id = await store_match_result(
-            data.resume_text,
-            data.job_description,
-            raw_output,
-            parsed_output
+        context = await match_pipeline.run(
+            MatchContext(data.job_description, data.resume_text, data.mode)
         )
-        
-        # Also save to the new storage format
-        if structured_output:
-            save_match_to_db(
-                data.resume_text,
-                data.job_description,
-                structured_output.score,
-                structured_output.strengths,
-                structured_output.gaps,
-                structured_output.actions,
-                structured_output.summary
-            )
-            
+        return match_response(context)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def score_pairs(pairs: List[Tuple[str, str]], mode: str = "llm") -> List[BatchMatchItem]:
+    """
+    Analyze resume/job pairs concurrently and store the successful results.
+    
+    Args:
+        pairs: List of (resume, job_description) tuples
+        mode: "llm" or "fast"
+    
+    Returns:
+        One BatchMatchItem per pair, in the same order
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    contexts = [MatchContext(job_description, resume_text, mode, "batch") for resume_text, job_description in pairs]
+    # Stored together below in one insert instead of one write each
+    outcomes = await asyncio.gather(
+        *[scoring_pipeline.run(context, {"score": semaphore}) for context in contexts],
+        return_exceptions=True
+    )
+    
+    scored = [context for context, outcome in zip(contexts, outcomes) if not isinstance(outcome, Exception)]
+    await persist_many(scored)
+    
+    items = []
+    for index, (context, outcome) in enumerate(zip(contexts, outcomes)):
+        if isinstance(outcome, Exception):
+            items.append(BatchMatchItem(index=index, error=str(outcome)))
+            continue
+        items.append(BatchMatchItem(
+            index=index,
+            match_id=context.match_id,
+            raw_output=context.raw_output,
+            parsed_output=context.details,
+            engine=context.engine
+        ))
+    
+    return items
+
+def match_response(context: MatchContext) -> MatchResponse:
+    """Build the /match response for a match that went through the pipeline."""
+    with stage("serialize"):
         return MatchResponse(
-            raw_output=raw_output,
-            parsed_output=structured_output
+            raw_output=context.raw_output,
+            parsed_output=context.details,
+            engine=context.engine,
+            prompt_stats=context.prompt_stats,
+            match_id=context.match_id
+        )
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body generator when the response ends.
+    
+    Starlette stops iterating when the client goes away but leaves the
+    generator to the garbage collector, so its finally blocks, which
+    close LLM streams and remove spooled files, would run at some later
+    point.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/match/stream")
+async def match_resume_job_stream(data: MatchRequest):
+    """
+    Match a resume with a job description and stream the analysis as Server-Sent Events.
+    
+    Emits a "score" event as soon as the score is parsed, then one
+    "strength", "gap" or "action" event per completed item and a "summary"
+    event. The stream ends with a "complete" event carrying the same
+    payload as /match plus the stored match_id, or an "error" event.
+    """
+    async def event_stream():
+        # The pipeline's score stage is replaced by streaming; the result
+        # then goes through the remaining stages and is stored with its ID
+        context = MatchContext(data.job_description, data.resume_text, data.mode)
+        try:
+            await match_pipeline.select("compact").run(context)
+            async with aclosing(stream_resume_job_match(data.resume_text, data.job_description, data.mode)) as events:
+                async for event, value in events:
+                    if event == "complete":
+                        context.raw_output, context.parsed_output = value
+                        await match_pipeline.select("parse", "persist").run(context)
+                        
+                        response = match_response(context)
+                        yield format_sse("complete", response.model_dump())
+                    elif event == "score":
+                        yield format_sse(event, {"score": value})
+                    else:
+                        yield format_sse(event, {"text": value})
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+    
+    return ClosingStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(data: JobRequest):
+    """
+    Queue a match to run in the background.
+    
+    Returns immediately with a job ID to poll with GET /jobs/{job_id}.
+    Jobs are stored in the database, so they survive restarts, and failed
+    attempts are retried with backoff. If callback_url is set, the final
+    job status is POSTed to it; its host must be in JOB_CALLBACK_HOSTS.
+    """
+    if data.callback_url is not None and not callback_allowed(data.callback_url):
+        raise HTTPException(status_code=400, detail="callback_url host is not allowed")
+    try:
+        job_id = await job_queue.submit(data.resume_text, data.job_description, data.mode, data.callback_url)
+        return JobResponse(job_id=job_id, status="queued")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: int):
+    """
+    Get the status of a background match job, with its match record once it succeeded.
+    """
+    try:
+        job = await get_job_status(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/match/batch", response_model=BatchMatchResponse)
+async def match_batch(data: BatchMatchRequest):
+    """
+    Match many resume/job pairs in one request.
+    
+    Accepts explicit pairs, one resume against many jobs, or many resumes
+    against one job. Pairs are analyzed concurrently and the results are
+    returned sorted by score, with failed pairs listed last.
+    """
+    pairs = data.to_pairs()
+    if not pairs:
+        raise HTTPException(status_code=400, detail="The batch does not contain any pairs")
+    if len(pairs) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(pairs)} pairs (maximum is {MAX_BATCH_SIZE})"
         )
+    
+    try:
+        items = await score_pairs(pairs, data.mode)
+        
+        items.sort(key=lambda item: (
+            item.parsed_output is None,
+            -(item.parsed_output.score if item.parsed_output else 0),
+            item.index
+        ))
+        return BatchMatchResponse(results=items)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/match/shortlist", response_model=ShortlistResponse)
+async def match_shortlist(data: ShortlistRequest):
+    """
+    Find the stored job descriptions most similar to a resume.
+    
+    Uses a local TF-IDF index, so no LLM call is made unless deep_score
+    is set, in which case only the shortlisted jobs are analyzed.
+    """
+    try:
+        candidates = [ShortlistCandidate(**candidate) for candidate in await shortlist_jobs(data.resume_text, data.top_k)]
+        
+        if data.deep_score and candidates:
+            items = await score_pairs([(data.resume_text, c.job_description) for c in candidates])
+            for candidate, item in zip(candidates, items):
+                candidate.match_id = item.match_id
+                candidate.raw_output = item.raw_output
+                candidate.parsed_output = item.parsed_output
+                candidate.error = item.error
         
+        return ShortlistResponse(indexed_jobs=len(job_index), candidates=candidates)
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/history", response_model=List[Dict[str, Any]])
 async def get_history(
+    response: Response,
     limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return"),
-    offset: int = Query(0, ge=0, description="Number of records to skip")
+    offset: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Return records after this cursor (from X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. score,summary")
 ):
     """
-    Get the match history from the database.
+    Get the match history from the database, newest first.
+    
+    When a full page is returned, the X-Next-Cursor header holds the
+    cursor for the next page. id and timestamp are always included.
     """
     try:
-        history = await get_match_history(limit, offset)
-        return history
+        columns = parse_history_fields(fields)
+        history = await get_match_history(limit, offset, cursor=cursor, fields=columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if len(history) == limit:
+        last = history[-1]
+        response.headers["X-Next-Cursor"] = encode_history_cursor(last["timestamp"], last["id"])
+    return history
+
+# Declared before /history/{match_id} so "export" is not taken for an ID
+@app.get("/history/export")
+async def export_history(
+    since: Optional[datetime] = Query(None, description="Only include matches at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only include matches before this time"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export, e.g. score,summary"),
+    output_format: ExportFormat = Query("ndjson", alias="format", description="ndjson or parquet")
+):
+    """
+    Export the match history in a time range as NDJSON or Parquet.
+    
+    The response is streamed, so memory use does not grow with the
+    number of records.
+    """
+    try:
+        columns = parse_history_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if output_format == "parquet":
+        body = stream_history_parquet(since, until, columns)
+    else:
+        body = stream_history_ndjson(since, until, columns)
+    
+    return ClosingStreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[output_format],
+        headers={"Content-Disposition": f'attachment; filename="match_history.{output_format}"'}
+    )
 
 @app.get("/history/{match_id}", response_model=Dict[str, Any])
 async def get_match(match_id: int):
@@ -124,6 +371,8 @@ async def get_match(match_id: int):
     Get a specific match record by ID.
     """
     try:
+        # The match may have been returned before the writer stored it
+        await match_writer.written(match_id)
         match = await get_match_by_id(match_id)
         if not match:
             raise HTTPException(status_code=404, detail="Match not found")
@@ -133,6 +382,82 @@ async def get_match(match_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def analytics_response(query: AnalyticsQuery, output_format: str, name: str):
+    """Run an analytics query and return JSON rows or an encoded file."""
+    try:
+        result = await run_analytics(query, output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if output_format == "json":
+        return result
+    
+    return Response(
+        content=result,
+        media_type=ANALYTICS_MEDIA_TYPES[output_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{output_format}"'}
+    )
+
+@app.get("/analytics/scores")
+async def analytics_scores(
+    bucket_width: int = Query(10, ge=1, le=50, description="Width of each score bucket"),
+    since: Optional[datetime] = Query(None, description="Only count matches at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only count matches before this time"),
+    output_format: AnalyticsFormat = Query("json", alias="format", description="json, parquet or arrow")
+):
+    """
+    Score histogram: number of matches per score bucket.
+    """
+    return await analytics_response(
+        score_histogram_query(bucket_width, since, until), output_format, "score_histogram"
+    )
+
+@app.get("/analytics/jobs")
+async def analytics_jobs(
+    limit: int = Query(20, ge=1, le=500, description="Maximum number of jobs to return"),
+    min_matches: int = Query(1, ge=1, description="Leave out jobs with fewer matches"),
+    since: Optional[datetime] = Query(None, description="Only count matches at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only count matches before this time"),
+    output_format: AnalyticsFormat = Query("json", alias="format", description="json, parquet or arrow")
+):
+    """
+    Score percentiles per job description, most matched jobs first.
+    """
+    return await analytics_response(
+        job_percentiles_query(limit, min_matches, since, until), output_format, "job_percentiles"
+    )
+
+@app.get("/analytics/highlights")
+async def analytics_highlights(
+    kind: HighlightKind = Query("gaps", description="gaps or strengths"),
+    limit: int = Query(10, ge=1, le=500, description="Maximum number of entries to return"),
+    since: Optional[datetime] = Query(None, description="Only count matches at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only count matches before this time"),
+    output_format: AnalyticsFormat = Query("json", alias="format", description="json, parquet or arrow")
+):
+    """
+    Most common gaps or strengths across matches.
+    """
+    return await analytics_response(
+        top_highlights_query(kind, limit, since, until), output_format, f"top_{kind}"
+    )
+
+@app.get("/analytics/volume")
+async def analytics_volume(
+    bucket: TimeBucket = Query("day", description="hour, day, week or month"),
+    since: Optional[datetime] = Query(None, description="Only count matches at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only count matches before this time"),
+    output_format: AnalyticsFormat = Query("json", alias="format", description="json, parquet or arrow")
+):
+    """
+    Match volume and average score per time bucket.
+    """
+    return await analytics_response(
+        volume_query(bucket, since, until), output_format, "match_volume"
+    )
+
 @app.get("/")
 async def root():
     """
@@ -143,90 +468,133 @@ async def root():
 @app.post("/match-file", response_model=MatchResponse)
 async def match_resume_file(
     resume_file: UploadFile = File(...),
-    job_description: str = Form(...)
+    job_description: str = Form(...),
+    mode: str = Form("llm")
 ):
     """
     Match a resume file with a job description and return compatibility analysis.
     
-    Supports .docx and .txt files.
+    Supports .docx, .pdf and .txt files. The upload is streamed to a
+    temporary file and parsed in a worker process, subject to the
+    MAX_UPLOAD_BYTES and MAX_DOCUMENT_PAGES limits.
     """
+    if mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}. Use one of: {', '.join(MATCH_MODES)}")
+    
     try:
-        # Read the file content
-        file_content = await resume_file.read()
-        
-        # Process the file
-        resume_text = process_resume_file(file_content, resume_file.filename)
-        
-        if not resume_text:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file format: {resume_file.filename}. Only .docx and .txt files are supported."
-            )
-        
-        # Analyze the match
-        raw_output, parsed_output = await analyze_resume_job_match(
-            resume_text, 
-            job_description
+        context = await file_match_pipeline.run(
+            MatchContext(job_description, mode=mode, upload=resume_file)
         )
+        return match_response(context)
+    except DocumentLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DocumentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def stream_file_matches(
+    files: List[Dict[str, Any]],
+    job_description: str,
+    mode: str,
+    directory: str
+):
+    """
+    Extract, score and store spooled resumes, yielding NDJSON as each one finishes.
+    
+    Every file runs through file_match_pipeline as its own task:
+    extraction goes to the worker pool, scoring is limited to
+    BATCH_CONCURRENCY at a time and results are stored through the
+    background writer. The spool directory is removed
+    when the stream ends or the client goes away.
+    
+    Args:
+        files: Spooled files, as from spool_bulk_uploads
+        job_description: The job description every resume is matched with
+        mode: "llm" or "fast"
+        directory: The spool directory
+    
+    Yields:
+        One encoded BulkMatchItem line per file, in completion order
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def process(index: int, file: Dict[str, Any]) -> BulkMatchItem:
+        filename = file["filename"]
+        if file["error"]:
+            return BulkMatchItem(index=index, filename=filename, error=file["error"])
         
-        # Convert parsed output to MatchDetails if it exists
-        structured_output = None
-        if parsed_output:
-            # Check if we have the new format or the old format
-            if all(key in parsed_output for key in ["strengths", "gaps", "actions"]):
-                # New format
-                structured_output = MatchDetails(
-                    score=parsed_output["score"],
-                    strengths=parsed_output["strengths"],
-                    gaps=parsed_output["gaps"],
-                    actions=parsed_output["actions"],
-                    summary=parsed_output["summary"]
-                )
-            elif "highlights" in parsed_output:
-                # Old format - convert highlights to strengths and gaps
-                strengths = []
-                gaps = []
-                for highlight in parsed_output["highlights"]:
-                    if highlight["type"] == "match":
-                        strengths.append(highlight["description"])
-                    elif highlight["type"] == "gap":
-                        gaps.append(highlight["description"])
-                
-                structured_output = MatchDetails(
-                    score=parsed_output["score"],
-                    strengths=strengths,
-                    gaps=gaps,
-                    actions=["Update your resume to address the identified gaps"],
-                    summary=parsed_output["summary"]
-                )
-        
-        # Store the result in the database
-        match_id = await store_match_result(
-            resume_text,
+        context = MatchContext(
             job_description,
-            raw_output,
-            parsed_output
+            mode=mode,
+            priority="batch",
+            path=file["path"],
+            filename=filename,
+            digest=file["digest"]
         )
+        try:
+            await file_match_pipeline.run(context, {"score": semaphore})
+        except Exception as e:
+            return BulkMatchItem(index=index, filename=filename, error=str(e))
         
-        # Also save to the new storage format
-        if structured_output:
-            save_match_to_db(
-                resume_text,
-                job_description,
-                structured_output.score,
-                structured_output.strengths,
-                structured_output.gaps,
-                structured_output.actions,
-                structured_output.summary
-            )
-            
-        return MatchResponse(
-            raw_output=raw_output,
-            parsed_output=structured_output
+        return BulkMatchItem(
+            index=index,
+            filename=filename,
+            match_id=context.match_id,
+            raw_output=context.raw_output,
+            parsed_output=context.details,
+            engine=context.engine
         )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    tasks = [asyncio.create_task(process(index, file)) for index, file in enumerate(files)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            yield item.model_dump_json() + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        shutil.rmtree(directory, ignore_errors=True)
+
+@app.post("/match-files")
+async def match_resume_files(
+    resume_files: List[UploadFile] = File(...),
+    job_description: str = Form(...),
+    mode: str = Form("llm")
+):
+    """
+    Match many resume files with one job description, streaming the results.
+    
+    Accepts any mix of .docx, .pdf and .txt files and .zip archives of
+    them. Returns newline-delimited JSON, one BulkMatchItem per resume in
+    the order they finish; files that cannot be read are reported with an
+    error instead of failing the request.
+    """
+    if mode not in MATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}. Use one of: {', '.join(MATCH_MODES)}")
+    
+    directory = tempfile.mkdtemp(prefix="bulk_upload_")
+    try:
+        files = await spool_bulk_uploads(resume_files, directory)
+    except DocumentLimitError as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
+    except DocumentError as e:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    
+    if not files:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No resume files found in the upload")
+    
+    return ClosingStreamingResponse(
+        stream_file_matches(files, job_description, mode, directory),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/info")
 async def api_info():
@@ -236,17 +604,40 @@ async def api_info():
     return {
         "name": "Job Matcher API",
         "version": "1.0.0",
-        "description": "API for matching resumes with job descriptions using AI"
+        "description": "API for matching resumes with job descriptions using AI",
+        "llm": get_backend_info(),
+        "cache": get_cache_stats(),
+        "inflight": get_inflight_stats(),
+        "rate_limiter": rate_limiter.get_stats(),
+        "writer": match_writer.get_stats(),
+        "jobs": job_queue.get_stats(),
+        "extraction": get_extraction_stats(),
+        "chat": chat_sessions.get_stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Metrics in the Prometheus text format.
+    """
+    return Response(content=render_metrics(), media_type=METRICS_MEDIA_TYPE)
+
 @app.post("/chat")
 async def chat(data: ChatRequest):
     """
     Chat with an AI assistant about the resume, job description, and match results.
     
-    The assistant can answer questions and provide personalized advice based on the match analysis.
+    With a match_id the conversation is kept on the server: each question
+    only needs the message, and earlier turns are remembered. Without one,
+    the question is answered on its own from the texts sent with it.
     """
     try:
+        if data.match_id is not None:
+            reply = await chat_sessions.reply(data.match_id, data.message)
+            if reply is None:
+                raise HTTPException(status_code=404, detail="Match not found")
+            return reply
+        
         response = await chat_with_assistant(
             data.resume_text,
             data.job_description,
@@ -255,6 +646,66 @@ async def chat(data: ChatRequest):
         )
         
         return {"response": response}
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/chat/stream")
+async def chat_stream(data: ChatRequest):
+    """
+    Chat with the assistant, streaming the reply as Server-Sent Events.
+    
+    Emits a "token" event for each piece of the reply as the model
+    generates it, then a "complete" event with the same payload as /chat,
+    or an "error" event. Closing the connection stops the generation, and
+    an unfinished answer is not added to the conversation.
+    """
+    session = None
+    if data.match_id is not None:
+        session = await chat_sessions.get(data.match_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Match not found")
+    
+    async def event_stream():
+        try:
+            if session is not None:
+                async with aclosing(chat_sessions.stream_reply(session, data.message)) as events:
+                    async for event, value in events:
+                        yield format_sse(event, {"text": value} if event == "token" else value)
+                return
+            
+            messages = one_off_chat_messages(data.resume_text, data.job_description, data.match_result, data.message)
+            chunks = []
+            async with aclosing(stream_chat(messages)) as deltas:
+                async for delta in deltas:
+                    chunks.append(delta)
+                    yield format_sse("token", {"text": delta})
+            yield format_sse("complete", {"response": "".join(chunks)})
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+    
+    return ClosingStreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/{match_id}")
+async def get_chat(match_id: int):
+    """
+    Get the conversation about a match: the summary of older turns and the recent ones.
+    """
+    session = await chat_sessions.get(match_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+    return session.to_dict()
+
+@app.delete("/chat/{match_id}")
+async def delete_chat(match_id: int):
+    """
+    Forget the conversation about a match.
+    """
+    await chat_sessions.delete(match_id)
+    return {"match_id": match_id, "deleted": True}
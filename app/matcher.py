@@ -1,15 +1,108 @@
 import os
 import json
+import time
 import asyncio
-from typing import Dict, Any, Optional, Tuple
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, List, Optional, Sequence, Tuple, Union
 from dotenv import load_dotenv
-from openai import OpenAI, APIError, RateLimitError, APITimeoutError
+from openai import APIError, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from app.cache import make_cache_key, get_cached_result, cache_result, coalesce
+from app.json_stream import MatchStreamParser, MatchEvent, LIST_FIELDS, parse_match_output, decode_match_output, count_parse
+from app.fast_scorer import analyze_offline
+from app.compaction import compact_match_inputs, count_tokens
+from app.ratelimit import rate_limiter, RateBudgetExceeded
+from app.llm import create_client, MATCH_MODEL, CHAT_MODEL, OPENAI_TIMEOUT
+from app.metrics import stage, record_stage, record_llm_usage, LLM_IN_FLIGHT, LLM_STREAMS_CANCELLED
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Concurrency settings for LLM calls
+MATCH_CONCURRENCY = int(os.getenv("MATCH_CONCURRENCY", "32"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Fall back to the offline scorer when the LLM is unavailable. If
+# LLM_QUEUE_TIMEOUT is set, waiting longer than that for rate budget or
+# a free LLM slot also counts as unavailable.
+FAST_FALLBACK = os.getenv("FAST_FALLBACK", "true").lower() in ("1", "true", "yes")
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT")) if os.getenv("LLM_QUEUE_TIMEOUT") else None
+
+# Model settings for match analysis; the model is set by MATCH_MODEL in
+# app/llm.py. Bump PROMPT_VERSION whenever generate_match_prompt changes
+# so cached results are not reused.
+MATCH_TEMPERATURE = 0.4
+PROMPT_VERSION = "1"
+
+# Completion tokens assumed when reserving rate budget for a call
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("EXPECTED_COMPLETION_TOKENS", "500"))
+
+# Length limit of the rolling summary of older chat turns
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+
+# The shared client for the configured LLM_BACKEND
+client = create_client()
+
+# Limits the number of LLM calls in flight at the same time
+llm_semaphore = asyncio.Semaphore(MATCH_CONCURRENCY)
+
+# Analysis modes: "llm" uses OpenAI (with offline fallback), "fast" uses the offline scorer
+MATCH_MODES = ("llm", "fast")
+
+class LLMUnavailableError(Exception):
+    """Raised when no LLM slot frees up within LLM_QUEUE_TIMEOUT."""
+
+# Errors after which the offline scorer is used instead of failing the request
+FALLBACK_ERRORS = (
+    RateLimitError, APITimeoutError, APIConnectionError, InternalServerError, LLMUnavailableError,
+    RateBudgetExceeded
+)
+
+@asynccontextmanager
+async def llm_slot():
+    """Hold one of the MATCH_CONCURRENCY LLM slots for the duration of a call."""
+    try:
+        await asyncio.wait_for(llm_semaphore.acquire(), LLM_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise LLMUnavailableError("All LLM slots are busy")
+    LLM_IN_FLIGHT.inc()
+    try:
+        yield
+    finally:
+        LLM_IN_FLIGHT.dec()
+        llm_semaphore.release()
+
+def estimate_request_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt and completion tokens of a chat completion call."""
+    # Each message carries a few tokens of formatting on top of its content
+    return sum(count_tokens(message["content"]) + 4 for message in messages) + EXPECTED_COMPLETION_TOKENS
+
+async def create_completion(messages: List[Dict[str, str]], priority: str = "interactive", **kwargs):
+    """
+    Call the chat completions API under the rate limiter.
+    
+    Waits for rate budget in the given lane, then for an LLM slot, and
+    retries rate limits and transient errors.
+    
+    Args:
+        messages: The chat messages
+        priority: "interactive" or "batch"
+        **kwargs: Further arguments for chat.completions.create
+    """
+    async def call():
+        async with llm_slot():
+            return await client.chat.completions.create(messages=messages, timeout=OPENAI_TIMEOUT, **kwargs)
+    
+    # Includes waiting for rate budget and a slot, as that is part of the LLM's cost
+    with stage("llm"):
+        response = await rate_limiter.call(call, estimate_request_tokens(messages), priority, LLM_QUEUE_TIMEOUT)
+    record_llm_usage(getattr(response, "usage", None))
+    return response
+
+def fallback_result(resume: str, job_description: str, reason: Exception) -> Tuple[str, Dict[str, Any]]:
+    """Score a match offline after the LLM failed, recording why."""
+    raw_output, parsed_output = analyze_offline(resume, job_description)
+    parsed_output["fallback_reason"] = type(reason).__name__
+    return raw_output, parsed_output
 
 def generate_match_prompt(resume: str, job: str) -> str:
     return f"""
@@ -49,58 +142,465 @@ For actions: Provide 3-5 specific, actionable recommendations the candidate can
 For summary: Write an encouraging 2-3 sentence summary that reflects empathy and clarity.
 """
 
-async def analyze_resume_job_match(resume: str, job_description: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+async def analyze_resume_job_match(
+    resume: str,
+    job_description: str,
+    mode: str = "llm",
+    priority: str = "interactive",
+    fallback: Optional[bool] = None
+) -> Tuple[str, Optional[Dict[str, Any]]]:
     """
     Analyze the match between a resume and job description using OpenAI.
     
+    In "fast" mode, or when OpenAI is unavailable and fallback is on, the
+    offline scorer is used instead and the parsed output carries
+    "engine": "fast".
+    
     Args:
         resume: The resume text
         job_description: The job description text
-        
+        mode: "llm" or "fast"
+        priority: Rate limiter lane, "interactive" or "batch"
+        fallback: Whether to fall back to the offline scorer (default:
+            FAST_FALLBACK); callers that retry later themselves, like
+            background jobs, turn it off
+    
     Returns:
         Tuple containing:
         - Raw output from OpenAI
         - Parsed JSON response (if parsing was successful, otherwise None)
     """
-    prompt = generate_match_prompt(resume, job_description)
+    if mode == "fast":
+        with stage("fast_score"):
+            return analyze_offline(resume, job_description)
+    
+    # The prompt gets the compacted texts, so inputs differing only in
+    # boilerplate or whitespace share a cache entry
+    prompt_resume, prompt_job, _ = compact_match_inputs(resume, job_description)
+    
+    # Identical inputs return the cached result without calling OpenAI
+    with stage("cache_lookup"):
+        cache_key = make_cache_key(prompt_resume, prompt_job, PROMPT_VERSION, MATCH_MODEL, MATCH_TEMPERATURE)
+        cached = await get_cached_result(cache_key)
+    if cached is not None:
+        return cached
+    
+    if fallback is None:
+        fallback = FAST_FALLBACK
+    
+    # Concurrent duplicates wait for the call that is already in flight,
+    # unless it would answer with a fallback they did not ask for
+    with stage("prompt"):
+        prompt = generate_match_prompt(prompt_resume, prompt_job)
+    return await coalesce(
+        cache_key if fallback else f"{cache_key}:no-fallback",
+        lambda: _run_match_analysis(resume, job_description, cache_key, prompt, priority, fallback)
+    )
+
+async def _run_match_analysis(
+    resume: str,
+    job_description: str,
+    cache_key: str,
+    prompt: str,
+    priority: str = "interactive",
+    fallback: bool = True
+) -> Tuple[str, Optional[Dict[str, Any]]]:
     
     try:
-        # Use synchronous client with await_async=False
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",  # Using gpt-3.5-turbo for faster response
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
-            timeout=30  # 30 second timeout
+        response = await create_completion(
+            [{"role": "user", "content": prompt}],
+            priority,
+            model=MATCH_MODEL,
+            temperature=MATCH_TEMPERATURE
         )
         
         raw_output = response.choices[0].message.content
+        with stage("decode"):
+            parsed_output, repairs, complete = decode_match_output(raw_output)
+            count_parse(parsed_output, repairs)
         
-        # Try to parse the JSON response
-        parsed_output = None
-        try:
-            # Extract JSON if it's wrapped in markdown code blocks
-            if "```json" in raw_output and "```" in raw_output:
-                json_content = raw_output.split("```json")[1].split("```")[0].strip()
-                parsed_output = json.loads(json_content)
-            else:
-                # Try to parse the entire response as JSON
-                parsed_output = json.loads(raw_output)
-                
-            # Validate the parsed output has the expected structure
-            required_keys = ["score", "strengths", "gaps", "actions", "summary"]
-            if not all(key in parsed_output for key in required_keys):
-                parsed_output = None
-                
-        except (json.JSONDecodeError, IndexError):
-            parsed_output = None
-            
-        return raw_output, parsed_output
+        # Only cache usable, complete results so a retry can recover from a
+        # bad or cut-off response; a repaired truncation is still returned
+        if parsed_output is not None and complete:
+            with stage("cache_store"):
+                await cache_result(cache_key, raw_output, parsed_output)
         
-    except RateLimitError:
-        raise Exception("OpenAI API rate limit exceeded. Please try again later.")
-    except APITimeoutError:
-        raise Exception("OpenAI API request timed out. Please try again later.")
+        return raw_output, parsed_output
+    
+    except FALLBACK_ERRORS as e:
+        if fallback:
+            return fallback_result(resume, job_description, e)
+        if isinstance(e, RateLimitError):
+            raise Exception("OpenAI API rate limit exceeded. Please try again later.")
+        if isinstance(e, APITimeoutError):
+            raise Exception("OpenAI API request timed out. Please try again later.")
+        if isinstance(e, (LLMUnavailableError, RateBudgetExceeded)):
+            raise Exception("The service is busy. Please try again later.")
+        raise Exception(f"OpenAI API error: {str(e)}")
     except APIError as e:
         raise Exception(f"OpenAI API error: {str(e)}")
     except Exception as e:
         raise Exception(f"Error processing request: {str(e)}")
+
+async def stream_resume_job_match(
+    resume: str,
+    job_description: str,
+    mode: str = "llm"
+) -> AsyncIterator[MatchEvent]:
+    """
+    Analyze a match while streaming the completion from OpenAI.
+    
+    Yields ("score", int), ("strength", str), ("gap", str), ("action", str)
+    and ("summary", str) events as soon as each field is complete, followed
+    by a final ("complete", (raw_output, parsed_output)) event.
+    
+    If the caller stops iterating, because the client went away, the
+    upstream request is closed right away, as in stream_chat.
+    
+    Args:
+        resume: The resume text
+        job_description: The job description text
+        mode: "llm" or "fast"
+    """
+    if mode == "fast":
+        result = analyze_offline(resume, job_description)
+        for event in match_events(result[1]):
+            yield event
+        yield "complete", result
+        return
+    
+    prompt_resume, prompt_job, _ = compact_match_inputs(resume, job_description)
+    with stage("cache_lookup"):
+        cache_key = make_cache_key(prompt_resume, prompt_job, PROMPT_VERSION, MATCH_MODEL, MATCH_TEMPERATURE)
+        cached = await get_cached_result(cache_key)
+    if cached is not None:
+        raw_output, parsed_output = cached
+        for event in match_events(parsed_output):
+            yield event
+        yield "complete", cached
+        return
+    
+    prompt = generate_match_prompt(prompt_resume, prompt_job)
+    parser = MatchStreamParser()
+    chunks = []
+    
+    messages = [{"role": "user", "content": prompt}]
+    
+    stream = None
+    try:
+        # The slot is held while the stream is read, so it is taken around
+        # the rate limited call rather than inside it
+        async with llm_slot():
+            stream = await rate_limiter.call(
+                lambda: client.chat.completions.create(
+                    model=MATCH_MODEL,
+                    messages=messages,
+                    temperature=MATCH_TEMPERATURE,
+                    timeout=OPENAI_TIMEOUT,
+                    stream=True
+                ),
+                estimate_request_tokens(messages),
+                "interactive",
+                LLM_QUEUE_TIMEOUT
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                chunks.append(delta)
+                for event in parser.feed(delta):
+                    yield event
+    
+    except (asyncio.CancelledError, GeneratorExit):
+        LLM_STREAMS_CANCELLED.inc()
+        raise
+    except FALLBACK_ERRORS as e:
+        # Fall back only if nothing has been sent to the client yet
+        if not FAST_FALLBACK or chunks:
+            raise Exception(f"OpenAI API error: {str(e)}")
+        result = fallback_result(resume, job_description, e)
+        for event in match_events(result[1]):
+            yield event
+        yield "complete", result
+        return
+    except APIError as e:
+        raise Exception(f"OpenAI API error: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Error processing request: {str(e)}")
+    finally:
+        if stream is not None:
+            await close_stream(stream)
+    
+    raw_output = "".join(chunks)
+    # The parser has already read the whole output while streaming
+    with stage("decode"):
+        parsed_output = parser.result()
+    # As for /match, output cut off mid-object is returned but not cached
+    if parsed_output is not None and parser.done:
+        await cache_result(cache_key, raw_output, parsed_output)
+    
+    yield "complete", (raw_output, parsed_output)
+
+def match_events(parsed_output: Optional[Dict[str, Any]]) -> List[MatchEvent]:
+    """Build the stream events for an already complete match result."""
+    if not parsed_output:
+        return []
+    
+    events: List[MatchEvent] = [("score", parsed_output["score"])]
+    for field, event_name in LIST_FIELDS.items():
+        events.extend((event_name, item) for item in parsed_output.get(field, []))
+    events.append(("summary", parsed_output["summary"]))
+    return events
+
+async def analyze_resume_job_matches(
+    pairs: List[Tuple[str, str]],
+    concurrency: int = BATCH_CONCURRENCY,
+    mode: str = "llm",
+    priority: str = "batch"
+) -> List[Union[Tuple[str, Optional[Dict[str, Any]]], Exception]]:
+    """
+    Analyze several resume/job pairs with bounded concurrency.
+    
+    Args:
+        pairs: List of (resume, job_description) tuples
+        concurrency: Maximum number of pairs analyzed at the same time
+        mode: "llm" or "fast"
+        priority: Rate limiter lane; batches yield to interactive matches
+    
+    Returns:
+        One entry per pair, in the same order: either the result of
+        analyze_resume_job_match or the exception it raised
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def analyze_one(resume: str, job_description: str):
+        async with semaphore:
+            try:
+                return await analyze_resume_job_match(resume, job_description, mode, priority)
+            except Exception as e:
+                return e
+    
+    return await asyncio.gather(*[analyze_one(resume, job) for resume, job in pairs])
+
+def generate_chat_prompt(resume: str, job: str, match_result: Dict[str, Any]) -> str:
+    return f"""
+You are an expert career coach helping a candidate improve their fit for a job.
+Use the resume, job description and match analysis below to answer the candidate's questions.
+Give specific, actionable and encouraging advice that references the actual content.
+
+Resume:
+{resume}
+
+Job Description:
+{job}
+
+Match Analysis:
+{json.dumps(match_result, indent=2)}
+"""
+
+def build_chat_messages(
+    system_prompt: str,
+    message: str,
+    summary: Optional[str] = None,
+    turns: Sequence[Dict[str, str]] = ()
+) -> List[Dict[str, str]]:
+    """
+    Build the messages for one chat turn.
+    
+    The static context comes first and stays byte-identical between turns
+    of a conversation, so providers with prompt caching only bill and
+    process it in full once. The parts that change follow it.
+    
+    Args:
+        system_prompt: Prompt with the resume, job and match analysis
+        message: The user's question
+        summary: Summary of turns no longer sent verbatim (optional)
+        turns: Recent turns as dictionaries with user and assistant keys
+    
+    Returns:
+        The chat messages
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the conversation so far:\n{summary}"})
+    for turn in turns:
+        messages.append({"role": "user", "content": turn["user"]})
+        messages.append({"role": "assistant", "content": turn["assistant"]})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+async def complete_chat(
+    messages: List[Dict[str, str]],
+    priority: str = "interactive",
+    temperature: float = 0.7,
+    **kwargs
+) -> str:
+    """
+    Get the assistant's reply to a conversation.
+    
+    Args:
+        messages: The chat messages
+        priority: Rate limiter lane
+        temperature: The sampling temperature
+        **kwargs: Further arguments for chat.completions.create
+    
+    Returns:
+        The assistant's reply
+    """
+    try:
+        response = await create_completion(
+            messages,
+            priority,
+            model=CHAT_MODEL,
+            temperature=temperature,
+            **kwargs
+        )
+        
+        return response.choices[0].message.content
+    
+    except Exception as e:
+        raise chat_error(e)
+
+def chat_error(error: Exception) -> Exception:
+    """Translate an error from a chat call into the message shown to the user."""
+    if isinstance(error, RateLimitError):
+        return Exception("OpenAI API rate limit exceeded. Please try again later.")
+    if isinstance(error, APITimeoutError):
+        return Exception("OpenAI API request timed out. Please try again later.")
+    if isinstance(error, (LLMUnavailableError, RateBudgetExceeded)):
+        return Exception("The service is busy. Please try again later.")
+    if isinstance(error, APIError):
+        return Exception(f"OpenAI API error: {str(error)}")
+    return Exception(f"Error processing request: {str(error)}")
+
+async def close_stream(stream: Any) -> None:
+    """Close a completion stream, which aborts the HTTP request if it is still being read."""
+    close = getattr(stream, "close", None) or stream.aclose
+    await close()
+
+async def stream_chat(
+    messages: List[Dict[str, str]],
+    priority: str = "interactive",
+    temperature: float = 0.7
+) -> AsyncIterator[str]:
+    """
+    Stream the assistant's reply to a conversation as it is generated.
+    
+    If the caller stops iterating, because the client went away, the
+    upstream request is closed right away, so the model stops generating
+    and billing tokens.
+    
+    Args:
+        messages: The chat messages
+        priority: Rate limiter lane
+        temperature: The sampling temperature
+    
+    Yields:
+        The reply, piece by piece
+    """
+    stream = None
+    start = time.perf_counter()
+    first = True
+    try:
+        # The slot is held while the stream is read, as for match streams
+        async with llm_slot():
+            stream = await rate_limiter.call(
+                lambda: client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=OPENAI_TIMEOUT,
+                    stream=True
+                ),
+                estimate_request_tokens(messages),
+                priority,
+                LLM_QUEUE_TIMEOUT
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first:
+                    # What the user waits for before the answer starts
+                    record_stage("first_token", time.perf_counter() - start)
+                    first = False
+                yield delta
+    
+    except (asyncio.CancelledError, GeneratorExit):
+        LLM_STREAMS_CANCELLED.inc()
+        raise
+    except Exception as e:
+        raise chat_error(e)
+    finally:
+        if stream is not None:
+            await close_stream(stream)
+
+async def chat_with_assistant(
+    resume: str,
+    job_description: str,
+    match_result: Dict[str, Any],
+    message: str
+) -> str:
+    """
+    Answer a single question about a match using OpenAI, without history.
+    
+    Args:
+        resume: The resume text
+        job_description: The job description text
+        match_result: The structured match analysis
+        message: The user's question
+    
+    Returns:
+        The assistant's reply
+    """
+    return await complete_chat(one_off_chat_messages(resume, job_description, match_result, message))
+
+def one_off_chat_messages(
+    resume: str,
+    job_description: str,
+    match_result: Dict[str, Any],
+    message: str
+) -> List[Dict[str, str]]:
+    """Build the messages for a question asked without a chat session."""
+    prompt_resume, prompt_job, _ = compact_match_inputs(resume, job_description)
+    system_prompt = generate_chat_prompt(prompt_resume, prompt_job, match_result)
+    return build_chat_messages(system_prompt, message)
+
+def generate_summary_prompt(summary: Optional[str], turns: Sequence[Dict[str, str]]) -> str:
+    transcript = "\n\n".join(f"User: {turn['user']}\nAssistant: {turn['assistant']}" for turn in turns)
+    return f"""
+Summarize this conversation between a candidate and a career coach about a job match.
+Keep the candidate's questions, the advice given and anything the candidate said about themselves.
+Write at most {CHAT_SUMMARY_TOKENS} tokens of plain text.
+
+Summary of the conversation before this part:
+{summary or "(none)"}
+
+Conversation:
+{transcript}
+"""
+
+async def summarize_conversation(summary: Optional[str], turns: Sequence[Dict[str, str]]) -> str:
+    """
+    Fold chat turns into the running summary of a conversation.
+    
+    Runs in the batch lane, as no request is waiting for it.
+    
+    Args:
+        summary: The summary so far (optional)
+        turns: The turns to add to it
+    
+    Returns:
+        The new summary
+    """
+    reply = await complete_chat(
+        [{"role": "user", "content": generate_summary_prompt(summary, turns)}],
+        "batch",
+        temperature=0.2,
+        max_tokens=CHAT_SUMMARY_TOKENS
+    )
+    return reply.strip()
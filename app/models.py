@@ -1,10 +1,35 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Any, Dict, List, Literal, Optional, Tuple
 from fastapi import UploadFile, File, Form
 
+MatchMode = Literal["llm", "fast"]
+
+# Output formats and options of the analytics endpoints
+AnalyticsFormat = Literal["json", "parquet", "arrow"]
+TimeBucket = Literal["hour", "day", "week", "month"]
+HighlightKind = Literal["gaps", "strengths"]
+
+# Output formats of the history export
+ExportFormat = Literal["ndjson", "parquet"]
+
 class MatchRequest(BaseModel):
     resume_text: str
     job_description: str
+    mode: MatchMode = Field("llm", description="'llm' for the full AI analysis, 'fast' for the instant offline scorer")
+
+class JobRequest(MatchRequest):
+    callback_url: Optional[str] = Field(None, description="URL that receives the job status as a POST when the job finishes")
+    
+    @field_validator("callback_url")
+    @classmethod
+    def check_callback_url(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None and not value.startswith(("http://", "https://")):
+            raise ValueError("callback_url must be an http or https URL")
+        return value
+
+class JobResponse(BaseModel):
+    job_id: int = Field(..., description="ID to poll with GET /jobs/{job_id}")
+    status: str = Field(..., description="Job status: 'queued', 'running', 'succeeded' or 'failed'")
 
 class FileMatchRequest(BaseModel):
     job_description: str
@@ -35,3 +60,89 @@ class MatchDetails(BaseModel):
 class MatchResponse(BaseModel):
     raw_output: str = Field(..., description="Raw output from the LLM")
     parsed_output: Optional[MatchDetails] = Field(None, description="Structured output if parsing was successful")
+    engine: str = Field("llm", description="Engine that produced the result: 'llm' or 'fast'")
+    prompt_stats: Optional[Dict[str, Any]] = Field(None, description="Token counts before and after prompt compaction (LLM results only)")
+    match_id: Optional[int] = Field(None, description="ID of the stored match, e.g. for /chat")
+
+class BatchMatchRequest(BaseModel):
+    """
+    A batch of matches given as explicit pairs, one resume against many
+    jobs (resume_text + job_descriptions) or many resumes against one job
+    (resume_texts + job_description).
+    """
+    pairs: Optional[List[MatchRequest]] = Field(None, description="Explicit resume/job pairs")
+    resume_text: Optional[str] = Field(None, description="Single resume scored against job_descriptions")
+    job_descriptions: Optional[List[str]] = Field(None, description="Jobs to score resume_text against")
+    resume_texts: Optional[List[str]] = Field(None, description="Resumes to score against job_description")
+    job_description: Optional[str] = Field(None, description="Single job scored against resume_texts")
+    mode: MatchMode = Field("llm", description="Analysis mode used for every pair")
+    
+    @model_validator(mode="after")
+    def check_single_mode(self):
+        modes = [
+            self.pairs is not None,
+            self.resume_text is not None or self.job_descriptions is not None,
+            self.resume_texts is not None or self.job_description is not None
+        ]
+        if sum(modes) != 1:
+            raise ValueError("Provide exactly one of: pairs, resume_text + job_descriptions, or resume_texts + job_description")
+        if modes[1] and (self.resume_text is None or self.job_descriptions is None):
+            raise ValueError("resume_text and job_descriptions must be provided together")
+        if modes[2] and (self.resume_texts is None or self.job_description is None):
+            raise ValueError("resume_texts and job_description must be provided together")
+        return self
+    
+    def to_pairs(self) -> List[Tuple[str, str]]:
+        """Expand the request into (resume, job_description) pairs."""
+        if self.pairs is not None:
+            return [(pair.resume_text, pair.job_description) for pair in self.pairs]
+        if self.job_descriptions is not None:
+            return [(self.resume_text, job) for job in self.job_descriptions]
+        return [(resume, self.job_description) for resume in self.resume_texts]
+
+class BatchMatchItem(BaseModel):
+    index: int = Field(..., description="Position of the pair in the expanded request")
+    match_id: Optional[int] = Field(None, description="ID of the stored match record")
+    raw_output: Optional[str] = Field(None, description="Raw output from the LLM")
+    parsed_output: Optional[MatchDetails] = Field(None, description="Structured output if parsing was successful")
+    error: Optional[str] = Field(None, description="Error message if this pair failed")
+    engine: Optional[str] = Field(None, description="Engine that produced the result: 'llm' or 'fast'")
+
+class BulkMatchItem(BatchMatchItem):
+    filename: str = Field(..., description="Name of the uploaded file, or its path inside a zip archive")
+
+class BatchMatchResponse(BaseModel):
+    results: List[BatchMatchItem] = Field(..., description="Results sorted by score, highest first; failures last")
+
+class ShortlistRequest(BaseModel):
+    resume_text: str
+    top_k: int = Field(10, ge=1, le=100, description="Number of candidate jobs to return")
+    deep_score: bool = Field(False, description="Also run the full LLM analysis on the shortlisted jobs")
+
+class ShortlistCandidate(BaseModel):
+    job_description: str
+    source_id: Optional[int] = Field(None, description="ID of the match record the job description was taken from")
+    similarity: float = Field(..., description="Cosine similarity between the resume and the job description")
+    match_id: Optional[int] = Field(None, description="ID of the stored deep-score match record")
+    raw_output: Optional[str] = Field(None, description="Raw output from the LLM when deep scoring")
+    parsed_output: Optional[MatchDetails] = Field(None, description="Structured deep-score output")
+    error: Optional[str] = Field(None, description="Error message if deep scoring failed")
+
+class ShortlistResponse(BaseModel):
+    indexed_jobs: int = Field(..., description="Number of job descriptions in the similarity index")
+    candidates: List[ShortlistCandidate] = Field(..., description="Most similar jobs first")
+
+class ChatRequest(BaseModel):
+    match_id: Optional[int] = Field(None, description="Stored match to chat about; the server keeps the conversation")
+    resume_text: Optional[str] = Field(None, description="Resume for a one-off question without match_id")
+    job_description: Optional[str] = Field(None, description="Job description for a one-off question without match_id")
+    match_result: Optional[Dict[str, Any]] = Field(None, description="Structured match analysis the conversation is about")
+    message: str = Field(..., description="The user's question for the assistant")
+    
+    @model_validator(mode="after")
+    def check_context(self):
+        if self.match_id is None and (
+            self.resume_text is None or self.job_description is None or self.match_result is None
+        ):
+            raise ValueError("Provide match_id, or resume_text, job_description and match_result")
+        return self
@@ -0,0 +1,207 @@
+import time
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from app.models import MatchDetails
+from app.matcher import analyze_resume_job_match
+from app.compaction import compact_match_inputs
+from app.json_stream import match_details
+from app.ingest import extract_upload_text, extract_path_text
+from app.file_utils import DocumentError
+from app.writer import match_writer
+from app.database import store_match_results
+from app.metrics import record_stage
+
+class MatchContext:
+    """
+    One match as it moves through a MatchPipeline.
+    
+    Entry points set the inputs; every stage reads what the stages before
+    it produced and adds its own results.
+    """
+    
+    def __init__(
+        self,
+        job_description: str,
+        resume_text: Optional[str] = None,
+        mode: str = "llm",
+        priority: str = "interactive",
+        upload: Any = None,
+        path: Optional[str] = None,
+        filename: Optional[str] = None,
+        digest: Optional[str] = None,
+        fallback: Optional[bool] = None
+    ):
+        self.job_description = job_description
+        self.resume_text = resume_text
+        self.mode = mode
+        self.priority = priority
+        # Resume file read by the extract stage: an UploadFile, or a spooled path and its digest
+        self.upload = upload
+        self.path = path
+        self.filename = filename if filename is not None else getattr(upload, "filename", None)
+        self.digest = digest
+        # Whether the score stage may fall back to the offline scorer (default: FAST_FALLBACK)
+        self.fallback = fallback
+        
+        self.prompt_stats: Optional[Dict[str, Any]] = None
+        self.raw_output: Optional[str] = None
+        self.parsed_output: Optional[Dict[str, Any]] = None
+        self.details: Optional[MatchDetails] = None
+        self.match_id: Optional[int] = None
+        self.timings: Dict[str, float] = {}
+    
+    @property
+    def engine(self) -> str:
+        """Which engine produced the result: "llm" or "fast"."""
+        if self.parsed_output:
+            return self.parsed_output.get("engine", "llm")
+        return "llm"
+    
+    def record(self) -> Dict[str, Any]:
+        """Return the match record as the database functions take it."""
+        return {
+            "resume_text": self.resume_text,
+            "job_description": self.job_description,
+            "raw_output": self.raw_output,
+            "parsed_output": self.parsed_output
+        }
+
+Stage = Callable[[MatchContext], Awaitable[None]]
+
+async def extract_stage(context: MatchContext) -> None:
+    """
+    Read the resume text from the uploaded or spooled file.
+    
+    Raises:
+        DocumentLimitError: If the file exceeds the size or page limits
+        DocumentError: If the file cannot be parsed, is unsupported or has no text
+    """
+    if context.upload is not None:
+        text = await extract_upload_text(context.upload)
+    else:
+        text = await extract_path_text(context.path, context.filename, context.digest)
+    
+    if text is None:
+        raise DocumentError(
+            f"Unsupported file format: {context.filename}. Only .docx, .pdf and .txt files are supported."
+        )
+    if not text.strip():
+        raise DocumentError(f"No text found in {context.filename}")
+    context.resume_text = text
+
+async def compact_stage(context: MatchContext) -> None:
+    """Compact the inputs for the prompt; the scorer reuses the cached result."""
+    if context.mode == "fast":
+        return
+    context.prompt_stats = compact_match_inputs(context.resume_text, context.job_description)[2]
+
+async def score_stage(context: MatchContext) -> None:
+    """Analyze the match with the LLM or the offline scorer."""
+    context.raw_output, context.parsed_output = await analyze_resume_job_match(
+        context.resume_text,
+        context.job_description,
+        context.mode,
+        context.priority,
+        context.fallback
+    )
+
+async def parse_stage(context: MatchContext) -> None:
+    """Validate the parsed output against MatchDetails, in either format."""
+    context.details = match_details(context.parsed_output)
+    if context.engine != "llm":
+        # The offline scorer, also as a fallback, never saw the compacted prompt
+        context.prompt_stats = None
+
+async def persist_stage(context: MatchContext) -> None:
+    """Queue the match for the background writer: the one write per match."""
+    context.match_id = await match_writer.enqueue(
+        context.resume_text,
+        context.job_description,
+        context.raw_output,
+        context.parsed_output
+    )
+
+class MatchPipeline:
+    """
+    Named stages a match goes through, in order.
+    
+    Each stage is an async function taking the MatchContext, and is timed
+    under its name on /metrics and in Server-Timing. Pipelines do not
+    change; replace and skip return a new one, so entry points derive
+    their variant from the shared default.
+    """
+    
+    def __init__(self, stages: Sequence[Tuple[str, Stage]]):
+        self.stages: List[Tuple[str, Stage]] = list(stages)
+    
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.stages]
+    
+    def replace(self, name: str, stage: Stage) -> "MatchPipeline":
+        """Return a pipeline running stage in place of the one called name."""
+        if name not in self.names:
+            raise ValueError(f"Unknown stage: {name}")
+        return MatchPipeline([(current, stage if current == name else func) for current, func in self.stages])
+    
+    def skip(self, *names: str) -> "MatchPipeline":
+        """Return a pipeline without the given stages."""
+        return MatchPipeline([(name, func) for name, func in self.stages if name not in names])
+    
+    def select(self, *names: str) -> "MatchPipeline":
+        """Return a pipeline with only the given stages, in their original order."""
+        return MatchPipeline([(name, func) for name, func in self.stages if name in names])
+    
+    async def run(
+        self,
+        context: MatchContext,
+        limits: Optional[Dict[str, asyncio.Semaphore]] = None
+    ) -> MatchContext:
+        """
+        Run every stage on a match.
+        
+        Args:
+            context: The match
+            limits: Semaphores bounding concurrency of single stages across
+                runs, e.g. {"score": semaphore} (optional)
+        
+        Returns:
+            The same context, with every stage's results and timings
+        """
+        for name, func in self.stages:
+            async with AsyncExitStack() as stack:
+                if limits and name in limits:
+                    await stack.enter_async_context(limits[name])
+                start = time.perf_counter()
+                try:
+                    await func(context)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    context.timings[name] = elapsed
+                    record_stage(name, elapsed)
+        return context
+
+# Every entry point runs this pipeline or a variant of it
+file_match_pipeline = MatchPipeline([
+    ("extract", extract_stage),
+    ("compact", compact_stage),
+    ("score", score_stage),
+    ("parse", parse_stage),
+    ("persist", persist_stage)
+])
+match_pipeline = file_match_pipeline.skip("extract")
+# For callers that store results themselves, in one insert or with a job's status
+scoring_pipeline = match_pipeline.skip("persist")
+
+async def persist_many(contexts: List[MatchContext]) -> None:
+    """
+    Store many scored matches in one insert and set their match_id.
+    
+    For batches that skip the persist stage; still one write per match.
+    """
+    start = time.perf_counter()
+    match_ids = await store_match_results([context.record() for context in contexts])
+    for context, match_id in zip(contexts, match_ids):
+        context.match_id = match_id
+    record_stage("persist", time.perf_counter() - start)
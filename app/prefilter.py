@@ -0,0 +1,293 @@
+import os
+import re
+import time
+import zlib
+import asyncio
+import hashlib
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.cache import coalesce
+from app.database import get_job_descriptions_since
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Number of hashed feature buckets per document vector
+PREFILTER_DIMENSIONS = int(os.getenv("PREFILTER_DIMENSIONS", "4096"))
+# Reweight the whole index once it has grown by this fraction
+PREFILTER_REWEIGHT_RATIO = float(os.getenv("PREFILTER_REWEIGHT_RATIO", "0.1"))
+# Seconds between loading newly stored job descriptions for shortlists
+PREFILTER_REFRESH_INTERVAL = float(os.getenv("PREFILTER_REFRESH_INTERVAL", "5"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the
+this to we will with you your
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms plus adjacent-word bigrams.
+    
+    Keeps tech names such as "c++", "c#" and "node.js" intact.
+    """
+    words = [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+    bigrams = [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return words + bigrams
+
+def term_counts(text: str, dimensions: int = PREFILTER_DIMENSIONS) -> np.ndarray:
+    """
+    Hash the terms of a document into a fixed-size count vector.
+    
+    Uses crc32 rather than hash() so vectors are stable across processes.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    indices, counts = hashed_terms(text, dimensions)
+    vector[indices] = counts
+    return vector
+
+def hashed_terms(text: str, dimensions: int = PREFILTER_DIMENSIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the terms of a document into sparse counts.
+    
+    Returns:
+        Tuple of (sorted bucket indices, counts), the nonzero entries of term_counts
+    """
+    buckets = [zlib.crc32(term.encode("utf-8")) % dimensions for term in tokenize(text)]
+    return np.unique(np.array(buckets, dtype=np.int32), return_counts=True)
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Return array, or a copy with twice the capacity if it holds fewer than size items."""
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+def _weigh(indptr: np.ndarray, indices: np.ndarray, counts: np.ndarray, idf: np.ndarray) -> np.ndarray:
+    """Weight sparse term counts in CSR layout by sublinear TF-IDF and L2-normalize each document."""
+    weights = np.log1p(counts, dtype=np.float32) * idf[indices]
+    norms = np.sqrt(np.add.reduceat(weights * weights, indptr[:-1] - indptr[0]))
+    return weights / np.repeat(norms, np.diff(indptr))
+
+class JobIndex:
+    """
+    In-memory TF-IDF similarity index over job descriptions.
+    
+    Documents are stored sparsely, as the hashed terms they contain with
+    their weights, in flat NumPy arrays that grow like lists (CSR
+    layout), so a query is a single gather over the stored terms.
+    
+    Document frequencies are updated as documents are added. Weights are
+    based on the IDF at the last reweight, and the whole index is
+    reweighted once it has grown by PREFILTER_REWEIGHT_RATIO since, so
+    the cost of keeping it current does not grow with each add.
+    """
+    
+    def __init__(self, dimensions: int = PREFILTER_DIMENSIONS, reweight_ratio: float = PREFILTER_REWEIGHT_RATIO):
+        self.dimensions = dimensions
+        self.reweight_ratio = reweight_ratio
+        self.texts: List[str] = []
+        self.source_ids: List[int] = []
+        self._hashes: Dict[str, int] = {}
+        self._doc_freq = np.zeros(dimensions, dtype=np.int64)
+        # Start offsets of each document's terms, then the end of the last one
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._counts = np.zeros(0, dtype=np.uint16)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._idf = self._compute_idf(self._doc_freq, 0)
+        # Number of documents when _idf was computed
+        self._weighted_docs = 0
+        self._reweighting: Dict[str, "asyncio.Task[Any]"] = {}
+    
+    def add(self, text: str, source_id: Optional[int] = None) -> bool:
+        """
+        Add a job description to the index.
+        
+        Args:
+            text: The job description text
+            source_id: ID of the match record the text came from
+        
+        Returns:
+            True if the text was added, False if it was already indexed or has no terms
+        """
+        digest = hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+        if digest in self._hashes:
+            return False
+        indices, counts = hashed_terms(text, self.dimensions)
+        if not len(indices):
+            return False
+        
+        start = self._nnz
+        end = start + len(indices)
+        self._hashes[digest] = len(self.texts)
+        self.texts.append(text)
+        self.source_ids.append(source_id)
+        self._doc_freq[indices] += 1
+        
+        self._indices = _grow(self._indices, end)
+        self._counts = _grow(self._counts, end)
+        self._weights = _grow(self._weights, end)
+        self._indptr = _grow(self._indptr, len(self.texts) + 1)
+        
+        counts = np.minimum(counts, np.iinfo(np.uint16).max)
+        self._indices[start:end] = indices
+        self._counts[start:end] = counts
+        self._weights[start:end] = _weigh(np.array([0, len(indices)]), indices, counts, self._idf)
+        self._indptr[len(self.texts)] = end
+        return True
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    @property
+    def _nnz(self) -> int:
+        return int(self._indptr[len(self.texts)])
+    
+    @property
+    def stale(self) -> bool:
+        """Whether the index has grown enough since the last reweight to redo it."""
+        return len(self.texts) > self._weighted_docs * (1 + self.reweight_ratio)
+    
+    @staticmethod
+    def _compute_idf(doc_freq: np.ndarray, doc_count: int) -> np.ndarray:
+        return (np.log((1 + doc_count) / (1 + doc_freq)) + 1.0).astype(np.float32)
+    
+    def _snapshot(self) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        doc_count = len(self.texts)
+        nnz = self._nnz
+        idf = self._compute_idf(self._doc_freq, doc_count)
+        return doc_count, self._indptr[:doc_count + 1], self._indices[:nnz], self._counts[:nnz], idf
+    
+    def _install(self, doc_count: int, idf: np.ndarray, weights: np.ndarray) -> None:
+        # Documents added while the weights were computed are weighed with the new IDF here
+        nnz = len(weights)
+        self._weights[:nnz] = weights
+        if len(self.texts) > doc_count:
+            end = self._nnz
+            self._weights[nnz:end] = _weigh(
+                self._indptr[doc_count:len(self.texts) + 1], self._indices[nnz:end], self._counts[nnz:end], idf
+            )
+        self._idf = idf
+        self._weighted_docs = doc_count
+    
+    def reweight(self) -> None:
+        """Recompute the IDF and every document's weights."""
+        doc_count, indptr, indices, counts, idf = self._snapshot()
+        self._install(doc_count, idf, _weigh(indptr, indices, counts, idf))
+    
+    async def reweight_async(self) -> None:
+        """
+        Recompute the IDF and weights on a worker thread.
+        
+        Searches and adds go on meanwhile, with the previous weights;
+        concurrent calls share one run.
+        """
+        await coalesce("reweight", self._reweight_in_thread, self._reweighting)
+    
+    async def _reweight_in_thread(self) -> None:
+        doc_count, indptr, indices, counts, idf = self._snapshot()
+        # Appends only write past the snapshot or into a grown copy, so the arrays can be read meanwhile
+        weights = await asyncio.get_running_loop().run_in_executor(None, _weigh, indptr, indices, counts, idf)
+        self._install(doc_count, idf, weights)
+    
+    def search(self, text: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find the job descriptions most similar to a text.
+        
+        Reweights the index first if it is stale; refresh_job_index does
+        that on a worker thread instead.
+        
+        Args:
+            text: The query text, usually a resume
+            top_k: Maximum number of candidates to return
+        
+        Returns:
+            List of dictionaries with job_description, source_id and
+            similarity, most similar first. Jobs sharing no terms with
+            the text are left out.
+        """
+        if not self.texts or top_k <= 0:
+            return []
+        
+        if self.stale:
+            self.reweight()
+        
+        query = np.log1p(term_counts(text, self.dimensions)) * self._idf
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query /= norm
+        
+        nnz = self._nnz
+        products = self._weights[:nnz] * query[self._indices[:nnz]]
+        scores = np.add.reduceat(products, self._indptr[:len(self.texts)])
+        
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        
+        return [
+            {
+                "job_description": self.texts[i],
+                "source_id": self.source_ids[i],
+                "similarity": round(float(scores[i]), 4)
+            }
+            for i in top
+            if scores[i] > 0
+        ]
+
+job_index = JobIndex()
+
+# Timestamp of the latest match already loaded into job_index
+_indexed_until: Optional[datetime] = None
+# When shortlist_jobs last brought job_index up to date, by time.monotonic()
+_last_update = float("-inf")
+_updating: Dict[str, "asyncio.Task[Any]"] = {}
+
+async def refresh_job_index() -> int:
+    """
+    Load job descriptions stored since the last refresh into the index.
+    
+    Returns:
+        Number of new job descriptions added
+    """
+    global _indexed_until
+    
+    added = 0
+    # Records at exactly _indexed_until are read again; add skips them
+    for record in await get_job_descriptions_since(_indexed_until):
+        if job_index.add(record["job_description"], record["id"]):
+            added += 1
+        _indexed_until = max(_indexed_until or record["timestamp"], record["timestamp"])
+    return added
+
+async def update_job_index() -> None:
+    """Refresh the index, then reweight it on a worker thread if it has grown enough."""
+    global _last_update
+    
+    await refresh_job_index()
+    if job_index.stale:
+        await job_index.reweight_async()
+    _last_update = time.monotonic()
+
+async def shortlist_jobs(resume: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Return the stored job descriptions most similar to a resume.
+    
+    The index is brought up to date at most every
+    PREFILTER_REFRESH_INTERVAL seconds, by one caller at a time.
+    
+    Args:
+        resume: The resume text
+        top_k: Maximum number of candidates to return
+    
+    Returns:
+        Candidates as returned by JobIndex.search
+    """
+    if time.monotonic() - _last_update >= PREFILTER_REFRESH_INTERVAL:
+        await coalesce("job_index", update_job_index, _updating)
+    return job_index.search(resume, top_k)
@@ -0,0 +1,299 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import email.utils
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from dotenv import load_dotenv
+from openai import RateLimitError, APIConnectionError, InternalServerError
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Per-minute budgets of the OpenAI account; 0 means no limit
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))
+
+# The worker processes of the multi-worker mode (see app/serve.py) each
+# enforce an equal share of the budgets
+WORKER_PROCESSES = max(1, int(os.getenv("WEB_CONCURRENCY", "1"))) if os.getenv("DB_SOCKET") else 1
+
+# Retries of rate limited and transient failures
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+
+# Lanes in the order they are served
+PRIORITIES = {
+    "interactive": 0,
+    "batch": 1
+}
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+# After a 429 the budgets shrink to this share at most, then grow back
+# by RECOVERY_STEP per successful call
+MIN_BUDGET_SCALE = 0.5
+BACKOFF_FACTOR = 0.8
+RECOVERY_STEP = 0.02
+
+T = TypeVar("T")
+
+class RateBudgetExceeded(Exception):
+    """Raised when a call waited longer than its timeout for rate budget."""
+
+def worker_share(limit: int) -> int:
+    """Return one worker process's share of a per-minute budget; 0 stays unlimited."""
+    return max(1, limit // WORKER_PROCESSES) if limit > 0 else 0
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff for the given retry (0-based), with jitter."""
+    delay = min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read how long the server asked us to wait from an API error.
+    
+    Understands retry-after-ms as well as retry-after given in seconds
+    or as an HTTP date.
+    
+    Returns:
+        Seconds to wait, or None if the response did not say
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (email.utils.parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class _Budget:
+    """Token bucket holding up to limit units, refilled at limit per minute."""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.level = float(limit)
+        self.updated = time.monotonic()
+    
+    def refill(self, now: float, scale: float) -> None:
+        if self.limit > 0:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit * scale / 60)
+        self.updated = now
+    
+    def wait_time(self, amount: float, scale: float) -> float:
+        """Seconds until amount units are available."""
+        if self.limit <= 0 or self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / (self.limit * scale)
+    
+    def take(self, amount: float) -> None:
+        if self.limit > 0:
+            self.level -= amount
+
+class RateLimiter:
+    """
+    Client-side scheduler for LLM calls under requests and tokens per minute budgets.
+    
+    Calls wait in a queue ordered by lane and arrival, and are let through
+    as soon as both budgets have room for them, so work is spread evenly
+    over the minute instead of arriving in bursts the API rejects. An
+    interactive call never waits behind a batch call.
+    
+    A 429 pauses every lane for the time the server asked for and lowers
+    the budgets; each success raises them again, so the rate settles just
+    under the real quota. Token estimates are corrected with the usage
+    reported in responses.
+    """
+    
+    def __init__(self, requests_per_minute: int = LLM_RPM_LIMIT, tokens_per_minute: int = LLM_TPM_LIMIT):
+        self.requests = _Budget(requests_per_minute)
+        self.tokens = _Budget(tokens_per_minute)
+        self.scale = 1.0
+        self._paused_until = 0.0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {
+            "granted": 0,
+            "queued": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "timeouts": 0
+        }
+    
+    async def acquire(self, tokens: int, priority: str = "interactive", timeout: Optional[float] = None) -> None:
+        """
+        Wait until the budgets allow a call.
+        
+        Args:
+            tokens: Estimated tokens the call uses, prompt and completion
+            priority: One of PRIORITIES
+            timeout: Give up after this many seconds (optional)
+        
+        Raises:
+            RateBudgetExceeded: If the timeout passed first
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters and timers from another event loop can never be served
+            self._loop = loop
+            self._waiters = []
+            self._timer = None
+        
+        if self.tokens.limit > 0:
+            # A call larger than the whole budget would otherwise never run
+            tokens = min(tokens, self.tokens.limit)
+        
+        future = loop.create_future()
+        heapq.heappush(self._waiters, [PRIORITIES[priority], next(self._sequence), tokens, future])
+        self._dispatch()
+        if future.done():
+            return
+        
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                # Granted just as the wait timed out
+                return
+            self.stats["timeouts"] += 1
+            self._dispatch()
+            raise RateBudgetExceeded("Waited too long for LLM rate budget")
+        except asyncio.CancelledError:
+            future.cancel()
+            self._dispatch()
+            raise
+    
+    def _dispatch(self) -> None:
+        """Grant waiting calls in order while the budgets allow it."""
+        now = time.monotonic()
+        self.requests.refill(now, self.scale)
+        self.tokens.refill(now, self.scale)
+        
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            
+            wait = max(
+                self._paused_until - now,
+                self.requests.wait_time(1, self.scale),
+                self.tokens.wait_time(tokens, self.scale)
+            )
+            if wait > 0:
+                self._wake_in(wait)
+                return
+            
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.stats["granted"] += 1
+            future.set_result(None)
+    
+    def _wake_in(self, delay: float) -> None:
+        loop = self._loop
+        if self._timer is not None:
+            if self._timer.when() <= loop.time() + delay:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._on_timer)
+    
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+    
+    def pause(self, seconds: float) -> None:
+        """Hold back every lane after a 429 and lower the budgets."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.scale = max(MIN_BUDGET_SCALE, self.scale * BACKOFF_FACTOR)
+        self.stats["rate_limited"] += 1
+    
+    def record_success(self, estimated_tokens: int, used_tokens: Optional[int]) -> None:
+        """Raise the budgets again and correct the token estimate of a finished call."""
+        self.scale = min(1.0, self.scale + RECOVERY_STEP)
+        if isinstance(used_tokens, int) and self.tokens.limit > 0:
+            self.tokens.level = min(self.tokens.limit, self.tokens.level + estimated_tokens - used_tokens)
+    
+    async def call(
+        self,
+        func: Callable[[], Awaitable[T]],
+        tokens: int,
+        priority: str = "interactive",
+        timeout: Optional[float] = None
+    ) -> T:
+        """
+        Run an API call under the budgets, retrying rate limits and transient errors.
+        
+        Retries wait as long as Retry-After asks, or back off exponentially
+        with jitter. When the server asks for more than
+        LLM_RETRY_MAX_SECONDS the error is raised right away.
+        
+        Args:
+            func: Makes the call
+            tokens: Estimated tokens the call uses
+            priority: One of PRIORITIES
+            timeout: Maximum seconds to wait for budget per attempt (optional)
+        
+        Returns:
+            The result of func
+        
+        Raises:
+            RateBudgetExceeded: If budget was not available within timeout
+        """
+        for attempt in itertools.count():
+            await self.acquire(tokens, priority, timeout)
+            try:
+                result = await func()
+            except RETRYABLE_ERRORS as e:
+                delay = retry_after_seconds(e)
+                if attempt >= LLM_MAX_RETRIES or (delay is not None and delay > LLM_RETRY_MAX_SECONDS):
+                    raise
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                
+                self.stats["retries"] += 1
+                if isinstance(e, RateLimitError):
+                    # Everyone waits, not just this call
+                    self.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            
+            usage = getattr(result, "usage", None)
+            self.record_success(tokens, getattr(usage, "total_tokens", None))
+            return result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue, budget and retry counters."""
+        return {
+            **self.stats,
+            "waiting": sum(1 for waiter in self._waiters if not waiter[3].done()),
+            "budget_scale": round(self.scale, 2),
+            "requests_per_minute": self.requests.limit,
+            "tokens_per_minute": self.tokens.limit
+        }
+
+rate_limiter = RateLimiter(worker_share(LLM_RPM_LIMIT), worker_share(LLM_TPM_LIMIT))
@@ -0,0 +1,102 @@
+"""
+Run the service on several worker processes.
+
+DuckDB lets only one process open the database file, so uvicorn's
+--workers cannot be used with app.main directly. This launcher starts a
+database server process that owns the file (see app/db_server.py), then
+the uvicorn workers, which send every database call to it over a Unix
+socket. With one worker, the service runs in a single process as before.
+
+Usage:
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+"""
+import os
+import time
+import shutil
+import secrets
+import argparse
+import tempfile
+import multiprocessing
+import uvicorn
+from dotenv import load_dotenv
+from app.db_server import serve_database
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Seconds to wait for the database server to open the database
+DB_SERVER_START_TIMEOUT = float(os.getenv("DB_SERVER_START_TIMEOUT", "60"))
+
+def default_workers() -> int:
+    """Worker processes to run: WEB_CONCURRENCY, or one per CPU."""
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+
+def start_database_server(path: str, key: str) -> multiprocessing.Process:
+    """
+    Start the database server process and wait until it accepts connections.
+    
+    Args:
+        path: Path of the Unix socket to serve on
+        key: Key the workers authenticate with
+    
+    Returns:
+        The running process
+    
+    Raises:
+        RuntimeError: If the server exits or does not start in time
+    """
+    # Spawned, so the server does not inherit anything the launcher imported
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve_database, args=(path, key), name="duckdb-server"
+    )
+    process.start()
+    
+    deadline = time.monotonic() + DB_SERVER_START_TIMEOUT
+    while not os.path.exists(path):
+        if not process.is_alive():
+            raise RuntimeError("The database server exited during startup")
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError(f"The database server did not start within {DB_SERVER_START_TIMEOUT} seconds")
+        time.sleep(0.05)
+    return process
+
+def serve(workers: int, host: str, port: int, log_level: str = "info") -> None:
+    """
+    Run the service on the given number of worker processes.
+    
+    Args:
+        workers: Number of uvicorn worker processes
+        host: Address to listen on
+        port: Port to listen on
+        log_level: uvicorn log level
+    """
+    if workers <= 1:
+        uvicorn.run("app.main:app", host=host, port=port, log_level=log_level)
+        return
+    
+    # Created with mode 0700, so only this user can reach the socket
+    directory = tempfile.mkdtemp(prefix="job-matcher-")
+    path = os.path.join(directory, "db.sock")
+    key = secrets.token_hex(32)
+    server = start_database_server(path, key)
+    try:
+        # Inherited by the workers; app.database connects to the server instead
+        os.environ["DB_SOCKET"] = path
+        os.environ["DB_SOCKET_KEY"] = key
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        # Returns once every worker has shut down and flushed its writes
+        uvicorn.run("app.main:app", host=host, port=port, workers=workers, log_level=log_level)
+    finally:
+        server.terminate()
+        server.join()
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Worker processes (default: WEB_CONCURRENCY or the CPU count)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    serve(args.workers, args.host, args.port, args.log_level)
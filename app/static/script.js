@@ -23,10 +23,24 @@ document.addEventListener('DOMContentLoaded', function() {
     const historyLoadingEl = document.getElementById('history-loading');
     const historyEmptyEl = document.getElementById('history-empty');
     const historyErrorEl = document.getElementById('history-error');
+    const historyMoreBtn = document.getElementById('history-more');
+    const chatEl = document.getElementById('chat');
+    const chatMessagesEl = document.getElementById('chat-messages');
+    const chatForm = document.getElementById('chat-form');
+    const chatInput = document.getElementById('chat-input');
+    const chatSendBtn = document.getElementById('chat-send');
+    const chatStopBtn = document.getElementById('chat-stop');
+    
+    // Number of history records fetched per page
+    const HISTORY_PAGE_SIZE = 20;
     
     // Current job description and match result for export
     let currentJobDescription = '';
     let currentMatchResult = null;
+    
+    // Stored match the chat is about, and the request of the answer being streamed
+    let currentMatchId = null;
+    let chatController = null;
 
     // Main tab switching
     tabBtns.forEach(btn => {
@@ -90,7 +104,8 @@ document.addEventListener('DOMContentLoaded', function() {
         errorEl.classList.add('hidden');
         
         try {
-            const response = await fetch('/match', {
+            // Stream the analysis so results render as soon as they arrive
+            const response = await fetch('/match/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -106,8 +121,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(errorData.detail || 'An error occurred while processing your request.');
             }
             
-            const data = await response.json();
-            displayResults(data);
+            await readMatchStream(response);
             
         } catch (error) {
             showError(error.message || 'An error occurred while processing your request.');
@@ -134,8 +148,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Check file type
         const fileExt = resumeFile.name.split('.').pop().toLowerCase();
-        if (fileExt !== 'docx' && fileExt !== 'txt') {
-            showError('Only .docx and .txt files are supported.');
+        if (fileExt !== 'docx' && fileExt !== 'pdf' && fileExt !== 'txt') {
+            showError('Only .docx, .pdf and .txt files are supported.');
             return;
         }
         
@@ -193,10 +207,76 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Load the next page of history
+    historyMoreBtn.addEventListener('click', () => {
+        loadHistoryPage();
+    });
+    
     // Refresh history button
     refreshHistoryBtn.addEventListener('click', () => {
         loadHistoryData();
     });
+    
+    // Ask a question about the current match, rendering the answer as it streams in
+    chatForm.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        
+        const message = chatInput.value.trim();
+        if (!message || !currentMatchId || chatController) return;
+        
+        chatInput.value = '';
+        appendChatMessage('user', message);
+        const answerEl = appendChatMessage('assistant', '');
+        chatController = new AbortController();
+        setChatBusy(true);
+        
+        try {
+            const response = await fetch('/chat/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    match_id: currentMatchId,
+                    message: message
+                }),
+                signal: chatController.signal
+            });
+            
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.detail || 'An error occurred while processing your request.');
+            }
+            
+            await readSseStream(response, ({ event, data }) => {
+                if (event === 'token') {
+                    answerEl.textContent += data.text;
+                } else if (event === 'complete') {
+                    answerEl.textContent = data.response;
+                } else if (event === 'error') {
+                    throw new Error(data.detail || 'An error occurred while processing your request.');
+                }
+            });
+            
+        } catch (error) {
+            if (error.name === 'AbortError') {
+                // Closing the request also stops the answer on the server
+                answerEl.classList.add('stopped');
+            } else {
+                answerEl.textContent = error.message || 'An error occurred while processing your request.';
+            }
+        } finally {
+            chatController = null;
+            setChatBusy(false);
+        }
+    });
+    
+    // Stop the answer being streamed
+    chatStopBtn.addEventListener('click', () => {
+        if (chatController) {
+            chatController.abort();
+        }
+    });
 
     // Display match results
     function displayResults(data) {
@@ -299,6 +379,143 @@ document.addEventListener('DOMContentLoaded', function() {
                 exportBtn.remove();
             }
         }
+        
+        // Chatting needs the ID of the stored match
+        showChat(data.match_id);
+    }
+    
+    // Show the chat for a stored match with the conversation so far
+    async function showChat(matchId) {
+        if (chatController) {
+            chatController.abort();
+        }
+        currentMatchId = matchId || null;
+        chatMessagesEl.innerHTML = '';
+        chatEl.classList.toggle('hidden', !currentMatchId);
+        if (!currentMatchId) return;
+        
+        try {
+            const response = await fetch(`/chat/${currentMatchId}`);
+            if (!response.ok) return;
+            
+            const session = await response.json();
+            session.turns.forEach(turn => {
+                appendChatMessage('user', turn.user);
+                appendChatMessage('assistant', turn.assistant);
+            });
+        } catch (error) {
+            console.error('Error loading chat:', error);
+        }
+    }
+    
+    // Add a chat message and return its element, so an answer can be filled in as it streams
+    function appendChatMessage(role, text) {
+        const div = document.createElement('div');
+        div.className = `chat-message ${role}`;
+        div.textContent = text;
+        chatMessagesEl.appendChild(div);
+        return div;
+    }
+    
+    // Swap the send button for the stop button while an answer streams
+    function setChatBusy(busy) {
+        chatSendBtn.classList.toggle('hidden', busy);
+        chatStopBtn.classList.toggle('hidden', !busy);
+        chatInput.disabled = busy;
+        if (!busy) {
+            chatInput.focus();
+        }
+    }
+    
+    // Read Server-Sent Events from a /match/stream response
+    async function readMatchStream(response) {
+        await readSseStream(response, handleStreamEvent);
+    }
+    
+    // Read Server-Sent Events from a response, passing each one to onEvent
+    async function readSseStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const message = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                onEvent(parseSseMessage(message));
+            }
+        }
+    }
+    
+    // Parse one SSE message into its event name and JSON data
+    function parseSseMessage(message) {
+        let event = 'message';
+        const dataLines = [];
+        
+        message.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        
+        return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+    }
+    
+    // Render a streamed event as soon as it arrives
+    function handleStreamEvent({ event, data }) {
+        switch (event) {
+            case 'score':
+                startProgressiveResults();
+                scoreValueEl.textContent = data.score;
+                break;
+            case 'strength':
+                appendListItem(strengthsListEl, data.text);
+                break;
+            case 'gap':
+                appendListItem(gapsListEl, data.text);
+                break;
+            case 'action':
+                appendListItem(actionsListEl, data.text);
+                break;
+            case 'summary':
+                summaryTextEl.textContent = data.text;
+                break;
+            case 'complete':
+                displayResults(data);
+                break;
+            case 'error':
+                throw new Error(data.detail || 'An error occurred while processing your request.');
+        }
+    }
+    
+    // Show the results panel with empty lists while the analysis streams in
+    function startProgressiveResults() {
+        if (!resultsEl.classList.contains('hidden')) return;
+        
+        loadingEl.classList.add('hidden');
+        resultsEl.classList.remove('hidden');
+        summaryTextEl.textContent = 'Analyzing...';
+        rawOutputEl.textContent = '';
+        strengthsListEl.innerHTML = '';
+        gapsListEl.innerHTML = '';
+        actionsListEl.innerHTML = '';
+    }
+    
+    // Append one item to a results list
+    function appendListItem(listEl, text) {
+        startProgressiveResults();
+        const li = document.createElement('li');
+        li.textContent = text;
+        listEl.appendChild(li);
     }
     
     // Export match results to Markdown
@@ -345,25 +562,43 @@ document.addEventListener('DOMContentLoaded', function() {
         errorMessageEl.textContent = message;
     }
 
+    // Cursor for the next page of history, null when there are no more
+    let historyCursor = null;
+    
     // Load match history data
     async function loadHistoryData() {
         historyListEl.innerHTML = '';
+        historyCursor = null;
         historyLoadingEl.classList.remove('hidden');
         historyEmptyEl.classList.add('hidden');
         historyErrorEl.classList.add('hidden');
+        historyMoreBtn.classList.add('hidden');
+        
+        await loadHistoryPage();
+    }
+    
+    // Load one page of history; list items only carry the summary fields
+    async function loadHistoryPage() {
+        historyMoreBtn.disabled = true;
         
         try {
-            const response = await fetch('/history');
+            const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE, fields: 'id,timestamp,score,summary' });
+            if (historyCursor) {
+                params.set('cursor', historyCursor);
+            }
+            
+            const response = await fetch(`/history?${params}`);
             
             if (!response.ok) {
                 throw new Error('Failed to load history data');
             }
             
             const data = await response.json();
+            historyCursor = response.headers.get('X-Next-Cursor');
             
             historyLoadingEl.classList.add('hidden');
             
-            if (data.length === 0) {
+            if (data.length === 0 && historyListEl.children.length === 0) {
                 historyEmptyEl.classList.remove('hidden');
                 return;
             }
@@ -374,10 +609,14 @@ document.addEventListener('DOMContentLoaded', function() {
                 historyListEl.appendChild(historyItem);
             });
             
+            historyMoreBtn.classList.toggle('hidden', !historyCursor);
+            
         } catch (error) {
             historyLoadingEl.classList.add('hidden');
             historyErrorEl.classList.remove('hidden');
             console.error('Error loading history:', error);
+        } finally {
+            historyMoreBtn.disabled = false;
         }
     }
 
@@ -423,8 +662,23 @@ document.addEventListener('DOMContentLoaded', function() {
         return div;
     }
 
-    // View history item details
-    function viewHistoryDetails(item) {
+    // View history item details, fetching the full record first
+    async function viewHistoryDetails(summaryItem) {
+        let item;
+        try {
+            const response = await fetch(`/history/${summaryItem.id}`);
+            
+            if (!response.ok) {
+                throw new Error('Failed to load match details');
+            }
+            
+            item = await response.json();
+        } catch (error) {
+            console.error('Error loading match details:', error);
+            historyErrorEl.classList.remove('hidden');
+            return;
+        }
+        
         // Switch to the match tab
         tabBtns.forEach(b => {
             if (b.getAttribute('data-tab') === 'new-match') {
@@ -479,6 +733,7 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         const result = {
+            match_id: item.id,
             raw_output: item.raw_output,
             parsed_output: parsedOutput
         };
@@ -0,0 +1,200 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.database import store_match_results, reserve_match_ids
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Write-behind settings
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.2"))
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "10000"))
+# Match IDs taken from the database sequence at a time
+WRITE_ID_BLOCK = int(os.getenv("WRITE_ID_BLOCK", "100"))
+
+PendingWrite = Tuple[Dict[str, Any], "asyncio.Future[int]"]
+
+class MatchWriter:
+    """
+    Background writer that persists match records in batches.
+    
+    Records are queued in memory and written by a single task with
+    multi-row inserts, flushing when WRITE_BATCH_SIZE records are waiting
+    or WRITE_FLUSH_INTERVAL seconds after the first one arrived.
+    
+    Every record gets its ID when it is queued, from a block of
+    WRITE_ID_BLOCK IDs reserved in the database, so callers can return it
+    right away. Readers of a record that may still be queued await
+    written first.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+        max_queue: int = WRITE_QUEUE_SIZE,
+        id_block: int = WRITE_ID_BLOCK
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.id_block = id_block
+        self.queue: Optional["asyncio.Queue[Optional[PendingWrite]]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._ids: List[int] = []
+        self._ids_lock: Optional[asyncio.Lock] = None
+        # Futures of queued records by ID, until they are written
+        self._pending: Dict[int, "asyncio.Future[int]"] = {}
+        self.stats = {
+            "queued": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0
+        }
+    
+    def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        if self._task is not None and not self._task.done() and self._task.get_loop() is asyncio.get_running_loop():
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._ids_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+        self.queue = None
+    
+    async def enqueue(
+        self,
+        resume_text: str,
+        job_description: str,
+        raw_output: str,
+        parsed_output: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Queue a match result for writing.
+        
+        Waits only if the queue is full, or for the next block of IDs.
+        
+        Args:
+            resume_text: The resume text
+            job_description: The job description text
+            raw_output: The raw output from OpenAI
+            parsed_output: The parsed JSON output (optional)
+        
+        Returns:
+            The ID the record will be stored with
+        """
+        self.start()
+        match_id = await self._reserve_id()
+        
+        future = asyncio.get_running_loop().create_future()
+        # Mark failures as retrieved for fire-and-forget callers
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        
+        record = {
+            "id": match_id,
+            "resume_text": resume_text,
+            "job_description": job_description,
+            "raw_output": raw_output,
+            "parsed_output": parsed_output
+        }
+        self._pending[match_id] = future
+        await self.queue.put((record, future))
+        self.stats["queued"] += 1
+        return match_id
+    
+    async def written(self, match_id: int) -> None:
+        """
+        Wait until a record queued by this writer is stored.
+        
+        Returns immediately for IDs that are not queued here. If the write
+        fails, readers simply find no record.
+        """
+        future = self._pending.get(match_id)
+        if future is not None:
+            # Unlike awaiting the future, a cancelled reader does not cancel it
+            await asyncio.wait([future])
+    
+    async def _reserve_id(self) -> int:
+        async with self._ids_lock:
+            if not self._ids:
+                self._ids = await reserve_match_ids(self.id_block)
+            return self._ids.pop(0)
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            await self._flush(batch)
+        
+        # Drain anything queued behind the stop marker
+        remaining = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+    
+    async def _flush(self, batch: List[PendingWrite]) -> None:
+        try:
+            await store_match_results([record for record, _ in batch])
+        except Exception as e:
+            logger.exception("Failed to write %d match records", len(batch))
+            self.stats["failed"] += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+            for record, future in batch:
+                if not future.done():
+                    future.set_result(record["id"])
+        finally:
+            for record, _ in batch:
+                self._pending.pop(record["id"], None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth and write counters."""
+        return {
+            **self.stats,
+            "pending": self.queue.qsize() if self.queue is not None else 0
+        }
+
+match_writer = MatchWriter()
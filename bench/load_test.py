@@ -0,0 +1,107 @@
+"""
+Load test for analyze_resume_job_match against a local fake completions server.
+
+Starts an OpenAI-compatible /v1/chat/completions endpoint that sleeps for a
+fixed latency, points the matcher at it and reports requests/sec for a range
+of concurrency levels. With a non-blocking client throughput should grow
+roughly linearly with concurrency until MATCH_CONCURRENCY is reached.
+
+Usage:
+    python bench/load_test.py --latency 0.5 --requests 64 --concurrency 1 4 16 64
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_RESULT = {
+    "score": 80,
+    "strengths": ["Python", "AWS"],
+    "gaps": ["Kubernetes"],
+    "actions": ["Get certified in Kubernetes"],
+    "summary": "Solid match."
+}
+
+def create_fake_server(latency: float) -> FastAPI:
+    """Create an app that mimics the OpenAI chat completions endpoint."""
+    fake = FastAPI()
+    
+    @fake.post("/v1/chat/completions")
+    async def completions(body: dict):
+        await asyncio.sleep(latency)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(FAKE_RESULT)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }
+    
+    return fake
+
+def start_fake_server(latency: float) -> str:
+    """Run the fake server in a background thread and return its base URL."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    
+    config = uvicorn.Config(create_fake_server(latency), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+async def run_level(analyze, concurrency: int, total: int) -> float:
+    """Fire `total` matches with at most `concurrency` in flight; return req/s."""
+    gate = asyncio.Semaphore(concurrency)
+    
+    async def one(i: int):
+        async with gate:
+            # Distinct resumes so the cache and request coalescing do not kick in
+            await analyze(f"Python developer with AWS experience #{i}", "Senior Python engineer")
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    return total / (time.perf_counter() - start)
+
+async def main(args):
+    from app.matcher import analyze_resume_job_match, MATCH_CONCURRENCY
+    
+    print(f"fake latency={args.latency}s requests={args.requests} MATCH_CONCURRENCY={MATCH_CONCURRENCY}")
+    print(f"{'concurrency':>12} {'req/s':>10}")
+    for level in args.concurrency:
+        rps = await run_level(analyze_resume_job_match, level, args.requests)
+        print(f"{level:>12} {rps:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    
+    # The matcher reads its configuration at import time
+    os.environ["OPENAI_BASE_URL"] = start_fake_server(args.latency)
+    os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+    os.environ.setdefault("MATCH_CONCURRENCY", str(max(args.concurrency)))
+    os.environ.setdefault("MATCH_CACHE_ENABLED", "false")
+    os.environ.setdefault("DUCKDB_PATH", os.path.join(tempfile.mkdtemp(), "load_test.duckdb"))
+    
+    asyncio.run(main(args))
@@ -0,0 +1,148 @@
+"""
+End-to-end latency and throughput benchmark of POST /match.
+
+Starts the service with the fake LLM backend in a subprocess, so the
+numbers measure our own overhead (HTTP, validation, compaction, rate
+limiting, parsing and persistence) with the model's time factored out.
+For each concurrency level it sends distinct resume/job pairs and reports
+p50/p99 latency and requests/sec. With --latency, the simulated model
+time is subtracted to report the overhead on top of it.
+
+Usage:
+    python bench/match_benchmark.py --requests 200 --concurrency 1 8 32
+    python bench/match_benchmark.py --latency 0.5 --jitter 0.1 --concurrency 32 128
+    python bench/match_benchmark.py --workers 4 --concurrency 32 128
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import List
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def start_server(args, port: int) -> subprocess.Popen:
+    """Run the service with the fake backend and wait until it answers."""
+    env = {
+        **os.environ,
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "FAKE_LLM_JITTER": str(args.jitter),
+        # Every request must reach the backend
+        "MATCH_CACHE_ENABLED": "false",
+        "MATCH_CONCURRENCY": str(max(args.concurrency)),
+        "DUCKDB_PATH": os.path.join(tempfile.mkdtemp(), "benchmark.duckdb")
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "app.serve", "--workers", str(args.workers),
+            "--port", str(port), "--log-level", "warning"
+        ],
+        cwd=ROOT,
+        env=env
+    )
+    
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/info").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            if server.poll() is not None:
+                raise RuntimeError("The server exited during startup")
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("The server did not start within 30 seconds")
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    index = max(0, min(len(values) - 1, round(q / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+async def run_level(base_url: str, concurrency: int, total: int, offset: int) -> dict:
+    """Send `total` matches with at most `concurrency` in flight."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def one(i: int):
+            nonlocal errors
+            body = {
+                # Distinct inputs so no request is coalesced with another
+                "resume_text": f"Python developer with 5 years of FastAPI, SQL and AWS experience. Candidate #{offset + i}",
+                "job_description": "Senior backend engineer: Python, FastAPI, PostgreSQL, AWS, Docker"
+            }
+            async with gate:
+                start = time.perf_counter()
+                response = await client.post("/match", json=body)
+                elapsed = time.perf_counter() - start
+            if response.status_code == 200:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+        
+        start = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(total)])
+        duration = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        "throughput": total / duration,
+        "p50": percentile(latencies, 50) if latencies else float("nan"),
+        "p99": percentile(latencies, 99) if latencies else float("nan"),
+        "errors": errors
+    }
+
+async def main(args):
+    port = free_port()
+    server = start_server(args, port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        # Warm up connections, imports and the database
+        await run_level(base_url, 1, args.warmup, 0)
+        
+        print(f"workers={args.workers} fake latency={args.latency}s jitter={args.jitter}s requests={args.requests}")
+        header = f"{'concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}"
+        if args.latency:
+            header += f" {'p50 ovh ms':>11} {'p99 ovh ms':>11}"
+        print(header + f" {'errors':>7}")
+        
+        offset = args.warmup
+        for level in args.concurrency:
+            result = await run_level(base_url, level, args.requests, offset)
+            offset += args.requests
+            
+            line = f"{level:>12} {result['throughput']:>10.1f} {result['p50'] * 1000:>10.1f} {result['p99'] * 1000:>10.1f}"
+            if args.latency:
+                # Subtracting the mean model time; exact when jitter is 0
+                model_time = args.latency + args.jitter / 2
+                line += f" {(result['p50'] - model_time) * 1000:>11.1f} {(result['p99'] - model_time) * 1000:>11.1f}"
+            print(line + f" {result['errors']:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random LLM latency, up to this many seconds")
+    parser.add_argument("--warmup", type=int, default=10, help="Requests sent before measuring")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes, see app/serve.py")
+    asyncio.run(main(parser.parse_args()))
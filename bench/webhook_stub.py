@@ -0,0 +1,46 @@
+"""
+Local receiver for background job callbacks.
+
+Accepts the POSTs sent to a job's callback_url, prints each one and keeps
+them in memory so they can be listed with GET /callbacks. Useful to try
+POST /jobs without a real webhook consumer.
+
+Usage (the service must run with JOB_CALLBACK_HOSTS=127.0.0.1:9000):
+    python bench/webhook_stub.py --port 9000
+    curl -X POST localhost:8000/jobs -H 'Content-Type: application/json' \
+        -d '{"resume_text": "...", "job_description": "...", "callback_url": "http://127.0.0.1:9000/callbacks"}'
+"""
+import json
+import argparse
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI
+
+def create_stub() -> FastAPI:
+    """Create an app that records the callbacks it receives."""
+    stub = FastAPI()
+    received: List[Dict[str, Any]] = []
+    
+    @stub.post("/callbacks")
+    async def receive(body: Dict[str, Any]):
+        received.append(body)
+        print(json.dumps({"job_id": body.get("id"), "status": body.get("status"), "match_id": body.get("match_id")}))
+        return {"received": len(received)}
+    
+    @stub.get("/callbacks")
+    async def list_callbacks():
+        return received
+    
+    return stub
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    
+    uvicorn.run(create_stub(), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import tempfile
+import pytest
+
+# The OpenAI client and the DuckDB connection are created at import time,
+# so configure them before any app module is imported. Tests never reach
+# the real API or the checked-in database.
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("DUCKDB_PATH", os.path.join(tempfile.mkdtemp(), "test.duckdb"))
+
+# Caching and LLM retries are enabled per test where they are under test
+os.environ.setdefault("MATCH_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_MAX_RETRIES", "0")
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Create the schema once for the test database, as app startup does."""
+    from app.database import init_db
+    init_db()
@@ -0,0 +1,74 @@
+import pytest
+import pyarrow as pa
+from datetime import datetime
+from app.database import store_match_results
+from app.analytics import (
+    run_analytics, score_histogram_query, job_percentiles_query, top_highlights_query, volume_query
+)
+
+async def store_sample_matches():
+    """Store matches for two jobs and return the time just before them."""
+    start = datetime.now()
+    await store_match_results([
+        {
+            "resume_text": f"analytics resume {i}",
+            "job_description": "Analytics job A" if i < 4 else "Analytics job B",
+            "raw_output": "raw",
+            "parsed_output": {
+                "score": score,
+                "strengths": ["Python"],
+                "gaps": ["Kubernetes"] + (["Leadership"] if i % 2 else []),
+                "actions": [],
+                "summary": "s"
+            }
+        }
+        for i, score in enumerate([40, 60, 80, 100, 15])
+    ])
+    return start
+
+@pytest.mark.asyncio
+async def test_score_histogram_and_volume():
+    """Test that scores are bucketed, including 100 and empty buckets."""
+    start = await store_sample_matches()
+    
+    histogram = await run_analytics(score_histogram_query(25, since=start))
+    volume = await run_analytics(volume_query("day", since=start))
+    
+    assert [(row["bucket_start"], row["matches"]) for row in histogram] == [(0, 1), (25, 1), (50, 1), (75, 2)]
+    assert sum(row["matches"] for row in volume) == 5
+
+@pytest.mark.asyncio
+async def test_job_percentiles_and_top_gaps():
+    """Test per-job percentiles and gaps unnested from highlights."""
+    start = await store_sample_matches()
+    
+    jobs = await run_analytics(job_percentiles_query(limit=10, since=start))
+    gaps = await run_analytics(top_highlights_query("gaps", limit=5, since=start))
+    
+    assert jobs[0]["job_preview"] == "Analytics job A"
+    assert jobs[0]["matches"] == 4
+    assert jobs[0]["p50"] == 70
+    assert gaps == [
+        {"description": "Kubernetes", "matches": 5},
+        {"description": "Leadership", "matches": 2}
+    ]
+
+@pytest.mark.asyncio
+async def test_parquet_output():
+    """Test that Parquet output is produced without extra dependencies."""
+    content = await run_analytics(score_histogram_query(), "parquet")
+    
+    assert content[:4] == b"PAR1"
+    with pytest.raises(ValueError):
+        await run_analytics(score_histogram_query(), "xml")
+
+@pytest.mark.asyncio
+async def test_arrow_output():
+    """Test that Arrow output is a readable IPC stream with the JSON rows."""
+    start = await store_sample_matches()
+    query = score_histogram_query(25, since=start)
+    
+    rows = await run_analytics(query)
+    content = await run_analytics(query, "arrow")
+    
+    assert pa.ipc.open_stream(content).read_all().to_pylist() == rows
@@ -0,0 +1,78 @@
+import pytest
+import json
+from unittest.mock import AsyncMock, patch
+from pydantic import ValidationError
+from app.models import BatchMatchRequest
+from app.matcher import analyze_resume_job_matches
+from app.database import store_match_results, get_match_by_id
+
+SAMPLE_RESULT = {
+    "score": 64,
+    "strengths": ["Python"],
+    "gaps": ["Go"],
+    "actions": ["Learn Go"],
+    "summary": "Decent match."
+}
+
+def test_batch_request_one_resume_many_jobs():
+    """Test 1xN fan-out expansion."""
+    request = BatchMatchRequest(resume_text="resume", job_descriptions=["job a", "job b"])
+    assert request.to_pairs() == [("resume", "job a"), ("resume", "job b")]
+
+def test_batch_request_many_resumes_one_job():
+    """Test Nx1 fan-out expansion."""
+    request = BatchMatchRequest(resume_texts=["resume a", "resume b"], job_description="job")
+    assert request.to_pairs() == [("resume a", "job"), ("resume b", "job")]
+
+def test_batch_request_explicit_pairs():
+    """Test explicit pair expansion."""
+    request = BatchMatchRequest(pairs=[{"resume_text": "resume", "job_description": "job"}])
+    assert request.to_pairs() == [("resume", "job")]
+
+def test_batch_request_rejects_mixed_modes():
+    """Test that exactly one batch mode must be used."""
+    with pytest.raises(ValidationError):
+        BatchMatchRequest(resume_text="resume", job_descriptions=["job"], job_description="job")
+    with pytest.raises(ValidationError):
+        BatchMatchRequest(resume_text="resume")
+    with pytest.raises(ValidationError):
+        BatchMatchRequest()
+
+@pytest.mark.asyncio
+async def test_analyze_resume_job_matches_reports_errors_per_pair():
+    """Test that one failing pair does not fail the whole batch."""
+    mock_response = AsyncMock()
+    mock_response.choices = [AsyncMock(message=AsyncMock(content=json.dumps(SAMPLE_RESULT)))]
+    
+    async def create(**kwargs):
+        if "broken job" in kwargs["messages"][0]["content"]:
+            raise Exception("Test error")
+        return mock_response
+    
+    with patch('app.matcher.client.chat.completions.create', side_effect=create):
+        outcomes = await analyze_resume_job_matches(
+            [("resume", "good job"), ("resume", "broken job"), ("resume", "other job")],
+            concurrency=2
+        )
+    
+    assert outcomes[0][1]["score"] == 64
+    assert isinstance(outcomes[1], Exception)
+    assert outcomes[2][1]["score"] == 64
+
+@pytest.mark.asyncio
+async def test_store_match_results_returns_ids_in_order():
+    """Test that the bulk insert returns one ID per record, in order."""
+    records = [
+        {"resume_text": f"resume {i}", "job_description": "job", "raw_output": "raw", "parsed_output": SAMPLE_RESULT}
+        for i in range(3)
+    ]
+    
+    match_ids = await store_match_results(records)
+    
+    assert len(match_ids) == 3
+    for i, match_id in enumerate(match_ids):
+        match = await get_match_by_id(match_id)
+        assert match["resume_text"] == f"resume {i}"
+        assert match["score"] == 64
+    
+    assert await store_match_results([]) == []
@@ -0,0 +1,82 @@
+import io
+import os
+import json
+import zipfile
+import tempfile
+import pytest
+from fastapi import UploadFile
+from app.file_utils import DocumentLimitError
+from app.ingest import spool_bulk_uploads, close_extract_pool
+from app.writer import match_writer
+from app.main import stream_file_matches
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+@pytest.mark.asyncio
+async def test_spool_bulk_uploads_expands_archives():
+    """Test that archives are expanded, junk skipped and unsupported files reported."""
+    archive = make_zip({
+        "cvs/": "",
+        "cvs/jane.txt": "Jane Doe, Python developer",
+        "cvs/notes.odt": "notes",
+        "__MACOSX/cvs/._jane.txt": "metadata",
+        "cvs/.DS_Store": "metadata"
+    })
+    uploads = [
+        UploadFile(file=archive, filename="resumes.zip"),
+        UploadFile(file=io.BytesIO(b"John Roe, Go developer"), filename="john.txt")
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        files = await spool_bulk_uploads(uploads, directory)
+        
+        assert [file["filename"] for file in files] == ["cvs/jane.txt", "cvs/notes.odt", "john.txt"]
+        assert files[1]["error"] == "Unsupported file format" and files[1]["path"] is None
+        assert os.path.dirname(files[0]["path"]) == directory
+        with open(files[2]["path"], "rb") as file:
+            assert file.read() == b"John Roe, Go developer"
+
+@pytest.mark.asyncio
+async def test_spool_bulk_uploads_enforces_file_limit(monkeypatch):
+    """Test that uploads with too many resumes are refused."""
+    monkeypatch.setattr("app.ingest.MAX_BULK_FILES", 2)
+    archive = make_zip({f"cv{index}.txt": "resume" for index in range(3)})
+    
+    with tempfile.TemporaryDirectory() as directory:
+        with pytest.raises(DocumentLimitError):
+            await spool_bulk_uploads([UploadFile(file=archive, filename="resumes.zip")], directory)
+
+@pytest.mark.asyncio
+async def test_stream_file_matches_reports_each_file():
+    """Test that every spooled file yields one NDJSON line and the spool is removed."""
+    directory = tempfile.mkdtemp()
+    uploads = [
+        UploadFile(file=io.BytesIO(b"Python developer with FastAPI and SQL"), filename="jane.txt"),
+        UploadFile(file=io.BytesIO(b"   "), filename="blank.txt"),
+        UploadFile(file=io.BytesIO(b"data"), filename="cv.odt")
+    ]
+    files = await spool_bulk_uploads(uploads, directory)
+    
+    try:
+        lines = [
+            json.loads(line)
+            async for line in stream_file_matches(files, "Python developer, FastAPI, SQL", "fast", directory)
+        ]
+    finally:
+        close_extract_pool()
+        await match_writer.stop()
+    
+    results = {line["filename"]: line for line in lines}
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert results["jane.txt"]["error"] is None
+    assert results["jane.txt"]["engine"] == "fast"
+    assert results["jane.txt"]["match_id"] is not None
+    assert results["blank.txt"]["error"] == "No text found in blank.txt"
+    assert results["cv.odt"]["error"] == "Unsupported file format"
+    assert not os.path.exists(directory)
@@ -0,0 +1,212 @@
+import pytest
+import json
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from app import cache
+from app.cache import (
+    LRUCache, make_cache_key, get_cached_result, cache_result, get_cache_stats,
+    coalesce, get_inflight_stats
+)
+from app.matcher import analyze_resume_job_match, stream_resume_job_match
+
+SAMPLE_RESULT = {
+    "score": 72,
+    "strengths": ["Python"],
+    "gaps": ["Kubernetes"],
+    "actions": ["Learn Kubernetes"],
+    "summary": "Good match."
+}
+
+@pytest.fixture
+def enabled_cache(monkeypatch):
+    """Enable the cache with clean state for a single test."""
+    monkeypatch.setattr(cache, "CACHE_ENABLED", True)
+    cache.memory_cache.clear()
+    for key in cache.cache_stats:
+        monkeypatch.setitem(cache.cache_stats, key, 0)
+    yield cache
+    cache.memory_cache.clear()
+
+def test_make_cache_key_normalizes_whitespace():
+    """Test that formatting-only differences produce the same key."""
+    key1 = make_cache_key("Python  developer\n", "Senior engineer", "1", "gpt-3.5-turbo", 0.4)
+    key2 = make_cache_key("Python developer", "  Senior\tengineer", "1", "gpt-3.5-turbo", 0.4)
+    assert key1 == key2
+
+def test_make_cache_key_includes_model_settings():
+    """Test that prompt version, model and temperature are part of the key."""
+    base = make_cache_key("resume", "job", "1", "gpt-3.5-turbo", 0.4)
+    assert base != make_cache_key("resume", "job", "2", "gpt-3.5-turbo", 0.4)
+    assert base != make_cache_key("resume", "job", "1", "gpt-4", 0.4)
+    assert base != make_cache_key("resume", "job", "1", "gpt-3.5-turbo", 0.7)
+
+def test_lru_cache_evicts_least_recently_used():
+    """Test size-based eviction."""
+    lru = LRUCache(max_entries=2, ttl_seconds=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    
+    assert lru.get("a") == 1
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+
+def test_lru_cache_expires_entries():
+    """Test TTL-based expiry."""
+    lru = LRUCache(max_entries=2, ttl_seconds=-1)
+    lru.set("a", 1)
+    assert lru.get("a") is None
+    assert len(lru) == 0
+
+@pytest.mark.asyncio
+async def test_persistent_tier_survives_memory_eviction(enabled_cache):
+    """Test that a result evicted from memory is served from DuckDB."""
+    key = make_cache_key("persisted resume", "persisted job", "1", "gpt-3.5-turbo", 0.4)
+    await cache_result(key, "raw", SAMPLE_RESULT)
+    enabled_cache.memory_cache.clear()
+    
+    assert await get_cached_result(key) == ("raw", SAMPLE_RESULT)
+    assert await get_cached_result(key) == ("raw", SAMPLE_RESULT)
+    
+    stats = get_cache_stats()
+    assert stats["persistent_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_stores_of_one_key_and_store_failures(enabled_cache):
+    """Test that parallel upserts of a key succeed and a failed one does not raise."""
+    key = make_cache_key("contended resume", "contended job", "1", "gpt-3.5-turbo", 0.4)
+    await asyncio.gather(*[cache_result(key, f"raw {index}", SAMPLE_RESULT) for index in range(8)])
+    assert get_cache_stats()["store_failures"] == 0
+    
+    with patch("app.cache.store_cached_match", side_effect=Exception("database down")):
+        await cache_result(key, "raw", SAMPLE_RESULT)
+    assert get_cache_stats()["store_failures"] == 1
+    assert await get_cached_result(key) == ("raw", SAMPLE_RESULT)
+
+@pytest.mark.asyncio
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
+async def test_analyze_uses_cache_for_identical_inputs(mock_create, enabled_cache):
+    """Test that a repeated match does not call OpenAI again."""
+    mock_response = AsyncMock()
+    mock_response.choices = [AsyncMock(message=AsyncMock(content=json.dumps(SAMPLE_RESULT)))]
+    mock_create.return_value = mock_response
+    
+    first = await analyze_resume_job_match("cached resume", "cached job")
+    second = await analyze_resume_job_match("cached  resume", "cached job\n")
+    
+    assert first == second
+    assert mock_create.await_count == 1
+    assert get_cache_stats()["misses"] == 1
+    assert get_cache_stats()["memory_hits"] == 1
+
+@pytest.mark.asyncio
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
+async def test_analyze_does_not_cache_unparsed_output(mock_create, enabled_cache):
+    """Test that unparseable responses are not cached."""
+    mock_response = AsyncMock()
+    mock_response.choices = [AsyncMock(message=AsyncMock(content="not json"))]
+    mock_create.return_value = mock_response
+    
+    await analyze_resume_job_match("uncached resume", "uncached job")
+    await analyze_resume_job_match("uncached resume", "uncached job")
+    
+    assert mock_create.await_count == 2
+
+@pytest.mark.asyncio
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
+async def test_analyze_does_not_cache_truncated_output(mock_create, enabled_cache):
+    """Test that output cut off and closed by the repairer is returned but not cached."""
+    truncated = json.dumps(SAMPLE_RESULT)[:-6]
+    mock_response = AsyncMock()
+    mock_response.choices = [AsyncMock(message=AsyncMock(content=truncated))]
+    mock_create.return_value = mock_response
+    
+    raw_output, parsed_output = await analyze_resume_job_match("truncated resume", "truncated job")
+    await analyze_resume_job_match("truncated resume", "truncated job")
+    
+    assert raw_output == truncated and parsed_output["summary"] == "Good ma"
+    assert mock_create.await_count == 2
+
+@pytest.mark.asyncio
+async def test_streamed_truncated_output_is_not_cached(enabled_cache):
+    """Test that a match stream cut off mid-object completes but leaves the cache empty."""
+    text = json.dumps(SAMPLE_RESULT)
+    
+    def stream_of(output):
+        async def create(**kwargs):
+            async def chunks():
+                chunk = MagicMock()
+                chunk.choices = [MagicMock()]
+                chunk.choices[0].delta.content = output
+                yield chunk
+            return chunks()
+        return create
+    
+    with patch('app.matcher.cache_result', wraps=cache_result) as store:
+        with patch('app.matcher.client.chat.completions.create', side_effect=stream_of(text[:-6])):
+            events = [event async for event in stream_resume_job_match("streamed resume", "streamed job")]
+        assert events[-1][1][1]["summary"] == "Good ma"
+        assert store.call_count == 0
+        
+        with patch('app.matcher.client.chat.completions.create', side_effect=stream_of(text)):
+            events = [event async for event in stream_resume_job_match("streamed resume", "streamed job")]
+        assert events[-1][1] == (text, SAMPLE_RESULT)
+        assert store.call_count == 1
+
+@pytest.mark.asyncio
+async def test_coalesce_shares_one_call_between_concurrent_callers(monkeypatch):
+    """Test that concurrent callers with the same key share a single call."""
+    for key in cache.inflight_stats:
+        monkeypatch.setitem(cache.inflight_stats, key, 0)
+    calls = 0
+    
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "result"
+    
+    results = await asyncio.gather(*[coalesce("same-key", work) for _ in range(5)])
+    
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert cache.inflight_requests == {}
+    stats = get_inflight_stats()
+    assert stats["leader_calls"] == 1
+    assert stats["coalesced_calls"] == 4
+    assert stats["coalesce_rate"] == 0.8
+
+@pytest.mark.asyncio
+async def test_coalesce_propagates_errors_to_all_callers():
+    """Test that a failed shared call fails every waiting caller."""
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+    
+    results = await asyncio.gather(
+        *[coalesce("failing-key", work) for _ in range(3)],
+        return_exceptions=True
+    )
+    
+    assert all(isinstance(result, ValueError) for result in results)
+    assert "failing-key" not in cache.inflight_requests
+
+@pytest.mark.asyncio
+async def test_analyze_coalesces_concurrent_duplicates():
+    """Test that concurrent identical matches make one OpenAI call."""
+    mock_response = AsyncMock()
+    mock_response.choices = [AsyncMock(message=AsyncMock(content=json.dumps(SAMPLE_RESULT)))]
+    
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.05)
+        return mock_response
+    
+    with patch('app.matcher.client.chat.completions.create', side_effect=slow_create) as mock_create:
+        results = await asyncio.gather(*[
+            analyze_resume_job_match("burst resume", "burst job") for _ in range(4)
+        ])
+    
+    assert mock_create.call_count == 1
+    assert all(result == results[0] for result in results)
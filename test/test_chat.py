@@ -0,0 +1,137 @@
+import pytest
+from pydantic import ValidationError
+from unittest.mock import patch
+from app.chat import ChatSessionStore
+from app.database import store_match_result
+from app.json_stream import parse_match_output
+from app.llm import create_client, FakeCompletions
+from app.matcher import complete_chat
+from app.models import ChatRequest, MatchRequest
+from app.main import match_resume_job
+from app.metrics import LLM_STREAMS_CANCELLED
+
+RESUME = "Python developer with five years of FastAPI and SQL experience. " * 20
+JOB = "Backend engineer: Python, FastAPI, SQL, Docker. " * 10
+RAW_OUTPUT = '{"score": 72, "strengths": ["Python"], "gaps": ["Docker"], "actions": ["Learn Docker"], "summary": "Good fit"}'
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    monkeypatch.setattr("app.matcher.client", create_client("fake"))
+
+async def stored_match() -> int:
+    return await store_match_result(RESUME, JOB, RAW_OUTPUT, parse_match_output(RAW_OUTPUT))
+
+@pytest.mark.asyncio
+async def test_prompts_stay_flat_as_the_conversation_grows(fake_llm):
+    """Test that old turns are summarized and the static context is sent unchanged first."""
+    store = ChatSessionStore(history_turns=4)
+    match_id = await stored_match()
+    
+    with patch("app.chat.complete_chat", wraps=complete_chat) as complete:
+        replies = []
+        for turn in range(12):
+            replies.append(await store.reply(match_id, f"Question {turn}: how do I close the Docker gap?"))
+            await store.wait_idle()
+    
+    session = await store.get(match_id)
+    assert session.total_turns == 12
+    assert 0 < len(session.turns) <= 4
+    assert session.summary and store.stats["summaries"] > 0
+    
+    # Every turn starts with the same system prompt holding the match
+    turn_prompts = [call.args[0] for call in complete.call_args_list if call.args[0][0]["role"] == "system"]
+    assert len(turn_prompts) == 12
+    assert len({messages[0]["content"] for messages in turn_prompts}) == 1
+    assert "Learn Docker" in turn_prompts[0][0]["content"]
+    assert max(reply["prompt_tokens"] for reply in replies[4:]) <= replies[4]["prompt_tokens"] * 1.2
+
+@pytest.mark.asyncio
+async def test_sessions_are_persisted(fake_llm):
+    """Test that a conversation continues from DuckDB after the session left memory."""
+    match_id = await stored_match()
+    await ChatSessionStore().reply(match_id, "What should I learn first?")
+    
+    restarted = ChatSessionStore()
+    reply = await restarted.reply(match_id, "And after that?")
+    session = await restarted.get(match_id)
+    
+    assert reply["turns"] == 2
+    assert [turn["user"] for turn in session.turns] == ["What should I learn first?", "And after that?"]
+    
+    await restarted.delete(match_id)
+    assert (await ChatSessionStore().get(match_id)).turns == []
+
+@pytest.mark.asyncio
+async def test_failed_summary_keeps_prompts_bounded(fake_llm):
+    """Test that turns are kept when summarizing fails, but only the newest are sent."""
+    store = ChatSessionStore(history_turns=2)
+    match_id = await stored_match()
+    
+    with patch("app.chat.summarize_conversation", side_effect=Exception("LLM down")):
+        for turn in range(5):
+            await store.reply(match_id, f"Question {turn}")
+            await store.wait_idle()
+    
+    session = await store.get(match_id)
+    messages = store.messages(session, "Next question")
+    assert len(session.turns) == 5 and session.summary is None
+    assert store.stats["summary_failures"] > 0
+    assert [message["content"] for message in messages if message["role"] == "user"] == [
+        "Question 3", "Question 4", "Next question"
+    ]
+
+@pytest.mark.asyncio
+async def test_unknown_match_and_request_validation():
+    """Test that chats need a stored match or the full context."""
+    assert await ChatSessionStore().reply(10 ** 9, "Hello?") is None
+    
+    assert ChatRequest(match_id=1, message="Hi").match_id == 1
+    with pytest.raises(ValidationError):
+        ChatRequest(resume_text=RESUME, message="Hi")
+
+@pytest.mark.asyncio
+async def test_match_response_id_starts_a_chat():
+    """Test that /match returns the stored match's ID, which chat sessions take."""
+    response = await match_resume_job(MatchRequest(resume_text=RESUME, job_description=JOB, mode="fast"))
+    
+    assert response.match_id is not None
+    session = await ChatSessionStore().get(response.match_id)
+    assert session is not None and "Backend engineer" in session.system_prompt
+
+@pytest.mark.asyncio
+async def test_streamed_reply_is_added_to_the_conversation(fake_llm):
+    """Test that streamed tokens add up to the reply recorded for the turn."""
+    store = ChatSessionStore()
+    session = await store.get(await stored_match())
+    
+    events = [event async for event in store.stream_reply(session, "What should I learn first?")]
+    
+    tokens = "".join(value for event, value in events if event == "token")
+    assert len(events) > 2 and events[-1][0] == "complete"
+    assert events[-1][1]["response"] == tokens == session.turns[-1]["assistant"]
+
+@pytest.mark.asyncio
+async def test_closing_a_stream_aborts_the_llm_call(monkeypatch):
+    """Test that a client going away closes the upstream stream and drops the turn."""
+    client = create_client("fake")
+    client.chat.completions.chunk_interval = 0.05
+    streams = []
+    
+    async def create(**kwargs):
+        stream = await FakeCompletions.create(client.chat.completions, **kwargs)
+        streams.append(stream)
+        return stream
+    
+    monkeypatch.setattr(client.chat.completions, "create", create)
+    monkeypatch.setattr("app.matcher.client", client)
+    store = ChatSessionStore()
+    session = await store.get(await stored_match())
+    cancelled = LLM_STREAMS_CANCELLED._values.get((), 0)
+    
+    replies = store.stream_reply(session, "Tell me everything")
+    assert (await replies.__anext__())[0] == "token"
+    await replies.aclose()
+    
+    assert streams[0].ag_frame is None
+    assert LLM_STREAMS_CANCELLED._values[()] == cancelled + 1
+    assert session.turns == [] and not session.lock.locked()
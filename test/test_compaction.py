@@ -0,0 +1,111 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.compaction import (
+    normalize_whitespace, strip_boilerplate, dedupe_lines, compact_text, compact_match_inputs, count_tokens,
+    _load_tokenizer
+)
+from app.matcher import analyze_resume_job_match
+
+SAMPLE_JOB = """
+Data Engineer
+
+Requirements:
+- 3+ years   of Python
+- Airflow and Spark
+
+Benefits:
+- Unlimited PTO
+- Gym membership
+
+Responsibilities:
+- Build batch pipelines
+
+We are an Equal Opportunity Employer and consider applicants without regard to race or religion.
+"""
+
+SAMPLE_RESUME = """
+Jane Smith | jane@example.com
+Page 1 of 2
+Experience
+- Built Airflow pipelines in Python
+
+Jane Smith | jane@example.com
+Page 2 of 2
+Skills
+- Spark, SQL
+"""
+
+def test_normalize_whitespace():
+    """Test that spaces collapse and blank-line runs shrink to one."""
+    assert normalize_whitespace("  a  \t b \r\n\n\n\nc\u200b  \n\n") == "a b\n\nc"
+
+def test_strip_boilerplate_removes_sections_and_eeo_lines():
+    """Test that benefits sections and EEO statements are dropped."""
+    lines, removed = strip_boilerplate(normalize_whitespace(SAMPLE_JOB).split("\n"))
+    text = "\n".join(lines)
+    
+    assert "Unlimited PTO" not in text
+    assert "Equal Opportunity" not in text
+    assert "Responsibilities:" in text
+    assert "- Build batch pipelines" in text
+    assert removed == 4
+
+def test_dedupe_lines_drops_repeated_headers_and_page_numbers():
+    """Test that repeated page headers and page counters are removed."""
+    lines, removed = dedupe_lines(normalize_whitespace(SAMPLE_RESUME).split("\n"))
+    
+    assert lines.count("Jane Smith | jane@example.com") == 1
+    assert not any(line.startswith("Page") for line in lines)
+    assert removed == 3
+
+def test_compact_text_trims_to_budget():
+    """Test that long documents are cut at whole lines within the budget."""
+    text = "\n".join(f"Line {i} with some words to count" for i in range(200))
+    
+    compacted, stats = compact_text(text, 100)
+    stats = dict(stats)
+    
+    assert stats["truncated"]
+    assert stats["tokens"] <= 100
+    assert compacted.endswith("[...]")
+    assert compacted.startswith("Line 0 ")
+
+def test_compact_match_inputs_reports_stats():
+    """Test the per-request stats."""
+    resume, job, stats = compact_match_inputs(SAMPLE_RESUME, SAMPLE_JOB)
+    
+    assert stats["enabled"]
+    assert stats["job_description"]["boilerplate_lines"] == 4
+    assert stats["resume"]["duplicate_lines"] == 3
+    assert stats["job_description"]["tokens"] == count_tokens(job)
+    assert stats["saved_tokens"] > 0
+
+@pytest.mark.asyncio
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
+async def test_prompt_uses_compacted_texts(mock_create):
+    """Test that the LLM prompt no longer carries the boilerplate."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = json.dumps({
+        "score": 70, "strengths": [], "gaps": [], "actions": [], "summary": "ok"
+    })
+    mock_create.return_value = response
+    
+    await analyze_resume_job_match(SAMPLE_RESUME, SAMPLE_JOB)
+    
+    prompt = mock_create.call_args.kwargs["messages"][0]["content"]
+    assert "Gym membership" not in prompt
+    assert "Build batch pipelines" in prompt
+
+def test_tokenizer_uses_tiktoken_and_falls_back_to_estimate():
+    """Test that tiktoken counts tokens, and the estimate is only used when the encoding cannot be loaded."""
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text, disallowed_special: text.split()
+    with patch("tiktoken.get_encoding", return_value=encoding):
+        name, count = _load_tokenizer()
+    assert name == "tiktoken" and count("three short words") == 3
+    
+    with patch("tiktoken.get_encoding", side_effect=OSError("offline")):
+        name, count = _load_tokenizer()
+    assert name == "estimate" and count("abcdefgh") == 2
@@ -0,0 +1,152 @@
+import pytest
+import asyncio
+import threading
+import duckdb
+import httpx
+from datetime import datetime
+from app.main import app
+from app.database import (
+    conn, init_db, run_in_db, store_match_result, store_match_results, get_match_by_id, get_match_history,
+    encode_history_cursor, parse_history_fields, hash_document, migrate_inline_documents,
+    store_extracted_text, get_extracted_text
+)
+
+@pytest.mark.asyncio
+async def test_queries_run_off_the_event_loop_thread():
+    """Test that database work runs on the pool, not the loop thread."""
+    thread_name = await run_in_db(lambda cursor: threading.current_thread().name)
+    
+    assert thread_name != threading.current_thread().name
+    assert thread_name.startswith("duckdb")
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_and_reads():
+    """Test that concurrent inserts get distinct IDs and can be read back."""
+    match_ids = await asyncio.gather(*[
+        store_match_result(f"concurrent resume {i}", "job", "raw", {"score": i, "summary": "s"})
+        for i in range(20)
+    ])
+    
+    assert len(set(match_ids)) == 20
+    records = await asyncio.gather(*[get_match_by_id(match_id) for match_id in match_ids])
+    assert [record["score"] for record in records] == list(range(20))
+    
+    history = await get_match_history(limit=5)
+    assert len(history) == 5
+
+@pytest.mark.asyncio
+async def test_concurrent_upserts_of_one_cache_key():
+    """Test that parallel writes to one extracted text key do not conflict."""
+    await asyncio.gather(*[store_extracted_text("contended-key", f"text {i}") for i in range(8)])
+    
+    assert (await get_extracted_text("contended-key")).startswith("text ")
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_history_once():
+    """Test that following cursors visits every record once, newest first."""
+    for i in range(7):
+        await store_match_result(f"keyset resume {i}", "job", "raw", {"score": i, "summary": "s"})
+    total = await run_in_db(lambda cursor: cursor.execute("SELECT count(*) FROM match_history").fetchone()[0])
+    
+    seen = []
+    cursor = None
+    while True:
+        page = await get_match_history(limit=3, cursor=cursor)
+        seen.extend(page)
+        if len(page) < 3:
+            break
+        cursor = encode_history_cursor(page[-1]["timestamp"], page[-1]["id"])
+    
+    assert len(seen) == total
+    assert len({record["id"] for record in seen}) == total
+    keys = [(record["timestamp"], record["id"]) for record in seen]
+    assert keys == sorted(keys, reverse=True)
+
+@pytest.mark.asyncio
+async def test_cross_origin_clients_can_read_the_cursor():
+    """Test that CORS responses expose X-Next-Cursor, so browsers can page."""
+    for i in range(2):
+        await store_match_result(f"cors resume {i}", "job", "raw", {"score": i, "summary": "s"})
+    
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/history?limit=1", headers={"Origin": "http://example.com"})
+    
+    assert response.headers["X-Next-Cursor"]
+    assert "x-next-cursor" in response.headers["Access-Control-Expose-Headers"].lower()
+
+def test_init_db_drops_the_unused_timestamp_index():
+    """Test that the ART index of older versions, which range scans cannot use, is removed."""
+    conn.execute("CREATE INDEX IF NOT EXISTS match_history_timestamp_id_idx ON match_history (timestamp, id)")
+    
+    init_db()
+    
+    indexes = conn.execute("SELECT index_name FROM duckdb_indexes() WHERE table_name = 'match_history'").fetchall()
+    assert ("match_history_timestamp_id_idx",) not in indexes
+
+@pytest.mark.asyncio
+async def test_history_field_projection():
+    """Test that only the requested fields plus the key are returned."""
+    await store_match_result("projected resume", "job", "raw", {"score": 50, "summary": "short"})
+    
+    history = await get_match_history(limit=1, fields=parse_history_fields("score,summary"))
+    
+    assert set(history[0]) == {"id", "timestamp", "score", "summary"}
+
+@pytest.mark.asyncio
+async def test_history_rejects_unknown_fields_and_bad_cursors():
+    """Test that invalid fields and cursors raise ValueError."""
+    with pytest.raises(ValueError):
+        parse_history_fields("score,password")
+    with pytest.raises(ValueError):
+        await get_match_history(cursor="not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_repeated_texts_are_stored_once():
+    """Test that a job description scored many times is stored once."""
+    job = "Dedup test posting: Python developer with Django experience."
+    match_ids = await store_match_results([
+        {"resume_text": f"dedup resume {i}", "job_description": job, "raw_output": "raw"}
+        for i in range(5)
+    ])
+    await store_match_result("dedup resume 0", job, "raw")
+    
+    copies = await run_in_db(lambda cursor: cursor.execute(
+        "SELECT count(*) FROM documents WHERE content = ?", (job,)
+    ).fetchone()[0])
+    record = await get_match_by_id(match_ids[3])
+    
+    assert copies == 1
+    assert record["resume_text"] == "dedup resume 3"
+    assert record["job_description"] == job
+
+def test_migrate_inline_documents():
+    """Test that inline texts move to documents, including duplicate IDs."""
+    db = duckdb.connect()
+    db.execute("CREATE SEQUENCE match_history_id_seq START 3")
+    db.execute("CREATE TABLE documents (content_hash TEXT PRIMARY KEY, content TEXT, created_at TIMESTAMP)")
+    db.execute("""
+    CREATE TABLE match_history (
+        id INTEGER, timestamp TIMESTAMP, resume_text TEXT, job_description TEXT,
+        raw_output TEXT, score INTEGER, summary TEXT, highlights JSON
+    )
+    """)
+    db.executemany(
+        "INSERT INTO match_history VALUES (?, ?, ?, ?, 'raw', 70, 'ok', '[]')",
+        [
+            (1, datetime(2025, 1, 1), "resume a", "shared job"),
+            (2, datetime(2025, 1, 2), "resume b", "shared job"),
+            (2, datetime(2025, 1, 3), "resume a", "other job")
+        ]
+    )
+    
+    assert migrate_inline_documents(db)
+    assert not migrate_inline_documents(db)
+    
+    assert db.execute("SELECT count(*) FROM documents").fetchone()[0] == 4
+    rows = db.execute("SELECT id, resume_hash, job_hash FROM match_history ORDER BY id").fetchall()
+    assert rows == [
+        (1, hash_document("resume a"), hash_document("shared job")),
+        (2, hash_document("resume b"), hash_document("shared job")),
+        (3, hash_document("resume a"), hash_document("other job"))
+    ]
@@ -0,0 +1,95 @@
+import os
+import asyncio
+import tempfile
+import pytest
+from contextlib import asynccontextmanager
+from app import database
+from app.database import store_match_result, get_match_by_id, iter_history_batches, get_match_history, DB_OPERATIONS
+from app import db_server
+from app.db_server import DatabaseServer, DatabaseClient
+
+KEY = "test-key"
+
+@asynccontextmanager
+async def served_database(monkeypatch):
+    """Serve the database operations on a Unix socket and route calls through a client."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "db.sock")
+        server = DatabaseServer(DB_OPERATIONS, KEY)
+        connections = []
+        
+        async def handle(reader, writer):
+            connections.append(asyncio.current_task())
+            await server.handle(reader, writer)
+        
+        unix_server = await asyncio.start_unix_server(handle, path)
+        client = DatabaseClient(path, KEY)
+        # As in a worker process of the multi-worker mode
+        monkeypatch.setattr(database, "db_client", client)
+        try:
+            yield client, server
+        finally:
+            client.close()
+            await asyncio.gather(*connections)
+            unix_server.close()
+            await unix_server.wait_closed()
+
+@pytest.mark.asyncio
+async def test_calls_run_on_the_server(monkeypatch):
+    """Test that writes and reads of a worker are served by the database server."""
+    async with served_database(monkeypatch) as (client, server):
+        match_id = await store_match_result("Resume via server", "Job via server", "{}", {"score": 64})
+        match = await get_match_by_id(match_id)
+        
+        assert match["resume_text"] == "Resume via server" and match["score"] == 64
+        assert server.stats["connections"] == 1 and server.stats["requests"] >= 2
+
+@pytest.mark.asyncio
+async def test_generators_and_errors_pass_through(monkeypatch):
+    """Test that batches stream one at a time and exceptions reach the caller."""
+    async with served_database(monkeypatch) as (client, server):
+        await store_match_result("Streamed resume", "Streamed job", "{}", {"score": 50})
+        
+        batches = [batch async for batch in iter_history_batches(batch_size=1)]
+        assert len(batches) > 1 and all(len(batch) == 1 for batch in batches)
+        
+        # Stopping early closes the generator on the server
+        async for _ in iter_history_batches(batch_size=1):
+            break
+        
+        with pytest.raises(ValueError):
+            await get_match_history(cursor="not-a-cursor")
+        assert server.stats["errors"] == 1
+
+@pytest.mark.asyncio
+async def test_wrong_key_is_rejected(monkeypatch):
+    """Test that connections without the shared key are closed unanswered."""
+    async with served_database(monkeypatch) as (client, server):
+        intruder = DatabaseClient(client.path, "wrong-key")
+        
+        with pytest.raises(ConnectionError):
+            await intruder.call("get_match_by_id", (1,), {})
+        intruder.close()
+        assert server.stats["requests"] == 0
+
+@pytest.mark.asyncio
+async def test_socket_is_private_from_the_start(monkeypatch):
+    """Test that the socket is never reachable by other users, not even right after binding."""
+    start_unix_server = asyncio.start_unix_server
+    modes = []
+    
+    async def start_and_stat(handler, path):
+        server = await start_unix_server(handler, path)
+        modes.append(os.stat(path).st_mode & 0o077)
+        return server
+    
+    monkeypatch.setattr(db_server.asyncio, "start_unix_server", start_and_stat)
+    with tempfile.TemporaryDirectory() as directory:
+        serving = asyncio.create_task(db_server._serve(os.path.join(directory, "db.sock"), KEY, DB_OPERATIONS))
+        while not modes:
+            await asyncio.sleep(0.01)
+        serving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await serving
+    
+    assert modes == [0]
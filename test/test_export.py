@@ -0,0 +1,45 @@
+import json
+import pytest
+import duckdb
+from datetime import datetime
+from app.database import store_match_results, parse_history_fields
+from app.export import stream_history_ndjson, stream_history_parquet
+
+async def store_export_matches(count: int):
+    """Store matches for the export tests and return the time just before them."""
+    start = datetime.now()
+    await store_match_results([
+        {
+            "resume_text": f"export resume {i}",
+            "job_description": "Export job",
+            "raw_output": "raw",
+            "parsed_output": {"score": i, "summary": "s", "strengths": [], "gaps": [], "actions": []}
+        }
+        for i in range(count)
+    ])
+    return start
+
+@pytest.mark.asyncio
+async def test_ndjson_export_streams_every_record(monkeypatch):
+    """Test that the NDJSON export sends each record once, in several chunks."""
+    monkeypatch.setattr("app.export.EXPORT_BATCH_SIZE", 4)
+    start = await store_export_matches(10)
+    
+    chunks = [chunk async for chunk in stream_history_ndjson(since=start, fields=parse_history_fields("score,resume_text"))]
+    records = [json.loads(line) for chunk in chunks for line in chunk.decode("utf-8").splitlines()]
+    
+    assert len(chunks) == 3
+    assert sorted(record["score"] for record in records) == list(range(10))
+    assert set(records[0]) == {"id", "timestamp", "resume_text", "score"}
+
+@pytest.mark.asyncio
+async def test_parquet_export(tmp_path):
+    """Test that the Parquet export is a complete, readable file."""
+    start = await store_export_matches(5)
+    
+    content = b"".join([chunk async for chunk in stream_history_parquet(since=start)])
+    path = tmp_path / "export.parquet"
+    path.write_bytes(content)
+    
+    rows = duckdb.sql(f"SELECT job_description, score FROM read_parquet('{path}') ORDER BY score").fetchall()
+    assert rows == [("Export job", i) for i in range(5)]
@@ -0,0 +1,107 @@
+import time
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+from openai import RateLimitError
+from app.fast_scorer import score_match_offline, extract_skills, required_years, resume_years
+from app.prefilter import tokenize
+from app.matcher import analyze_resume_job_match
+
+SAMPLE_RESUME = """
+Jane Smith - Software Engineer
+
+Experience:
+- Senior Developer at Tech Co (2020-Present)
+  * Led development of cloud-based applications on AWS
+  * Implemented CI/CD pipelines
+- Developer at Startup Inc (2016-2020)
+  * Built RESTful APIs in Python
+
+Skills:
+Python, JavaScript, React, Docker, AWS, CI/CD
+"""
+
+SAMPLE_JOB = """
+Senior Software Engineer
+
+Required:
+- 5+ years of software development experience
+- Strong knowledge of Python
+- Experience with AWS services and Kubernetes
+- CI/CD pipeline implementation
+- Microservices architecture
+"""
+
+def test_extract_skills():
+    """Test skill extraction from single words and bigrams."""
+    skills = extract_skills(set(tokenize("Python, AWS, CI/CD pipelines and machine learning")))
+    assert skills == ["Python", "Machine learning", "AWS", "CI/CD"]
+
+def test_required_years():
+    """Test reading the experience requirement from a job description."""
+    assert required_years("Required: 5+ years of software development") == 5
+    assert required_years("3-5 years experience, 7 years preferred") == 3
+    assert required_years("No experience needed") is None
+
+def test_resume_years_merges_date_ranges():
+    """Test that overlapping employment ranges are not double counted."""
+    assert resume_years("Acme (2015-2018)\nInitech 2017 - 2020") == 5
+    assert resume_years("10 years of experience. Acme 2019-2020") == 10
+
+def test_score_match_offline_shape():
+    """Test that the offline result has the same structure as the LLM result."""
+    result = score_match_offline(SAMPLE_RESUME, SAMPLE_JOB)
+    
+    assert set(result) >= {"score", "strengths", "gaps", "actions", "summary"}
+    assert result["engine"] == "fast"
+    assert 0 <= result["score"] <= 100
+    assert any("Python" in strength for strength in result["strengths"])
+    assert any("Microservices" in gap for gap in result["gaps"])
+    assert result["actions"]
+
+def test_score_match_offline_ranks_related_jobs_higher():
+    """Test that an unrelated job scores lower than a related one."""
+    related = score_match_offline(SAMPLE_RESUME, SAMPLE_JOB)["score"]
+    unrelated = score_match_offline(SAMPLE_RESUME, "Registered nurse, 3+ years ICU patient care, BLS certification")["score"]
+    assert related > unrelated
+
+def test_score_match_offline_is_fast():
+    """Test that offline scoring stays within the 10 ms budget."""
+    resume = SAMPLE_RESUME * 20
+    start = time.perf_counter()
+    score_match_offline(resume, SAMPLE_JOB)
+    assert time.perf_counter() - start < 0.01
+
+@pytest.mark.asyncio
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
+async def test_fast_mode_skips_openai(mock_create):
+    """Test that mode='fast' never calls OpenAI."""
+    raw_output, parsed_output = await analyze_resume_job_match(SAMPLE_RESUME, SAMPLE_JOB, mode="fast")
+    
+    mock_create.assert_not_called()
+    assert parsed_output["engine"] == "fast"
+
+@pytest.mark.asyncio
+async def test_rate_limit_falls_back_to_offline_scorer():
+    """Test that a rate-limited LLM call returns an offline result."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    error = RateLimitError("Rate limit", response=httpx.Response(429, request=request), body=None)
+    
+    with patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock, side_effect=error):
+        raw_output, parsed_output = await analyze_resume_job_match(SAMPLE_RESUME, SAMPLE_JOB)
+    
+    assert parsed_output["engine"] == "fast"
+    assert parsed_output["fallback_reason"] == "RateLimitError"
+
+@pytest.mark.asyncio
+async def test_rate_limit_raises_without_fallback(monkeypatch):
+    """Test the original error when the fallback is disabled."""
+    monkeypatch.setattr("app.matcher.FAST_FALLBACK", False)
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    error = RateLimitError("Rate limit", response=httpx.Response(429, request=request), body=None)
+    
+    with patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock, side_effect=error):
+        with pytest.raises(Exception) as excinfo:
+            await analyze_resume_job_match(SAMPLE_RESUME, SAMPLE_JOB)
+    
+    assert "rate limit" in str(excinfo.value)
@@ -0,0 +1,160 @@
+import io
+import os
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import tempfile
+import docx
+import pytest
+from fastapi import UploadFile
+from app import ingest
+from app.file_utils import process_resume_file, DocumentError, DocumentLimitError
+from app.ingest import (
+    extract_upload_text, extract_path_text, spool_upload, extraction_stats, close_extract_pool, text_cache
+)
+
+def make_pdf(pages):
+    """Build a minimal PDF with one line of text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    content += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return content
+
+def make_docx(text):
+    document = docx.Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def test_pdf_text_and_page_limit():
+    """Test PDF extraction and that long PDFs are refused."""
+    assert process_resume_file(make_pdf(["Jane Doe", "Python developer"]), "cv.pdf") == "Jane Doe\nPython developer"
+    
+    with pytest.raises(DocumentLimitError):
+        process_resume_file(make_pdf(["page"] * 3), "cv.pdf", max_pages=2)
+
+def test_unreadable_file_raises_document_error():
+    """Test that parser failures surface as DocumentError."""
+    with pytest.raises(DocumentError):
+        process_resume_file(b"not a zip archive", "cv.docx")
+
+@pytest.mark.asyncio
+async def test_spool_upload_enforces_size_limit():
+    """Test that oversized uploads are refused while streaming."""
+    upload = UploadFile(file=io.BytesIO(b"x" * 1000), filename="cv.txt")
+    
+    with pytest.raises(DocumentLimitError):
+        async with spool_upload(upload, max_bytes=100):
+            pass
+
+@pytest.mark.asyncio
+async def test_extraction_runs_in_pool_and_is_cached():
+    """Test worker-process extraction and that a re-upload skips parsing."""
+    content = make_docx("Senior engineer with Kubernetes experience")
+    extracted = extraction_stats["extracted"]
+    hits = extraction_stats["cache_hits"]
+    
+    try:
+        first = await extract_upload_text(UploadFile(file=io.BytesIO(content), filename="cv.docx"))
+        second = await extract_upload_text(UploadFile(file=io.BytesIO(content), filename="again.docx"))
+    finally:
+        close_extract_pool()
+    
+    assert first == second == "Senior engineer with Kubernetes experience"
+    assert extraction_stats["extracted"] == extracted + 1
+    assert extraction_stats["cache_hits"] == hits + 1
+
+@pytest.mark.asyncio
+async def test_extracted_text_is_shared_through_the_database():
+    """Test that a process with an empty memory cache finds the text in DuckDB."""
+    content = make_docx("Data engineer with Spark and Airflow experience")
+    first = await extract_upload_text(UploadFile(file=io.BytesIO(content), filename="cv.docx"))
+    extracted = extraction_stats["extracted"]
+    hits = extraction_stats["persistent_hits"]
+    
+    # As if another worker process handled the re-upload
+    text_cache.clear()
+    try:
+        second = await extract_upload_text(UploadFile(file=io.BytesIO(content), filename="cv.docx"))
+    finally:
+        close_extract_pool()
+    
+    assert first == second == "Data engineer with Spark and Airflow experience"
+    assert extraction_stats["extracted"] == extracted
+    assert extraction_stats["persistent_hits"] == hits + 1
+
+@pytest.mark.asyncio
+async def test_identical_files_are_extracted_once():
+    """Test that duplicates extracted concurrently share one parse and one cache write."""
+    content = make_docx("Site reliability engineer with Terraform and Go experience")
+    digest = hashlib.sha256(content).hexdigest()
+    extracted = extraction_stats["extracted"]
+    coalesced = extraction_stats["coalesced"]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"cv{index}.docx") for index in range(8)]
+        for path in paths:
+            with open(path, "wb") as file:
+                file.write(content)
+        try:
+            texts = await asyncio.gather(*[
+                extract_path_text(path, os.path.basename(path), digest) for path in paths
+            ])
+        finally:
+            close_extract_pool()
+    
+    assert set(texts) == {"Site reliability engineer with Terraform and Go experience"}
+    assert extraction_stats["extracted"] == extracted + 1
+    assert extraction_stats["coalesced"] == coalesced + 7
+    assert extraction_stats["store_failures"] == 0
+
+@pytest.mark.asyncio
+async def test_unsupported_upload_is_not_read():
+    """Test that unsupported formats return None without spooling."""
+    assert await extract_upload_text(UploadFile(file=io.BytesIO(b"data"), filename="cv.odt")) is None
+
+class BrokenPool(Executor):
+    """A worker pool whose worker processes have died."""
+    
+    def __init__(self):
+        self.shutdowns = []
+    
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        return future
+    
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdowns.append({"wait": wait, "cancel_futures": cancel_futures})
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_shut_down(monkeypatch):
+    """Test that a pool whose worker died is released before a fresh one is started."""
+    pool = BrokenPool()
+    monkeypatch.setattr(ingest, "_pool", pool)
+    
+    with pytest.raises(DocumentError):
+        await extract_upload_text(UploadFile(file=io.BytesIO(make_docx("Broken worker")), filename="cv.docx"))
+    
+    assert pool.shutdowns == [{"wait": False, "cancel_futures": True}]
+    assert ingest._pool is None
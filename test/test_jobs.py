@@ -0,0 +1,196 @@
+import json
+import httpx
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from openai import RateLimitError
+from app.database import init_db, claim_match_jobs, get_match_job
+from app.jobs import JobQueue, get_job_status, retry_delay, callback_allowed
+from app.fast_scorer import analyze_offline
+
+RESUME = "Python developer with FastAPI and SQL experience"
+JOB = "Backend engineer: Python, FastAPI, SQL"
+
+async def claim(job_id):
+    """Claim every due job and return the one with job_id."""
+    jobs = await claim_match_jobs(10)
+    assert [job["id"] for job in jobs] == [job_id]
+    return jobs[0]
+
+@pytest.mark.asyncio
+async def test_job_runs_and_stores_match():
+    """Test that a submitted job is persisted, claimed and completed with a match record."""
+    queue = JobQueue()
+    job_id = await queue.submit(RESUME, JOB, "fast")
+    assert (await get_match_job(job_id))["status"] == "queued"
+    
+    job = await claim(job_id)
+    assert job["resume_text"] == RESUME and job["attempts"] == 1
+    assert (await get_match_job(job_id))["status"] == "running"
+    
+    await queue.run_job(job)
+    
+    status = await get_job_status(job_id)
+    assert status["status"] == "succeeded"
+    assert status["match"]["id"] == status["match_id"]
+    assert status["match"]["resume_text"] == RESUME
+
+def test_retry_delay_backs_off_with_jitter():
+    """Test that retry delays double per attempt, with jitter, up to the maximum."""
+    assert 1 <= retry_delay(1) <= 2
+    assert 4 <= retry_delay(3) <= 8
+    assert retry_delay(20) <= 60
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_then_fails(monkeypatch):
+    """Test that a failed attempt is queued again and the last one fails the job."""
+    monkeypatch.setattr("app.jobs.retry_delay", lambda attempts: 0)
+    queue = JobQueue(max_attempts=2)
+    job_id = await queue.submit(RESUME, JOB)
+    
+    with patch("app.pipeline.analyze_resume_job_match", AsyncMock(side_effect=RuntimeError("rate limited"))):
+        await queue.run_job(await claim(job_id))
+        job = await get_match_job(job_id)
+        assert job["status"] == "queued" and job["error"] == "rate limited"
+        
+        job = await claim(job_id)
+        assert job["attempts"] == 2
+        await queue.run_job(job)
+    
+    job = await get_match_job(job_id)
+    assert job["status"] == "failed" and job["match_id"] is None
+    assert queue.stats["retried"] == 1 and queue.stats["failed"] == 1
+
+@pytest.mark.asyncio
+async def test_rate_limited_job_is_retried_not_scored_offline(monkeypatch):
+    """Test that a 429 reschedules the job instead of completing it with the fallback scorer."""
+    monkeypatch.setattr("app.jobs.retry_delay", lambda attempts: 0)
+    monkeypatch.setattr("app.matcher.FAST_FALLBACK", True)
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    error = RateLimitError("Rate limit", response=httpx.Response(429, request=request), body=None)
+    queue = JobQueue()
+    job_id = await queue.submit(f"{RESUME} (rate limited)", JOB)
+    
+    with patch("app.matcher.client.chat.completions.create", new_callable=AsyncMock, side_effect=error):
+        await queue.run_job(await claim(job_id))
+    
+    job = await get_match_job(job_id)
+    assert job["status"] == "queued" and job["match_id"] is None
+    assert "rate limit" in job["error"]
+    assert queue.stats["retried"] == 1 and queue.stats["succeeded"] == 0
+    
+    # The retry succeeds once the LLM answers again
+    with patch("app.pipeline.analyze_resume_job_match", AsyncMock(return_value=analyze_offline(RESUME, JOB))):
+        await queue.run_job(await claim(job_id))
+    assert (await get_match_job(job_id))["status"] == "succeeded"
+
+@pytest.mark.asyncio
+async def test_running_jobs_are_requeued_on_startup():
+    """Test that jobs interrupted by a restart are queued again."""
+    queue = JobQueue()
+    job_id = await queue.submit(RESUME, JOB, "fast")
+    await claim(job_id)
+    
+    init_db()
+    
+    assert (await get_match_job(job_id))["status"] == "queued"
+    await queue.run_job(await claim(job_id))
+    assert (await get_match_job(job_id))["status"] == "succeeded"
+
+@pytest.mark.asyncio
+async def test_jobs_of_a_stopped_worker_are_claimed_again():
+    """Test that expired leases are reclaimed and the old claim can no longer record an outcome."""
+    queue = JobQueue(max_attempts=2)
+    job_id = await queue.submit(RESUME, JOB, "fast")
+    # A worker that stops renewing: the lease has expired by the next claim
+    stopped = (await claim_match_jobs(10, lease_seconds=0))[0]
+    
+    job = await claim(job_id)
+    assert job["attempts"] == 2
+    await queue.run_job(stopped)
+    assert (await get_match_job(job_id))["status"] == "running"
+    assert queue.stats["lost"] == 1
+    
+    await queue.run_job(job)
+    assert (await get_match_job(job_id))["status"] == "succeeded"
+    
+    # Without attempts left, a reclaimed job fails
+    job_id = await queue.submit(f"{RESUME} (stopped twice)", JOB, "fast")
+    for _ in range(2):
+        await claim_match_jobs(10, lease_seconds=0)
+    await queue.run_job(await claim(job_id))
+    job = await get_match_job(job_id)
+    assert job["status"] == "failed" and job["error"] == "The worker running the job stopped"
+
+@pytest.mark.asyncio
+async def test_running_jobs_renew_their_lease():
+    """Test that a job running longer than its lease is not claimed by another worker."""
+    queue = JobQueue(lease_seconds=0.3)
+    job_id = await queue.submit(f"{RESUME} (slow)", JOB, "fast")
+    job = (await claim_match_jobs(10, lease_seconds=0.3))[0]
+    
+    async def slow_analysis(*args):
+        await asyncio.sleep(0.6)
+        return analyze_offline(RESUME, JOB)
+    
+    with patch("app.pipeline.analyze_resume_job_match", slow_analysis):
+        running = asyncio.create_task(queue.run_job(job))
+        await asyncio.sleep(0.45)
+        assert await claim_match_jobs(10) == []
+        await running
+    
+    assert (await get_match_job(job_id))["status"] == "succeeded"
+    assert queue.stats["lost"] == 0
+
+def test_callback_hosts_are_allowlisted(monkeypatch):
+    """Test that callbacks only go to http(s) URLs on configured hosts."""
+    monkeypatch.setattr("app.jobs.JOB_CALLBACK_HOSTS", {"hooks.example.com", "10.0.0.5:9000"})
+    
+    assert callback_allowed("https://hooks.example.com/jobs")
+    assert callback_allowed("http://HOOKS.example.com:8080/jobs")
+    assert callback_allowed("http://10.0.0.5:9000/jobs")
+    assert not callback_allowed("http://10.0.0.5:22/")
+    assert not callback_allowed("http://169.254.169.254/latest/meta-data")
+    assert not callback_allowed("ftp://hooks.example.com/jobs")
+    assert not callback_allowed("http://hooks.example.com.evil.test/")
+
+@pytest.mark.asyncio
+async def test_callback_receives_final_status(monkeypatch):
+    """Test that the final job status is POSTed to the callback URL."""
+    monkeypatch.setattr("app.jobs.JOB_CALLBACK_HOSTS", {"stub.local"})
+    received = []
+    
+    def receive(request):
+        received.append((str(request.url), json.loads(request.content)))
+        return httpx.Response(200)
+    
+    queue = JobQueue()
+    queue._client = httpx.AsyncClient(transport=httpx.MockTransport(receive))
+    job_id = await queue.submit(RESUME, JOB, "fast", "http://stub.local/callbacks")
+    
+    try:
+        await queue.run_job(await claim(job_id))
+    finally:
+        await queue._client.aclose()
+    
+    assert len(received) == 1
+    url, payload = received[0]
+    assert url == "http://stub.local/callbacks"
+    assert payload["id"] == job_id and payload["status"] == "succeeded"
+    assert payload["match"]["score"] is not None
+
+@pytest.mark.asyncio
+async def test_disallowed_callback_is_not_sent(monkeypatch):
+    """Test that a callback to a host outside the allowlist is never requested."""
+    monkeypatch.setattr("app.jobs.JOB_CALLBACK_HOSTS", set())
+    received = []
+    queue = JobQueue()
+    queue._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: received.append(request)))
+    job_id = await queue.submit(RESUME, JOB, "fast", "http://127.0.0.1:6379/")
+    
+    try:
+        await queue.run_job(await claim(job_id))
+    finally:
+        await queue._client.aclose()
+    
+    assert received == [] and queue.stats["callbacks_failed"] == 1
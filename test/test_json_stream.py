@@ -0,0 +1,196 @@
+import pytest
+import json
+from unittest.mock import MagicMock, patch
+from starlette.requests import ClientDisconnect
+from app.json_stream import MatchStreamParser, JSONRepairer, parse_match_output, match_details
+from app.llm import create_client, FakeCompletions
+from app.matcher import stream_resume_job_match
+from app.metrics import LLM_STREAMS_CANCELLED
+from app.main import app
+
+SAMPLE_RESULT = {
+    "score": 85,
+    "strengths": ["Strong \"Python\" experience", "AWS"],
+    "gaps": ["Leadership"],
+    "actions": ["Lead a project"],
+    "summary": "Good overall match."
+}
+
+EXPECTED_EVENTS = [
+    ("score", 85),
+    ("strength", "Strong \"Python\" experience"),
+    ("strength", "AWS"),
+    ("gap", "Leadership"),
+    ("action", "Lead a project"),
+    ("summary", "Good overall match.")
+]
+
+def feed_in_chunks(text, size):
+    parser = MatchStreamParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+@pytest.mark.parametrize("size", [1, 3, 16, 10000])
+def test_parser_emits_events_regardless_of_chunking(size):
+    """Test that events are the same however the text is split."""
+    text = json.dumps(SAMPLE_RESULT, indent=2)
+    assert feed_in_chunks(text, size) == EXPECTED_EVENTS
+
+def test_parser_skips_markdown_fence():
+    """Test that text around the JSON object is ignored."""
+    text = f"Here you go:\n```json\n{json.dumps(SAMPLE_RESULT)}\n```\nGood luck!"
+    assert feed_in_chunks(text, 5) == EXPECTED_EVENTS
+
+def test_parser_emits_score_before_object_completes():
+    """Test that the score is available as soon as its value ends."""
+    parser = MatchStreamParser()
+    assert parser.feed('{"score": 7') == []
+    assert parser.feed('2, "strengths": [') == [("score", 72)]
+
+def test_parse_repairs_common_defects():
+    """Test that trailing commas, missing commas, single quotes and unquoted keys are repaired."""
+    text = """```json
+{'score': 85, strengths: ["Strong \\"Python\\" experience" "AWS",], "gaps": ["Leadership"],
+ "actions": ["Lead a project"], "summary": 'Good overall match.',}
+```"""
+    assert parse_match_output(text) == SAMPLE_RESULT
+
+def test_parse_recovers_truncated_output():
+    """Test that output cut off in the summary keeps every field read so far."""
+    text = json.dumps(SAMPLE_RESULT)
+    parsed_output = parse_match_output(text[:-10])
+    
+    assert parsed_output["strengths"] == SAMPLE_RESULT["strengths"]
+    assert parsed_output["summary"] == "Good overal"
+    # Cut off before the summary, required fields are missing
+    assert parse_match_output(text[:text.index('"summary"') + 4]) is None
+
+def test_repairer_value_while_feeding():
+    """Test that the partial object can be read at any point without stopping the parse."""
+    repairer = JSONRepairer()
+    repairer.feed('{"score": 85, "gaps": ["Lead')
+    assert repairer.value() == {"score": 85, "gaps": ["Lead"]}
+    
+    repairer.feed('ership"]}')
+    assert repairer.value() == {"score": 85, "gaps": ["Leadership"]}
+    assert repairer.repairs == 0
+
+def test_match_details_validates_and_converts_legacy_highlights():
+    """Test schema validation, score coercion and the old highlights format."""
+    legacy = {
+        "score": "85%",
+        "highlights": [
+            {"type": "match", "description": "Python"},
+            {"type": "gap", "description": "Leadership"}
+        ],
+        "summary": "Good match."
+    }
+    details = match_details(legacy)
+    
+    assert details.score == 85
+    assert details.strengths == ["Python"] and details.gaps == ["Leadership"]
+    assert len(details.actions) == 1
+    assert match_details({**SAMPLE_RESULT, "score": "high"}) is None
+    assert match_details({**SAMPLE_RESULT, "score": 120}).score == 100
+
+def test_stream_parser_result_uses_the_same_pass():
+    """Test that the streaming parser repairs output and returns the validated result."""
+    parser = MatchStreamParser()
+    events = parser.feed("{'score': 85, 'strengths': ['AWS',], 'gaps': [], 'actions': [], 'summary': 'Fine'}")
+    
+    assert events == [("score", 85), ("strength", "AWS"), ("summary", "Fine")]
+    assert parser.result() == {"score": 85, "strengths": ["AWS"], "gaps": [], "actions": [], "summary": "Fine"}
+
+@pytest.mark.asyncio
+async def test_stream_resume_job_match_yields_incremental_events():
+    """Test streaming analysis with a mocked streaming completion."""
+    text = json.dumps(SAMPLE_RESULT)
+    
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        
+        async def chunks():
+            for i in range(0, len(text), 8):
+                chunk = MagicMock()
+                chunk.choices = [MagicMock()]
+                chunk.choices[0].delta.content = text[i:i + 8]
+                yield chunk
+        
+        return chunks()
+    
+    with patch('app.matcher.client.chat.completions.create', side_effect=create):
+        events = [event async for event in stream_resume_job_match("resume", "job")]
+    
+    assert events[:-1] == EXPECTED_EVENTS
+    assert events[-1] == ("complete", (text, SAMPLE_RESULT))
+
+def slow_fake_client(monkeypatch):
+    """Install a streaming fake LLM client and return the list of streams it opens."""
+    client = create_client("fake")
+    client.chat.completions.chunk_interval = 0.05
+    streams = []
+    
+    async def create(**kwargs):
+        stream = await FakeCompletions.create(client.chat.completions, **kwargs)
+        streams.append(stream)
+        return stream
+    
+    monkeypatch.setattr(client.chat.completions, "create", create)
+    monkeypatch.setattr("app.matcher.client", client)
+    return streams
+
+@pytest.mark.asyncio
+async def test_closing_a_match_stream_aborts_the_llm_call(monkeypatch):
+    """Test that a client going away closes the upstream match stream."""
+    streams = slow_fake_client(monkeypatch)
+    cancelled = LLM_STREAMS_CANCELLED._values.get((), 0)
+    
+    events = stream_resume_job_match("Resume of a client that goes away", "Job streamed until disconnect")
+    assert (await events.__anext__())[0] == "score"
+    await events.aclose()
+    
+    assert streams[0].ag_frame is None
+    assert LLM_STREAMS_CANCELLED._values[()] == cancelled + 1
+
+@pytest.mark.asyncio
+async def test_leaving_the_match_stream_endpoint_aborts_the_llm_call(monkeypatch):
+    """Test that the LLM stream is closed as soon as an SSE client disconnects."""
+    streams = slow_fake_client(monkeypatch)
+    cancelled = LLM_STREAMS_CANCELLED._values.get((), 0)
+    body = json.dumps({
+        "resume_text": "Resume of an SSE client that goes away",
+        "job_description": "Job streamed to an SSE client"
+    }).encode("utf-8")
+    scope = {
+        "type": "http",
+        # Servers on ASGI 2.4 report disconnects only by failing send
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/match/stream",
+        "raw_path": b"/match/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1),
+        "server": ("test", 80)
+    }
+    sent = []
+    
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            sent.append(message["body"])
+            raise OSError("Client went away")
+    
+    with pytest.raises(ClientDisconnect):
+        await app(scope, receive, send)
+    
+    assert sent[0].startswith(b"event: score")
+    assert streams[0].ag_frame is None
+    assert LLM_STREAMS_CANCELLED._values[()] == cancelled + 1
@@ -0,0 +1,57 @@
+import time
+import pytest
+from app.llm import FakeLLMClient, create_client
+from app.matcher import analyze_resume_job_match, generate_match_prompt, parse_match_output
+
+def match_messages(resume="Python developer", job="Python role"):
+    return [{"role": "user", "content": generate_match_prompt(resume, job)}]
+
+@pytest.mark.asyncio
+async def test_fake_backend_is_deterministic():
+    """Test that the fake backend answers a match prompt with the same valid analysis every time."""
+    client = FakeLLMClient()
+    
+    first = await client.chat.completions.create(messages=match_messages(), model="fake")
+    second = await client.chat.completions.create(messages=match_messages(), model="fake")
+    
+    text = first.choices[0].message.content
+    assert text == second.choices[0].message.content
+    assert 0 <= parse_match_output(text)["score"] <= 100
+    assert first.usage.total_tokens > 0
+
+@pytest.mark.asyncio
+async def test_fake_backend_streams_the_same_text():
+    """Test that streamed chunks join to the non-streamed answer."""
+    client = FakeLLMClient()
+    
+    response = await client.chat.completions.create(messages=match_messages(), model="fake")
+    stream = await client.chat.completions.create(messages=match_messages(), model="fake", stream=True)
+    pieces = [chunk.choices[0].delta.content async for chunk in stream if chunk.choices[0].delta.content]
+    
+    assert len(pieces) > 1
+    assert "".join(pieces) == response.choices[0].message.content
+
+@pytest.mark.asyncio
+async def test_fake_backend_latency():
+    """Test that the fake backend takes the configured latency."""
+    client = FakeLLMClient(latency=0.1, jitter=0.05)
+    
+    start = time.monotonic()
+    await client.chat.completions.create(messages=match_messages(), model="fake")
+    
+    assert 0.1 <= time.monotonic() - start < 0.5
+
+def test_unknown_backend():
+    """Test that an unknown backend is rejected."""
+    with pytest.raises(ValueError):
+        create_client("nope")
+
+@pytest.mark.asyncio
+async def test_analyze_with_fake_backend(monkeypatch):
+    """Test the whole match path with the fake backend."""
+    monkeypatch.setattr("app.matcher.client", create_client("fake"))
+    
+    raw_output, parsed_output = await analyze_resume_job_match("Python developer with SQL", "Python and SQL role")
+    
+    assert "engine" not in parsed_output  # only the offline scorer sets it
+    assert parsed_output["summary"].startswith("A deterministic analysis")
@@ -1,5 +1,6 @@
 import pytest
 import json
+import asyncio
 from unittest.mock import AsyncMock, patch
 from app.matcher import generate_match_prompt, analyze_resume_job_match
 
@@ -71,7 +72,7 @@ def test_generate_match_prompt():
     assert "summary" in prompt
 
 @pytest.mark.asyncio
-@patch('app.matcher.client.chat.completions.create')
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
 async def test_analyze_resume_job_match_success(mock_create):
     """Test successful analysis with proper JSON response."""
     # Mock the OpenAI response
@@ -96,7 +97,7 @@ async def test_analyze_resume_job_match_success(mock_create):
     assert parsed_output["summary"] == "Good overall match with strong technical alignment but some gaps in leadership experience."
 
 @pytest.mark.asyncio
-@patch('app.matcher.client.chat.completions.create')
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
 async def test_analyze_resume_job_match_markdown_json(mock_create):
     """Test analysis with JSON wrapped in markdown code blocks."""
     # Mock the OpenAI response with markdown-wrapped JSON
@@ -121,7 +122,7 @@ async def test_analyze_resume_job_match_markdown_json(mock_create):
     assert len(parsed_output["highlights"]) == 3
 
 @pytest.mark.asyncio
-@patch('app.matcher.client.chat.completions.create')
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
 async def test_analyze_resume_job_match_invalid_json(mock_create):
     """Test handling of invalid JSON response."""
     # Mock the OpenAI response with invalid JSON
@@ -143,7 +144,7 @@ async def test_analyze_resume_job_match_invalid_json(mock_create):
     assert parsed_output is None
 
 @pytest.mark.asyncio
-@patch('app.matcher.client.chat.completions.create')
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
 async def test_analyze_resume_job_match_missing_fields(mock_create):
     """Test handling of JSON response with missing required fields."""
     # Create a response with missing fields
@@ -171,7 +172,7 @@ async def test_analyze_resume_job_match_missing_fields(mock_create):
     assert parsed_output is None  # Should be None because of missing fields
 
 @pytest.mark.asyncio
-@patch('app.matcher.client.chat.completions.create', side_effect=Exception("Test error"))
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock, side_effect=Exception("Test error"))
 async def test_analyze_resume_job_match_error(mock_create):
     """Test error handling in the analyze function."""
     # Call the function and expect an exception
@@ -180,3 +181,31 @@ async def test_analyze_resume_job_match_error(mock_create):
     
     # Verify the error message
     assert "Error processing request" in str(excinfo.value)
+
+@pytest.mark.asyncio
+async def test_analyze_resume_job_match_runs_concurrently():
+    """Test that concurrent analyses do not block each other."""
+    mock_response = AsyncMock()
+    mock_response.choices = [
+        AsyncMock(
+            message=AsyncMock(
+                content=json.dumps(SAMPLE_RESPONSE)
+            )
+        )
+    ]
+    
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.2)
+        return mock_response
+    
+    with patch('app.matcher.client.chat.completions.create', side_effect=slow_create):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await asyncio.gather(*[
+            analyze_resume_job_match(SAMPLE_RESUME, SAMPLE_JOB) for _ in range(5)
+        ])
+        elapsed = loop.time() - start
+    
+    # Five 0.2s calls should overlap rather than take a full second
+    assert len(results) == 5
+    assert elapsed < 0.6
@@ -0,0 +1,66 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.metrics import (
+    Histogram, MetricsMiddleware, HTTP_REQUESTS, DB_DURATION, STAGE_DURATION, stage, render_metrics
+)
+from app.database import get_match_by_id
+
+def make_app(server_timing):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, server_timing=server_timing)
+    
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        with stage("lookup"):
+            return {"id": item_id}
+    
+    return app
+
+async def get(app, path):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path)
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that bucket counts are cumulative and end with +Inf, sum and count."""
+    histogram = Histogram("test_seconds", "Test histogram", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5):
+        histogram.observe(value, "a")
+    
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{stage="a",le="0.1"} 1',
+        'test_seconds_bucket{stage="a",le="1.0"} 3',
+        'test_seconds_bucket{stage="a",le="+Inf"} 4',
+        'test_seconds_sum{stage="a"} 6.25',
+        'test_seconds_count{stage="a"} 4'
+    ]
+
+@pytest.mark.asyncio
+async def test_requests_are_counted_by_route_template():
+    """Test that requests are labelled with the route template, not the raw path."""
+    app = make_app(server_timing=False)
+    before = HTTP_REQUESTS._values.get(("GET", "/items/{item_id}", "200"), 0)
+    
+    response = await get(app, "/items/1")
+    await get(app, "/items/2")
+    
+    assert "server-timing" not in response.headers
+    assert HTTP_REQUESTS._values[("GET", "/items/{item_id}", "200")] == before + 2
+    assert 'match_stage_duration_seconds_count{stage="lookup"}' in render_metrics()
+
+@pytest.mark.asyncio
+async def test_server_timing_header():
+    """Test that stage timings are reported in Server-Timing when enabled."""
+    response = await get(make_app(server_timing=True), "/items/3")
+    
+    names = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert names == ["lookup", "total"]
+
+@pytest.mark.asyncio
+async def test_database_functions_are_timed():
+    """Test that run_in_db records durations under the calling function's name."""
+    await get_match_by_id(-1)
+    
+    assert DB_DURATION._values[("get_match_by_id",)][1] > 0
+    assert STAGE_DURATION.name in render_metrics()
@@ -0,0 +1,84 @@
+import os
+import asyncio
+import tempfile
+import pytest
+from unittest.mock import patch
+from app.file_utils import DocumentError
+from app.database import get_match_by_id, store_match_results
+from app.writer import match_writer
+from app.pipeline import MatchContext, match_pipeline, file_match_pipeline, scoring_pipeline, persist_many
+
+RESUME = "Python developer with FastAPI and SQL experience"
+JOB = "Backend engineer: Python, FastAPI, SQL"
+
+@pytest.mark.asyncio
+async def test_pipeline_scores_validates_and_stores_once():
+    """Test that a match runs every stage and is written exactly once."""
+    context = MatchContext(JOB, RESUME, "fast")
+    
+    with patch.object(match_writer, "enqueue", wraps=match_writer.enqueue) as enqueue:
+        await match_pipeline.run(context)
+    
+    assert enqueue.call_count == 1
+    assert list(context.timings) == ["compact", "score", "parse", "persist"]
+    assert context.engine == "fast" and context.prompt_stats is None
+    assert context.details.score == context.parsed_output["score"]
+    await match_writer.written(context.match_id)
+    assert (await get_match_by_id(context.match_id))["resume_text"] == RESUME
+
+@pytest.mark.asyncio
+async def test_scoring_pipeline_and_persist_many():
+    """Test that batches skip the persist stage and store all results in one insert."""
+    contexts = [MatchContext(JOB, f"{RESUME} #{index}", "fast") for index in range(3)]
+    for context in contexts:
+        await scoring_pipeline.run(context)
+    assert all(context.match_id is None for context in contexts)
+    
+    with patch("app.pipeline.store_match_results", wraps=store_match_results) as store:
+        await persist_many(contexts)
+    
+    assert store.call_count == 1
+    assert len({context.match_id for context in contexts}) == 3
+
+@pytest.mark.asyncio
+async def test_extract_stage_reads_spooled_files():
+    """Test that the file pipeline extracts text and rejects files without any."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "resume")
+        with open(path, "w") as file:
+            file.write(RESUME)
+        context = MatchContext(JOB, mode="fast", path=path, filename="resume.txt", digest="pipeline-test")
+        await file_match_pipeline.skip("persist").run(context)
+        assert context.resume_text == RESUME
+        
+        with open(path, "w") as file:
+            file.write("   ")
+        empty = MatchContext(JOB, mode="fast", path=path, filename="empty.txt", digest="pipeline-test-empty")
+        with pytest.raises(DocumentError):
+            await file_match_pipeline.run(empty)
+
+@pytest.mark.asyncio
+async def test_stages_can_be_replaced_and_limited():
+    """Test replacing a stage and bounding its concurrency across runs."""
+    running = 0
+    peak = 0
+    
+    async def score(context):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        context.raw_output = "{}"
+        context.parsed_output = {"score": 50, "strengths": [], "gaps": [], "actions": [], "summary": "ok"}
+    
+    pipeline = scoring_pipeline.replace("score", score)
+    semaphore = asyncio.Semaphore(2)
+    contexts = [MatchContext(JOB, RESUME) for _ in range(6)]
+    await asyncio.gather(*[pipeline.run(context, {"score": semaphore}) for context in contexts])
+    
+    assert peak == 2
+    assert all(context.details.score == 50 for context in contexts)
+    assert pipeline.select("parse").names == ["parse"]
+    with pytest.raises(ValueError):
+        pipeline.replace("missing", score)
@@ -0,0 +1,122 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+from app import prefilter
+from app.prefilter import JobIndex, tokenize, term_counts, refresh_job_index, shortlist_jobs, job_index
+from app.database import store_match_result, store_match_results, reserve_match_ids, get_job_descriptions_since
+
+JOBS = [
+    "Senior Python engineer. Django, PostgreSQL, AWS and CI/CD pipelines.",
+    "Frontend developer with React, TypeScript and CSS experience.",
+    "Registered nurse for the intensive care unit. Patient care and BLS certification.",
+    "Data engineer: Python, Spark, Airflow and AWS data pipelines."
+]
+
+def test_tokenize_keeps_tech_names():
+    """Test that names like c++, c# and node.js survive tokenization."""
+    terms = tokenize("Experience with C++, C# and Node.js.")
+    assert "c++" in terms
+    assert "c#" in terms
+    assert "node.js" in terms
+    assert "c++ c#" in terms
+
+def test_term_counts_are_stable():
+    """Test that hashing does not depend on the process hash seed."""
+    assert np.array_equal(term_counts("python aws"), term_counts("python aws"))
+    assert term_counts("python aws").sum() == 3
+
+def test_search_ranks_similar_jobs_first():
+    """Test that the most related jobs are ranked first."""
+    index = JobIndex(dimensions=1024)
+    for i, job in enumerate(JOBS):
+        index.add(job, i)
+    
+    results = index.search("Python engineer building AWS data pipelines with Airflow and Django", top_k=2)
+    
+    assert len(results) == 2
+    assert {result["source_id"] for result in results} == {0, 3}
+    assert results[0]["similarity"] >= results[1]["similarity"]
+
+def test_add_skips_duplicates():
+    """Test that whitespace-only differences are not indexed twice."""
+    index = JobIndex(dimensions=256)
+    assert index.add("Python  engineer")
+    assert not index.add("Python engineer\n")
+    assert not index.add("   ")
+    assert len(index) == 1
+
+def test_search_empty_index():
+    """Test searching an index with no documents."""
+    assert JobIndex(dimensions=256).search("anything") == []
+
+@pytest.mark.asyncio
+async def test_refresh_job_index_loads_stored_jobs():
+    """Test that stored match job descriptions are picked up incrementally."""
+    await refresh_job_index()
+    await store_match_result("resume", "Unique welding inspector posting", "raw")
+    
+    assert await refresh_job_index() == 1
+    assert await refresh_job_index() == 0
+    assert job_index.search("welding inspector", top_k=1)[0]["job_description"] == "Unique welding inspector posting"
+
+def dense_similarities(texts, query, dimensions):
+    """TF-IDF cosine similarities computed on dense vectors, for reference."""
+    counts = np.stack([term_counts(text, dimensions) for text in texts])
+    idf = np.log((1 + len(texts)) / (1 + np.count_nonzero(counts, axis=0))) + 1.0
+    documents = np.log1p(counts) * idf
+    documents /= np.linalg.norm(documents, axis=1, keepdims=True)
+    vector = np.log1p(term_counts(query, dimensions)) * idf
+    return documents @ (vector / np.linalg.norm(vector))
+
+@pytest.mark.asyncio
+async def test_index_is_reweighted_only_after_growing():
+    """Test that adds keep the old IDF until the index grows by the ratio, and reweighting matches dense TF-IDF."""
+    index = JobIndex(dimensions=1024, reweight_ratio=0.25)
+    for i, job in enumerate(JOBS):
+        index.add(job, i)
+    query = "Python engineer building AWS data pipelines"
+    index.search(query)
+    
+    index.add("Backend engineer with Go and Kubernetes", 4)
+    assert not index.stale
+    with patch.object(index, "reweight") as reweight:
+        index.search(query)
+    assert reweight.call_count == 0
+    
+    index.add("Python developer for AWS Lambda services", 5)
+    assert index.stale
+    await index.reweight_async()
+    
+    texts = JOBS + ["Backend engineer with Go and Kubernetes", "Python developer for AWS Lambda services"]
+    expected = dense_similarities(texts, query, 1024)
+    results = index.search(query, top_k=len(texts))
+    assert not index.stale
+    assert [result["similarity"] for result in results] == pytest.approx(sorted(expected[expected > 0], reverse=True), abs=1e-4)
+
+@pytest.mark.asyncio
+async def test_shortlist_refreshes_at_most_once_per_interval(monkeypatch):
+    """Test that shortlists within PREFILTER_REFRESH_INTERVAL do not query the database again."""
+    monkeypatch.setattr(prefilter, "_last_update", float("-inf"))
+    monkeypatch.setattr(prefilter, "PREFILTER_REFRESH_INTERVAL", 60)
+    
+    with patch("app.prefilter.get_job_descriptions_since", wraps=get_job_descriptions_since) as query:
+        await shortlist_jobs("welding inspector")
+        await shortlist_jobs("welding inspector")
+    
+    assert query.call_count == 1
+
+@pytest.mark.asyncio
+async def test_refresh_picks_up_records_stored_out_of_id_order():
+    """Test that a record written after one with a higher reserved ID is still indexed."""
+    await refresh_job_index()
+    lower, higher = await reserve_match_ids(2)
+    for match_id, job in ((higher, "Unique crane operator posting"), (lower, "Unique pastry chef posting")):
+        await store_match_results([{
+            "id": match_id,
+            "resume_text": "resume",
+            "job_description": job,
+            "raw_output": "raw"
+        }])
+        assert await refresh_job_index() == 1
+    
+    assert job_index.search("pastry chef", top_k=1)[0]["source_id"] == lower
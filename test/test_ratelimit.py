@@ -0,0 +1,105 @@
+import time
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from openai import RateLimitError
+from app.ratelimit import RateLimiter, RateBudgetExceeded, retry_after_seconds
+from app.matcher import analyze_resume_job_match
+
+def rate_limit_error(headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return RateLimitError("Rate limit", response=httpx.Response(429, headers=headers, request=request), body=None)
+
+def exhausted_limiter(requests_per_minute=600):
+    """Create a limiter whose request budget has just been used up."""
+    limiter = RateLimiter(requests_per_minute=requests_per_minute)
+    limiter.requests.level = 0
+    return limiter
+
+@pytest.mark.asyncio
+async def test_requests_are_paced_to_the_budget():
+    """Test that calls beyond the budget wait for it to refill."""
+    limiter = exhausted_limiter(600)  # one request every 0.1 seconds
+    
+    start = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire(1)
+    
+    assert time.monotonic() - start >= 0.25
+    assert limiter.stats["granted"] == 3
+
+@pytest.mark.asyncio
+async def test_interactive_calls_go_before_batch_calls():
+    """Test that the interactive lane is served before waiting batch work."""
+    limiter = exhausted_limiter(600)
+    order = []
+    
+    async def call(name, priority):
+        await limiter.acquire(1, priority)
+        order.append(name)
+    
+    batch = [asyncio.create_task(call(f"batch{index}", "batch")) for index in range(2)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("interactive", "interactive"))
+    await asyncio.gather(*batch, interactive)
+    
+    assert order == ["interactive", "batch0", "batch1"]
+
+@pytest.mark.asyncio
+async def test_token_budget_and_timeout():
+    """Test that token estimates are budgeted and waiting can time out."""
+    limiter = RateLimiter(tokens_per_minute=1000)
+    # Larger than the whole budget, so it is clamped rather than stuck
+    await limiter.acquire(5000)
+    
+    with pytest.raises(RateBudgetExceeded):
+        await limiter.acquire(500, timeout=0.05)
+    assert limiter.get_stats()["waiting"] == 0
+    assert limiter.stats["timeouts"] == 1
+
+def test_retry_after_seconds():
+    """Test the Retry-After header formats."""
+    assert retry_after_seconds(rate_limit_error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(rate_limit_error({"retry-after": "7"})) == 7
+    assert retry_after_seconds(rate_limit_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert retry_after_seconds(rate_limit_error()) is None
+
+@pytest.mark.asyncio
+async def test_call_retries_after_rate_limit(monkeypatch):
+    """Test that a 429 pauses for Retry-After, lowers the budget and is retried."""
+    monkeypatch.setattr("app.ratelimit.LLM_MAX_RETRIES", 2)
+    limiter = RateLimiter()
+    func = AsyncMock(side_effect=[rate_limit_error({"retry-after-ms": "100"}), "ok"])
+    
+    start = time.monotonic()
+    assert await limiter.call(func, 100) == "ok"
+    
+    assert time.monotonic() - start >= 0.09
+    assert func.await_count == 2
+    assert limiter.stats["retries"] == 1 and limiter.stats["rate_limited"] == 1
+    assert limiter.scale < 1
+
+@pytest.mark.asyncio
+async def test_call_gives_up_on_long_retry_after(monkeypatch):
+    """Test that a Retry-After beyond LLM_RETRY_MAX_SECONDS is not waited for."""
+    monkeypatch.setattr("app.ratelimit.LLM_MAX_RETRIES", 2)
+    limiter = RateLimiter()
+    func = AsyncMock(side_effect=rate_limit_error({"retry-after": "3600"}))
+    
+    with pytest.raises(RateLimitError):
+        await limiter.call(func, 100)
+    assert func.await_count == 1
+
+@pytest.mark.asyncio
+@patch('app.matcher.client.chat.completions.create', new_callable=AsyncMock)
+async def test_exhausted_budget_falls_back_to_fast_scorer(mock_create, monkeypatch):
+    """Test that a call waiting past LLM_QUEUE_TIMEOUT for budget uses the offline scorer."""
+    monkeypatch.setattr("app.matcher.rate_limiter", exhausted_limiter(1))
+    monkeypatch.setattr("app.matcher.LLM_QUEUE_TIMEOUT", 0.05)
+    
+    raw_output, parsed_output = await analyze_resume_job_match("Python developer", "Python role")
+    
+    mock_create.assert_not_called()
+    assert parsed_output["engine"] == "fast"
+    assert parsed_output["fallback_reason"] == "RateBudgetExceeded"
@@ -0,0 +1,70 @@
+import pytest
+import asyncio
+from unittest.mock import patch
+from app.writer import MatchWriter
+from app.database import get_match_by_id, store_match_results, reserve_match_ids
+
+@pytest.mark.asyncio
+async def test_enqueue_returns_id_once_flushed():
+    """Test that the ID is returned when queued and stored with the record."""
+    writer = MatchWriter(batch_size=10, flush_interval=0.05)
+    
+    match_id = await writer.enqueue("writer resume", "writer job", "raw", {"score": 55, "summary": "s"})
+    assert await get_match_by_id(match_id) is None
+    await writer.written(match_id)
+    
+    record = await get_match_by_id(match_id)
+    assert record["resume_text"] == "writer resume"
+    assert record["score"] == 55
+    await writer.stop()
+
+@pytest.mark.asyncio
+async def test_records_are_written_in_batches():
+    """Test that queued records are combined into multi-row inserts."""
+    writer = MatchWriter(batch_size=5, flush_interval=0.05)
+    
+    with patch('app.writer.store_match_results', wraps=store_match_results) as store:
+        match_ids = [await writer.enqueue(f"batched resume {i}", "job", "raw") for i in range(12)]
+        await writer.stop()
+    
+    assert len(set(match_ids)) == 12
+    assert [len(call.args[0]) for call in store.call_args_list] == [5, 5, 2]
+    assert writer.get_stats()["written"] == 12
+    assert writer.get_stats()["batches"] == 3
+
+@pytest.mark.asyncio
+async def test_stop_drains_the_queue():
+    """Test that nothing queued before shutdown is lost."""
+    writer = MatchWriter(batch_size=100, flush_interval=10)
+    match_ids = [await writer.enqueue(f"drained resume {i}", "job", "raw") for i in range(3)]
+    
+    await writer.stop()
+    
+    for i, match_id in enumerate(match_ids):
+        record = await get_match_by_id(match_id)
+        assert record["resume_text"] == f"drained resume {i}"
+
+@pytest.mark.asyncio
+async def test_failed_flush_fails_the_futures():
+    """Test that a failed write is counted and readers find no record."""
+    writer = MatchWriter(batch_size=10, flush_interval=0.01)
+    
+    with patch('app.writer.store_match_results', side_effect=RuntimeError("disk full")):
+        match_id = await writer.enqueue("failing resume", "job", "raw")
+        await writer.written(match_id)
+        await writer.stop()
+    
+    assert writer.get_stats()["failed"] == 1
+    assert await get_match_by_id(match_id) is None
+
+@pytest.mark.asyncio
+async def test_ids_are_reserved_in_blocks():
+    """Test that queued records take IDs from one reserved block."""
+    writer = MatchWriter(batch_size=10, flush_interval=0.01, id_block=5)
+    
+    with patch('app.writer.reserve_match_ids', wraps=reserve_match_ids) as reserve:
+        match_ids = [await writer.enqueue(f"reserved resume {i}", "job", "raw") for i in range(7)]
+        await writer.stop()
+    
+    assert reserve.call_count == 2 and len(set(match_ids)) == 7
+    assert (await get_match_by_id(match_ids[-1]))["resume_text"] == "reserved resume 6"